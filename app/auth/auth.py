@@ -1,18 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.schemas import UserLogin
-from app.db import get_db
-from app.crud.crud_user import get_user_by_username
-from app.auth.security import verify_password
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas import UserLogin, UserOut
+from app.db import get_async_db
+from app.crud.crud_user import get_user_by_username_async
+from app.auth.security import HashPoolBusy, verify_password_async
 from app.auth.jwt_handler import create_access_token
+from app.auth.deps import get_current_user
 
 router = APIRouter()
 
 @router.post("/login")
-def login(data: UserLogin, db: Session = Depends(get_db)):
-    user = get_user_by_username(db, data.username)
-    if not user or not verify_password(data.password, user.password):
+async def login(data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await get_user_by_username_async(db, data.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    await db.close()  # koneksi DB kembali ke pool selama bcrypt jalan
+    # bcrypt makan CPU ~250ms: jalan di hash pool, pool penuh → 503 daripada antri tanpa batas
+    try:
+        ok = await verify_password_async(data.password, user.password)
+    except HashPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many logins, retry shortly", headers={"Retry-After": "1"})
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = create_access_token({"sub": user.username, "role": user.role})
     return {"access_token": token, "token_type": "bearer"}
+
+@router.get("/me", response_model=UserOut)
+async def me(user: UserOut = Depends(get_current_user)):
+    return user
@@ -0,0 +1,78 @@
+# app/auth/deps.py
+"""
+Dependency auth untuk route yang butuh login:
+
+    @app.get("/x")
+    async def x(user: UserOut = Depends(get_current_user)): ...
+
+    @app.post("/y", dependencies=[Depends(require_role("admin"))])
+
+Token (Authorization: Bearer ...) diverifikasi lewat decode_access_token
+(claims di-cache sampai exp), user di-cache AUTH_USER_CACHE_TTL detik
+dengan single-flight, jadi request yang sudah login tidak query DB lagi.
+Role changes / deleted users take effect after at most AUTH_USER_CACHE_TTL.
+
+The user is loaded on its own session: the single-flight fetch runs as a
+task that other requests wait for, so it must not borrow the session of
+the request that started it (closed when that request ends).
+"""
+
+import os
+
+import jwt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.auth.jwt_handler import decode_access_token
+from app.crud.crud_user import get_user_by_username_async
+from app.db import AsyncSessionLocal
+from app.metrics import cache_collector
+from app.schemas import UserOut
+from app.services.cache import TTLCache
+
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+USERS = TTLCache(maxsize=int(os.getenv("AUTH_USER_CACHE_SIZE", "10000")))
+cache_collector("auth_users", USERS.stats)
+
+bearer = HTTPBearer(auto_error=False)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+async def _load_user(username: str):
+    async with AsyncSessionLocal() as db:
+        user = await get_user_by_username_async(db, username)
+    if user is None:
+        return None
+    # snapshot, bukan objek ORM: aman dipakai bersama antar request / session
+    return UserOut(id=user.id, username=user.username, email=user.email, role=user.role or "user")
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer)) -> UserOut:
+    if credentials is None or credentials.scheme.lower() != "bearer":
+        raise _unauthorized("Not authenticated")
+    try:
+        claims = decode_access_token(credentials.credentials)
+    except jwt.ExpiredSignatureError:
+        raise _unauthorized("Token expired")
+    except jwt.InvalidTokenError:
+        raise _unauthorized("Invalid token")
+
+    username = claims["sub"]
+    user = await USERS.aget_or_fetch(
+        ("user", username), AUTH_USER_CACHE_TTL, lambda: _load_user(username), lambda u: u is not None,
+    )
+    if user is None:
+        raise _unauthorized("User not found")
+    return user
+
+
+def require_role(*roles: str):
+    """Dependency: current user must have one of roles (403 otherwise)"""
+    async def check(user: UserOut = Depends(get_current_user)) -> UserOut:
+        if user.role not in roles:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        return user
+
+    return check
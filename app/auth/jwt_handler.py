@@ -1,10 +1,34 @@
 import jwt
+import os
+import time
 from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from app.metrics import cache_collector
+from app.services.cache import TTLCache
 
 SECRET_KEY = "ganti_dengan_yang_aman"
 ALGORITHM = "HS256"
 
+# claims token yang sudah diverifikasi, di-cache sampai exp (maks AUTH_TOKEN_CACHE_TTL)
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+_CLAIMS = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE)
+cache_collector("auth_tokens", _CLAIMS.stats)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     to_encode["exp"] = datetime.utcnow() + timedelta(hours=24)
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Verified claims of token (signature + exp), cached per token.
+    Raises jwt.InvalidTokenError (ExpiredSignatureError, ...) when invalid.
+    """
+    found, claims = _CLAIMS.get(token)
+    if found:
+        return claims
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "sub"]})
+    _CLAIMS.set(token, claims, min(claims["exp"] - time.time(), AUTH_TOKEN_CACHE_TTL))
+    return claims
@@ -1,9 +1,72 @@
+import os
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
 from passlib.context import CryptContext
 
+from app import metrics
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt di pool terpisah supaya burst login tidak memakan event loop / threadpool route lain
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+AUTH_HASH_QUEUE = int(os.getenv("AUTH_HASH_QUEUE", str(AUTH_HASH_WORKERS * 8)))  # maks verify jalan + antri
+# default thread pool: bcrypt melepas GIL, dan fork ProcessPoolExecutor dari proses uvicorn yang ber-thread berisiko
+AUTH_HASH_PROCESSES = os.getenv("AUTH_HASH_PROCESSES", "0") == "1"
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
 def hash_password(password: str):
     return pwd_context.hash(password)
 
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
+
+
+# -------------------------------------------------------------------
+# ASYNC (login)
+# -------------------------------------------------------------------
+_pool: Optional[Executor] = None
+_inflight = 0
+
+
+def _executor() -> Executor:
+    global _pool
+    if _pool is None:
+        if AUTH_HASH_PROCESSES:
+            _pool = ProcessPoolExecutor(max_workers=AUTH_HASH_WORKERS)
+        else:
+            _pool = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _pool
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    """
+    verify_password in the hash pool. Raises HashPoolBusy instead of queueing
+    when AUTH_HASH_QUEUE verifications are already running or waiting.
+    """
+    global _inflight
+    if _inflight >= AUTH_HASH_QUEUE:
+        metrics.AUTH_HASH_REJECTED.inc()
+        raise HashPoolBusy(f"{_inflight} password checks in progress")
+    _inflight += 1
+    try:
+        with metrics.timer(metrics.AUTH_HASH_SECONDS):
+            return await asyncio.get_running_loop().run_in_executor(_executor(), verify_password, plain, hashed)
+    finally:
+        _inflight -= 1
+
+
+def hash_pool_stats() -> dict:
+    return {"inflight": _inflight, "limit": AUTH_HASH_QUEUE, "workers": AUTH_HASH_WORKERS}
+
+
+def shutdown_hash_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
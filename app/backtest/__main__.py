@@ -0,0 +1,116 @@
+# app/backtest/__main__.py
+"""
+Backtest / grid search detector parameters.
+
+    # history worker (CANDLE_HISTORY_DIR), 1 tahun terakhir
+    python -m app.backtest --symbols BTC,ETH,SOL --days 365
+
+    # file kline (data.binance.vision), grid sendiri
+    python -m app.backtest --files dumps/*.csv \\
+        --grid pump_dump.pump_threshold=0.03,0.05,0.07 --grid pump_dump.window=5,10 \\
+        --horizons 5,15,60 --out bt.json
+
+    # cek engine vectorized terhadap app/detectors.py
+    python -m app.backtest --symbols BTC --days 3 --verify 200
+
+Without --grid the DEFAULT_GRID around the worker's current parameters is used.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+from app.backtest.data import load_files, load_history
+from app.backtest.grid import DEFAULT_GRID, expand, rank, run_grid
+from app.backtest.signals import SIGNALS, replay
+from app.services.candle_history import to_rows
+
+
+def parse_value(v: str) -> Any:
+    try:
+        return int(v)
+    except ValueError:
+        return float(v)
+
+
+def parse_grid(specs: List[str]) -> Dict[str, Dict[str, List[Any]]]:
+    """["pump_dump.window=5,10", ...] → {"pump_dump": {"window": [5, 10]}}"""
+    grids: Dict[str, Dict[str, List[Any]]] = {}
+    for spec in specs:
+        key, _, values = spec.partition("=")
+        detector, _, param = key.partition(".")
+        if detector not in SIGNALS or not param or not values:
+            raise SystemExit(f"bad --grid {spec!r}, expected detector.param=v1,v2 with detector in {list(SIGNALS)}")
+        grids.setdefault(detector, {})[param] = [parse_value(v) for v in values.split(",")]
+    return grids
+
+
+def verify(candles, grids, samples: int):
+    """Compare vectorized masks with app/detectors.py on random candles (first grid point per detector)"""
+    for sym, rec in candles.items():
+        rows = to_rows(rec)
+        points = sorted(random.sample(range(len(rows)), min(samples, len(rows))))
+        for detector, grid in grids.items():
+            params = expand(grid)[0]
+            print(f"verify {sym} {detector} {params}: {replay(rows, detector, params, points)} mismatch(es) in {len(points)} candles")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest detector parameters over historical candles")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--symbols", help="comma separated, read from the candle history")
+    src.add_argument("--files", nargs="+", help="kline files (.csv / .json / .bin)")
+    parser.add_argument("--history-dir", help="default CANDLE_HISTORY_DIR")
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--days", type=float, help="only the last N days")
+    parser.add_argument("--grid", action="append", default=[], help="detector.param=v1,v2,... (repeatable)")
+    parser.add_argument("--horizons", default="5,15,60", help="forward return horizons in candles")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--min-signals", type=int, default=30)
+    parser.add_argument("--verify", type=int, default=0, help="cross-check N random candles per symbol against app/detectors.py")
+    parser.add_argument("--out", help="write all results as JSON")
+    args = parser.parse_args()
+
+    start = int((time.time() - args.days * 86400) * 1000) if args.days else None
+    if args.files:
+        candles = load_files(args.files, args.interval, start=start)
+    else:
+        candles = load_history(args.symbols.split(","), args.interval, start=start, directory=args.history_dir)
+    candles = {s: rec for s, rec in candles.items() if len(rec)}
+    if not candles:
+        raise SystemExit("no candles")
+    grids = parse_grid(args.grid) if args.grid else DEFAULT_GRID
+    horizons = [int(h) for h in args.horizons.split(",")]
+    total = sum(len(r) for r in candles.values())
+    print(f"{len(candles)} symbol(s), {total} candles ({args.interval}), "
+          f"{sum(len(expand(g)) for g in grids.values())} parameter set(s), {args.workers} worker(s)")
+
+    if args.verify:
+        verify(candles, grids, args.verify)
+
+    t0 = time.perf_counter()
+    results = run_grid(candles, grids, horizons, args.workers)
+    print(f"Grid done in {time.perf_counter() - t0:.1f}s")
+
+    for detector in grids:
+        rows = rank([r for r in results if r["detector"] == detector], horizons[0], args.min_signals)
+        print(f"\n{detector} (horizon {horizons[0]}, best {args.top} by edge):")
+        for edge, status, params, s in rows[:args.top]:
+            print(f"  {status:<9} {json.dumps(params):<45} signals {s['signals']:>7}  hit {s['hit_rate']:.3f}  "
+                  f"base {s['base_rate']:.3f}  edge {edge:+.3f}  ret {s['mean_return'] * 100:+.3f}%")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "symbols": list(candles), "interval": args.interval, "candles": total,
+                "horizons": horizons, "results": results,
+            }, f, indent=1)
+        print("Results written to", args.out)
+
+
+if __name__ == "__main__":
+    main()
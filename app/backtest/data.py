@@ -0,0 +1,94 @@
+# app/backtest/data.py
+"""
+OHLCV input untuk backtest: history worker (CandleHistory, memmap 1m) atau
+file (CSV kline Binance / data.binance.vision, JSON rows, atau .bin dengan
+format record yang sama seperti history).
+
+Everything is returned as RECORD arrays (app.services.candle_history),
+ascending by open_time, resampled to the requested interval.
+"""
+
+import csv
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.services.candle_history import RECORD, STEP_MS, CandleHistory, from_rows, resample
+from app.services.market_data import interval_seconds
+
+
+def _slice(rec: np.ndarray, start: Optional[int], end: Optional[int]) -> np.ndarray:
+    lo = 0 if start is None else int(np.searchsorted(rec["t"], start, side="left"))
+    hi = len(rec) if end is None else int(np.searchsorted(rec["t"], end, side="right"))
+    return rec[lo:hi]
+
+
+def load_history(
+    symbols: Iterable[str],
+    interval: str = "1m",
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    directory: Optional[str] = None,
+) -> Dict[str, np.ndarray]:
+    """symbol → records from the worker's candle history; symbols without history are skipped"""
+    history = CandleHistory(directory) if directory else CandleHistory()
+    step_ms = interval_seconds(interval) * 1000
+    out = {}
+    for sym in symbols:
+        rec = history.records(sym.upper())
+        if rec is None:
+            print("No history for", sym)
+            continue
+        out[sym.upper()] = resample(_slice(rec, start, end), step_ms)
+    return out
+
+
+def symbol_from_path(path: str) -> str:
+    """'data/BTCUSDT-1m-2024-01.csv' → 'BTC', 'ETH_1m.bin' → 'ETH'"""
+    name = os.path.basename(path).split(".")[0]
+    sym = name.replace("-", "_").split("_")[0].upper()
+    return sym[:-4] if sym.endswith("USDT") and len(sym) > 4 else sym
+
+
+def read_file(path: str) -> np.ndarray:
+    if path.endswith(".bin"):
+        return np.fromfile(path, dtype=RECORD)
+    if path.endswith(".json"):
+        with open(path) as f:
+            return from_rows(json.load(f))
+    rows: List[List[str]] = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if row and row[0].strip().isdigit():  # lewati header
+                rows.append(row)
+    rec = from_rows(rows)
+    # dump Binance sejak 2025 memakai open_time dalam mikrodetik
+    if len(rec) and rec["t"][0] > 10 ** 14:
+        rec["t"] //= 1000
+    return rec
+
+
+def load_files(
+    paths: Iterable[str],
+    interval: str = "1m",
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    symbol → records from kline files. Several files of one symbol (e.g.
+    monthly dumps) are concatenated; duplicate open_times keep the last one.
+    """
+    parts: Dict[str, List[np.ndarray]] = {}
+    for path in paths:
+        parts.setdefault(symbol_from_path(path), []).append(read_file(path))
+    step_ms = interval_seconds(interval) * 1000
+    out = {}
+    for sym, recs in parts.items():
+        rec = np.concatenate(recs)
+        rec = rec[np.argsort(rec["t"], kind="stable")]
+        keep = np.append(rec["t"][1:] != rec["t"][:-1], True)
+        rec = _slice(rec[keep], start, end)
+        out[sym] = rec if step_ms == STEP_MS else resample(rec, step_ms)
+    return out
@@ -0,0 +1,88 @@
+# app/backtest/evaluate.py
+"""
+Forward return & hit rate dari signal.
+
+Per signal (rising edge dari mask, lihat signals.rising_edges) dihitung
+return close[t+h] / close[t] - 1 untuk tiap horizon h (candle).
+
+- directional (pump / dump / breakout): hit = return searah DIRECTION;
+  dibandingkan dengan base rate (semua candle) → edge.
+- non-directional (stagnant / sideway): hit = |return| di bawah median
+  |return| semua candle, yaitu harga memang tetap tenang.
+
+Stats are kept as plain sums so results of symbols / processes can be added up.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+from app.backtest.signals import DIRECTION
+
+
+def forward_returns(close: np.ndarray, horizons: List[int]) -> np.ndarray:
+    """(H, T) array, NaN where t + h is past the end"""
+    out = np.full((len(horizons), len(close)), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i, h in enumerate(horizons):
+            if h < len(close):
+                out[i, :-h] = close[h:] / close[:-h] - 1
+    return out
+
+
+def baseline(fwd: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per horizon: fraction of candles going up / down, median |return|"""
+    valid = ~np.isnan(fwd)
+    n = np.maximum(valid.sum(axis=1), 1)
+    abs_fwd = np.where(valid, np.abs(fwd), np.nan)
+    return {
+        "up": np.where(valid, fwd > 0, False).sum(axis=1) / n,
+        "down": np.where(valid, fwd < 0, False).sum(axis=1) / n,
+        "median_abs": np.nan_to_num(np.nanmedian(abs_fwd, axis=1)) if valid.any() else np.zeros(len(fwd)),
+    }
+
+
+def new_stats(horizons: int) -> Dict[str, np.ndarray]:
+    return {"n": np.zeros(horizons), "hits": np.zeros(horizons), "sum_ret": np.zeros(horizons), "base_hits": np.zeros(horizons)}
+
+
+def accumulate(stats: Dict[str, np.ndarray], status: str, idx: np.ndarray, fwd: np.ndarray, base: Dict[str, np.ndarray]):
+    """Add the signals at candle indexes idx of one symbol to stats"""
+    if not len(idx):
+        return
+    direction = DIRECTION[status]
+    r = fwd[:, idx]  # (H, n)
+    valid = ~np.isnan(r)
+    n = valid.sum(axis=1)
+    if direction:
+        signed = np.where(valid, r * direction, 0.0)
+        hits = (signed > 0).sum(axis=1)
+        stats["sum_ret"] += signed.sum(axis=1)
+        stats["base_hits"] += n * (base["up"] if direction > 0 else base["down"])
+    else:
+        absr = np.where(valid, np.abs(r), np.inf)
+        hits = (absr < base["median_abs"][:, None]).sum(axis=1)
+        stats["sum_ret"] += np.where(valid, np.abs(r), 0.0).sum(axis=1)
+        stats["base_hits"] += n * 0.5
+    stats["n"] += n
+    stats["hits"] += hits
+
+
+def summarize(stats: Dict[str, np.ndarray], horizons: List[int]) -> Dict[str, Dict[str, float]]:
+    """
+    Per horizon: signals, hit_rate, base_rate, edge (hit_rate - base_rate),
+    mean_return (direction-adjusted; mean |return| for non-directional).
+    """
+    out = {}
+    for i, h in enumerate(horizons):
+        n = stats["n"][i]
+        hit_rate = stats["hits"][i] / n if n else 0.0
+        base_rate = stats["base_hits"][i] / n if n else 0.0
+        out[str(h)] = {
+            "signals": int(n),
+            "hit_rate": float(hit_rate),
+            "base_rate": float(base_rate),
+            "edge": float(hit_rate - base_rate),
+            "mean_return": float(stats["sum_ret"][i] / n) if n else 0.0,
+        }
+    return out
@@ -0,0 +1,154 @@
+# app/backtest/grid.py
+"""
+Grid search parameter detector, paralel di semua core.
+
+Close dan forward return semua symbol disalin SEKALI ke satu blok
+multiprocessing.shared_memory (symbol digabung, `offsets` menandai batas);
+proses worker hanya attach dan membuat view numpy, jadi candle tidak
+di-pickle ulang per task. Satu task = satu detector × satu set parameter
+untuk semua symbol; hasilnya sum stats kecil (lihat evaluate).
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.backtest.evaluate import accumulate, baseline, forward_returns, new_stats, summarize
+from app.backtest.signals import SIGNALS, rising_edges
+
+# sekitar nilai worker sekarang (app.detector.batch.DEFAULT_PARAMS)
+DEFAULT_GRID: Dict[str, Dict[str, List[Any]]] = {
+    "pump_dump": {"pump_threshold": [0.02, 0.03, 0.05, 0.07, 0.10], "window": [3, 5, 10, 15]},
+    "stagnant": {"threshold": [0.005, 0.01, 0.02, 0.03], "window": [15, 30, 60]},
+    "sideway": {"ma_window": [10, 20, 40], "std_threshold": [0.001, 0.002, 0.004, 0.008]},
+    "breakout": {"lookback": [20, 50, 100, 200], "breakout_mult": [0.002, 0.005, 0.01, 0.02]},
+}
+
+
+def expand(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """{"a": [1, 2], "b": [3]} → [{"a": 1, "b": 3}, {"a": 2, "b": 3}]"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+# -------------------------------------------------------------------
+# SHARED CANDLES
+# -------------------------------------------------------------------
+class SharedCandles:
+    """
+    Close (N,) + forward returns (H, N) of all symbols in one shared memory
+    block. Created in the parent with `create`, attached in workers by name.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, offsets: np.ndarray, horizons: int, owner: bool):
+        self.shm = shm
+        self.offsets = offsets
+        self.owner = owner
+        total = int(offsets[-1])
+        self.close = np.ndarray((total,), dtype=np.float64, buffer=shm.buf)
+        self.fwd = np.ndarray((horizons, total), dtype=np.float64, buffer=shm.buf, offset=total * 8)
+
+    @classmethod
+    def create(cls, closes: List[np.ndarray], horizons: List[int]) -> "SharedCandles":
+        offsets = np.concatenate(([0], np.cumsum([len(c) for c in closes]))).astype(np.int64)
+        total = int(offsets[-1])
+        shm = shared_memory.SharedMemory(create=True, size=max(total * 8 * (1 + len(horizons)), 8))
+        self = cls(shm, offsets, len(horizons), owner=True)
+        for i, c in enumerate(closes):
+            lo, hi = offsets[i], offsets[i + 1]
+            self.close[lo:hi] = c
+            self.fwd[:, lo:hi] = forward_returns(self.close[lo:hi], horizons)
+        return self
+
+    @classmethod
+    def attach(cls, name: str, offsets: np.ndarray, horizons: int) -> "SharedCandles":
+        # proses pool memakai resource tracker parent, jadi unlink tetap sekali oleh parent
+        return cls(shared_memory.SharedMemory(name=name), offsets, horizons, owner=False)
+
+    def symbol(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return self.close[lo:hi], self.fwd[:, lo:hi]
+
+    def close_shm(self):
+        # view numpy harus dilepas dulu sebelum buffer di-close
+        self.close = self.fwd = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+_SHARED: Optional[SharedCandles] = None
+_BASE: List[Dict[str, np.ndarray]] = []
+
+
+def _use(shared: SharedCandles, base: List[Dict[str, np.ndarray]]):
+    global _SHARED, _BASE
+    _SHARED = shared
+    _BASE = base
+
+
+def _init_worker(name: str, offsets: np.ndarray, horizons: int, base: List[Dict[str, np.ndarray]]):
+    _use(SharedCandles.attach(name, offsets, horizons), base)
+
+
+def evaluate_params(detector: str, params: Dict[str, Any], horizons: List[int]) -> Dict[str, Any]:
+    """One grid point over every symbol of the shared candles"""
+    fn = SIGNALS[detector]
+    stats: Dict[str, Dict[str, np.ndarray]] = {}
+    for i in range(len(_SHARED.offsets) - 1):
+        close, fwd = _SHARED.symbol(i)
+        for status, mask in fn(close, **params).items():
+            accumulate(stats.setdefault(status, new_stats(len(horizons))), status, rising_edges(mask), fwd, _BASE[i])
+    return {
+        "detector": detector,
+        "params": params,
+        "statuses": {status: summarize(s, horizons) for status, s in stats.items()},
+    }
+
+
+def run_grid(
+    candles: Dict[str, np.ndarray],
+    grids: Dict[str, Dict[str, List[Any]]],
+    horizons: List[int],
+    workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    candles: symbol → RECORD array (app.backtest.data). Returns one result
+    per (detector, parameter set), in grid order.
+    """
+    symbols = list(candles)
+    closes = [np.ascontiguousarray(candles[s]["c"], dtype=np.float64) for s in symbols]
+    tasks = [(det, params) for det, grid in grids.items() for params in expand(grid)]
+    workers = workers or os.cpu_count() or 1
+
+    shared = SharedCandles.create(closes, horizons)
+    try:
+        base = [baseline(shared.symbol(i)[1]) for i in range(len(symbols))]
+        if workers == 1:
+            _use(shared, base)
+            return [evaluate_params(det, params, horizons) for det, params in tasks]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shared.shm.name, shared.offsets, len(horizons), base),
+        ) as pool:
+            futures = [pool.submit(evaluate_params, det, params, horizons) for det, params in tasks]
+            return [f.result() for f in futures]
+    finally:
+        shared.close_shm()
+
+
+def rank(results: List[Dict[str, Any]], horizon: int, min_signals: int = 30) -> List[Tuple[float, str, Dict[str, Any], Dict[str, float]]]:
+    """(edge, status, params, stats) sorted best first, grid points with too few signals dropped"""
+    rows = []
+    for res in results:
+        for status, by_h in res["statuses"].items():
+            s = by_h.get(str(horizon))
+            if s and s["signals"] >= min_signals:
+                rows.append((s["edge"], status, res["params"], s))
+    rows.sort(key=lambda r: r[0], reverse=True)
+    return rows
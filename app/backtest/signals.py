@@ -0,0 +1,130 @@
+# app/backtest/signals.py
+"""
+Detector dari app/detectors.py, dihitung untuk SETIAP candle sekaligus.
+
+Untuk candle ke-t hasilnya sama dengan memanggil detector dengan candle
+[0..t] (seperti worker yang melihat buffer sampai candle terakhir), tapi
+dalam O(T) numpy per detector, bukan O(T × window) Python. `replay`
+menjalankan detector aslinya di beberapa titik untuk cross-check.
+
+Every function takes a close array (float64, ascending) and returns
+{status: bool mask}; candles without enough history are False everywhere.
+support_resistance has no buy/sell status and is not backtested.
+"""
+
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app import detectors
+
+# arah yang diharapkan setelah signal: +1 naik, -1 turun, 0 = "tetap tenang"
+DIRECTION = {"pump": 1, "dump": -1, "breakout": 1, "stagnant": 0, "sideway": 0}
+
+
+def rolling_max(x: np.ndarray, w: int) -> np.ndarray:
+    """max(x[i:i+w]) for i in 0..n-w, O(n) (van Herk / Gil-Werman)"""
+    n = len(x)
+    if n < w:
+        return np.empty(0)
+    if w <= 1:
+        return x.copy()
+    pad = (-n) % w
+    blocks = np.concatenate([x, np.full(pad, -np.inf)]).reshape(-1, w)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suffix[:n - w + 1], prefix[w - 1:n])
+
+
+def rolling_min(x: np.ndarray, w: int) -> np.ndarray:
+    return -rolling_max(-x, w)
+
+
+def _place(n: int, offset: int, values: np.ndarray) -> np.ndarray:
+    """Mask of length n with values aligned to candles offset..n-1"""
+    out = np.zeros(n, dtype=bool)
+    out[offset:] = values
+    return out
+
+
+def pump_dump(c: np.ndarray, pump_threshold: float = 0.10, window: int = 5) -> Dict[str, np.ndarray]:
+    n = len(c)
+    if n < window + 1:
+        return {"pump": np.zeros(n, bool), "dump": np.zeros(n, bool)}
+    start, end = c[:-window], c[window:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(start != 0, (end - start) / start, 0.0)
+    return {"pump": _place(n, window, pct >= pump_threshold), "dump": _place(n, window, pct <= -pump_threshold)}
+
+
+def stagnant(c: np.ndarray, threshold: float = 0.02, window: int = 20) -> Dict[str, np.ndarray]:
+    n = len(c)
+    if n < window:
+        return {"stagnant": np.zeros(n, bool)}
+    maxi, mini = rolling_max(c, window), rolling_min(c, window)
+    total = maxi + mini
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.where(total != 0, (maxi - mini) / (total / 2), 0.0)
+    return {"stagnant": _place(n, window - 1, frac <= threshold)}
+
+
+def sideway(c: np.ndarray, ma_window: int = 20, std_threshold: float = 0.01) -> Dict[str, np.ndarray]:
+    """pstdev of the ma_window-1 returns inside the window, via cumulative sums"""
+    n = len(c)
+    m = ma_window - 1
+    if n < ma_window or m < 1:
+        return {"sideway": np.zeros(n, bool)}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.diff(c) / c[:-1]
+    r[~np.isfinite(r)] = 0.0
+    r = r - np.nanmean(r)  # geser ke mean 0: cumsum r² tidak kehilangan presisi
+    s1 = np.concatenate(([0.0], np.cumsum(r)))
+    s2 = np.concatenate(([0.0], np.cumsum(r * r)))
+    mean = (s1[m:] - s1[:-m]) / m
+    var = np.maximum((s2[m:] - s2[:-m]) / m - mean * mean, 0.0)
+    return {"sideway": _place(n, m, np.sqrt(var) <= std_threshold)}
+
+
+def breakout(c: np.ndarray, lookback: int = 50, breakout_mult: float = 0.015) -> Dict[str, np.ndarray]:
+    n = len(c)
+    if n < lookback + 1:
+        return {"breakout": np.zeros(n, bool)}
+    prev_high = rolling_max(c[:-1], lookback)
+    last = c[lookback:]
+    return {"breakout": _place(n, lookback, (prev_high != 0) & (last > prev_high * (1 + breakout_mult)))}
+
+
+SIGNALS: Dict[str, Callable[..., Dict[str, np.ndarray]]] = {
+    "pump_dump": pump_dump,
+    "stagnant": stagnant,
+    "sideway": sideway,
+    "breakout": breakout,
+}
+
+REFERENCE = {
+    "pump_dump": detectors.detect_pump_dump,
+    "stagnant": detectors.detect_stagnant,
+    "sideway": detectors.detect_sideway,
+    "breakout": detectors.detect_breakout,
+}
+
+
+def rising_edges(mask: np.ndarray) -> np.ndarray:
+    """Index of the first candle of every run of True (one signal per episode, like the notifier dedup)"""
+    return np.flatnonzero(mask & ~np.concatenate(([False], mask[:-1])))
+
+
+def replay(rows: List[List[Any]], name: str, params: Dict[str, Any], points: List[int]) -> int:
+    """
+    Run the original app/detectors.py function on rows[:t+1] for each t in
+    points and count how often its status disagrees with the vectorized mask.
+    """
+    close = np.asarray([float(r[4]) for r in rows])
+    masks = SIGNALS[name](close, **params)
+    mismatches = 0
+    for t in points:
+        status = REFERENCE[name](rows[:t + 1], **params).get("status")
+        for s, mask in masks.items():
+            if bool(mask[t]) != (status == s):
+                mismatches += 1
+    return mismatches
@@ -0,0 +1,42 @@
+# app/benchmarks/__main__.py
+"""
+Run the benchmark suites and write one result file.
+
+    python -m app.benchmarks --out results-$(git rev-parse --short HEAD).json [--api] [--quick]
+    python -m app.benchmarks.compare results-old.json results-new.json
+"""
+
+import argparse
+import asyncio
+
+from app.benchmarks import bench_api, bench_detectors, bench_market_data
+from app.benchmarks.common import print_results, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run detector, market_data (and API) benchmarks")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--api", action="store_true", help="also run the API load test (spawns uvicorn)")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--payloads", help="recorded payload directory for the mock exchange")
+    args = parser.parse_args()
+
+    min_time = 0.05 if args.quick else 0.2
+    results = bench_detectors.run([20, 50, 200], [1, 10, 100], min_time)
+    results.update(bench_market_data.run(args.payloads, min_time))
+    if args.api:
+        port = 8011
+        proc = bench_api.spawn_server(port)
+        try:
+            results.update(asyncio.run(bench_api.run(
+                f"http://127.0.0.1:{port}", bench_api.DEFAULT_ROUTES, 20, 1.0 if args.quick else 5.0,
+            )))
+        finally:
+            proc.terminate()
+            proc.wait(10)
+    print_results(results)
+    write_results(args.out, results)
+
+
+if __name__ == "__main__":
+    main()
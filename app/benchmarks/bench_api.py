@@ -0,0 +1,145 @@
+# app/benchmarks/bench_api.py
+"""
+End-to-end load test of the FastAPI routes.
+
+Tanpa --url: mock exchange + uvicorn (app.main) dijalankan lokal dengan
+SQLite sementara, jadi hasilnya tidak tergantung Indodax / Binance.
+Dengan --url: load test ke server yang sudah jalan.
+
+Per route: `--concurrency` client paralel selama `--duration` detik,
+dilaporkan p50/p95/p99 latency (ms), requests/sec dan jumlah error.
+
+    python -m app.benchmarks.bench_api --out results.json
+    python -m app.benchmarks.bench_api --url http://localhost:8000 --route /market/BTC --concurrency 50
+
+Client and server share the machine in local mode; compare runs made on
+the same host only.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.benchmarks import mock_exchange
+from app.benchmarks.common import percentiles, print_results, write_results
+
+DEFAULT_ROUTES = [
+    "/",
+    "/market/BTC",
+    "/orderbook/indodax/BTC?limit=50",
+    "/orderbook/binance/BTC?limit=50",
+    "/orderbook/merged/BTC?limit=50",
+    "/chart/binance/BTC?limit=500",
+    "/chart/binance/BTC?limit=500&format=columnar",
+    "/signal/",
+]
+
+
+async def load(client: httpx.AsyncClient, route: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                res = await client.get(route)
+                ok = res.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stats = percentiles(latencies, 1e3)
+    return {
+        "metric": "p95_ms",
+        "p50_ms": stats["p50"],
+        "p95_ms": stats["p95"],
+        "p99_ms": stats["p99"],
+        "rps": len(latencies) / elapsed,
+        "requests": len(latencies),
+        "errors": errors,
+    }
+
+
+async def run(url: str, routes: List[str], concurrency: int, duration: float) -> Dict[str, Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        for route in routes:
+            await client.get(route)  # warm-up (cache, koneksi)
+            results[f"api.GET {route}.c{concurrency}"] = await load(client, route, concurrency, duration)
+    return results
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """Mock exchange + uvicorn app.main with a throwaway SQLite DB"""
+    mock = mock_exchange.start(0)
+    tmp = tempfile.mkdtemp(prefix="indotrader-bench-")
+    env = {
+        **os.environ,
+        **mock.base_urls,
+        "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+        "CANDLE_HISTORY_DIR": os.path.join(tmp, "candles"),
+        "STREAM_ENABLED": "0",
+        # mock exchange tidak punya rate limit: jangan ukur waktu tunggu token bucket
+        "BINANCE_WEIGHT_PER_MIN": "1e12",
+        "INDODAX_REQUESTS_PER_MIN": "1e12",
+    }
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        if proc.poll() is not None:
+            break
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API load test")
+    parser.add_argument("--url", help="existing server; default spawns a local one against the mock exchange")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--route", action="append", help="route to test (repeatable), default: all market routes")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per route")
+    parser.add_argument("--out", help="write/merge JSON results into this file")
+    args = parser.parse_args()
+
+    proc: Optional[subprocess.Popen] = None
+    url = args.url
+    if url is None:
+        proc = spawn_server(args.port)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        results = asyncio.run(run(url, args.route or DEFAULT_ROUTES, args.concurrency, args.duration))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(10)
+    print_results(results)
+    if args.out:
+        write_results(args.out, results)
+
+
+if __name__ == "__main__":
+    main()
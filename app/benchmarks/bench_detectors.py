@@ -0,0 +1,116 @@
+# app/benchmarks/bench_detectors.py
+"""
+Micro-benchmarks for app.detectors (plus the batch and streaming engines
+for reference).
+
+Setiap detector dijalankan untuk kombinasi window × jumlah symbol; satu
+"call" = detector dijalankan sekali untuk setiap symbol, seperti satu
+cycle worker.
+
+    python -m app.benchmarks.bench_detectors --out results.json
+    python -m app.benchmarks.bench_detectors --windows 20,200 --symbols 1,100 --quick
+"""
+
+import argparse
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app import detectors
+from app.benchmarks.common import measure, print_results, write_results
+from app.detector.batch import build_matrix, evaluate_batch
+from app.detector.streaming import StreamingDetectors
+
+SERIES_LENGTH = 1000  # candle per symbol
+
+
+def make_series(n_symbols: int, length: int = SERIES_LENGTH, seed: int = 7) -> Dict[str, List[List[Any]]]:
+    """Random-walk kline rows [open_time, open, high, low, close, volume] per symbol"""
+    rng = np.random.default_rng(seed)
+    series = {}
+    for s in range(n_symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, length)))
+        spread = np.abs(rng.normal(0, 0.001, length)) * close
+        rows = []
+        for i in range(length):
+            c = float(close[i])
+            rows.append([i * 60_000, c, c + float(spread[i]), c - float(spread[i]), c, float(rng.uniform(1, 10))])
+        series[f"S{s}"] = rows
+    return series
+
+
+# name → (function(rows, window), uses close prices only)
+DETECTORS: Dict[str, Callable[[List[List[Any]], int], Any]] = {
+    "moving_average": lambda rows, w: detectors.moving_average([r[4] for r in rows], w),
+    "detect_pump_dump": lambda rows, w: detectors.detect_pump_dump(rows, window=w),
+    "detect_stagnant": lambda rows, w: detectors.detect_stagnant(rows, window=w),
+    "detect_sideway": lambda rows, w: detectors.detect_sideway(rows, ma_window=w),
+    "detect_breakout": lambda rows, w: detectors.detect_breakout(rows, lookback=w),
+    "simple_support_resistance": lambda rows, w: detectors.simple_support_resistance(rows, window=w),
+}
+
+
+def window_params(w: int) -> Dict[str, Dict[str, Any]]:
+    """Detector params with every window set to w"""
+    return {
+        "pump_dump": {"pump_threshold": 0.07, "window": w},
+        "stagnant": {"threshold": 0.02, "window": w},
+        "sideway": {"ma_window": w, "std_threshold": 0.008},
+        "breakout": {"lookback": w, "breakout_mult": 0.01},
+        "support_resistance": {"window": w},
+    }
+
+
+def streaming_tick(series: Dict[str, List[List[Any]]], w: int) -> Callable[[], Any]:
+    """One live-candle tick + results() per symbol on detectors warmed with the series"""
+    states = []
+    for rows in series.values():
+        det = StreamingDetectors(window_params(w))
+        for row in rows:
+            det.update_row(row)
+        states.append((det, rows[-1]))
+
+    def tick():
+        for det, last in states:
+            det.update(last[0], last[2], last[3], last[4])
+            det.results()
+    return tick
+
+
+def run(windows: List[int], symbol_counts: List[int], min_time: float) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for n in symbol_counts:
+        series = make_series(n)
+        all_rows = list(series.values())
+        for name, fn in DETECTORS.items():
+            for w in windows:
+                results[f"detectors.{name}.w{w}.s{n}"] = measure(lambda: [fn(rows, w) for rows in all_rows], min_time)
+        results[f"detectors.evaluate_batch.default.s{n}"] = measure(
+            lambda: evaluate_batch(build_matrix(series)), min_time
+        )
+        for w in windows:
+            # biaya per tick tidak boleh naik dengan window
+            results[f"detectors.streaming_tick.w{w}.s{n}"] = measure(streaming_tick(series, w), min_time)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detector micro-benchmarks")
+    parser.add_argument("--windows", default="20,50,200")
+    parser.add_argument("--symbols", default="1,10,100")
+    parser.add_argument("--quick", action="store_true", help="shorter measurement per case")
+    parser.add_argument("--out", help="write/merge JSON results into this file")
+    args = parser.parse_args()
+
+    results = run(
+        [int(w) for w in args.windows.split(",")],
+        [int(s) for s in args.symbols.split(",")],
+        0.05 if args.quick else 0.2,
+    )
+    print_results(results)
+    if args.out:
+        write_results(args.out, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# app/benchmarks/bench_market_data.py
+"""
+Benchmarks for the market_data parse / convert paths.
+
+- parse.*   : parser saja, payload sudah di memory (json.loads termasuk)
+- fetch.*   : _fetch_* sync lewat requests ke mock server lokal (tanpa cache)
+- async.*   : versi httpx (market_data_async) ke mock server yang sama
+- encode.*  : response encoding chart (rows / columnar / msgpack)
+
+    python -m app.benchmarks.bench_market_data --out results.json [--payloads payloads/]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from typing import Any, Dict
+
+from app.benchmarks import mock_exchange
+from app.benchmarks.common import measure, print_results, write_results
+
+UNLIMITED = 1e12  # token/menit: mock server tidak punya rate limit
+
+
+def run(payload_dir: str, min_time: float) -> Dict[str, Dict[str, Any]]:
+    server = mock_exchange.start(0, payload_dir)
+    # base URL dibaca saat import, jadi set env sebelum import market_data
+    os.environ.update(server.base_urls)
+    from app.services import market_data as md
+    from app.services import market_data_async as mda
+    from app.services import ratelimit
+    from app.services.serialization import encode
+    from starlette.requests import Request
+
+    if md.BINANCE_BASE != server.base_urls["BINANCE_BASE"]:
+        raise RuntimeError("market_data was imported before the mock server started")
+
+    # yang diukur fetch, bukan waktu tunggu token bucket per exchange
+    buckets = dict(ratelimit.BUCKETS)
+    ratelimit.BUCKETS.update({name: ratelimit.TokenBucket(name, UNLIMITED) for name in buckets})
+
+    raw = {name: json.dumps(p) for name, p in server.payloads.items()}
+    depth = server.payloads["binance_depth"]
+    rate = md.parse_usdt_idr_rate(server.payloads["usdt_idr"])
+    results = {}
+
+    def case(name, fn):
+        results[f"market_data.{name}"] = measure(fn, min_time)
+
+    # parse (decode + parse, tanpa network)
+    case("parse.indodax_ticker", lambda: md.parse_indodax_ticker("btc_idr", json.loads(raw["indodax_ticker"])))
+    case("parse.indodax_orderbook", lambda: md.parse_indodax_orderbook("btc_idr", json.loads(raw["indodax_depth"]), 50))
+    case("parse.binance_orderbook.1000", lambda: md.parse_binance_orderbook("BTC", json.loads(raw["binance_depth"])))
+    case("parse.ohlcv.1000", lambda: md.parse_ohlcv("BTC", "1m", json.loads(raw["binance_klines"])))
+    for n in (50, 1000):
+        ob = md.parse_binance_orderbook("BTC", {**depth, "asks": depth["asks"][:n], "bids": depth["bids"][:n]})
+        case(f"convert.build_idr_orderbook.{n}", lambda ob=ob: md.build_idr_orderbook("BTC", ob, rate))
+
+    # sync fetch via mock server
+    case("fetch.indodax_ticker", lambda: md._fetch_indodax_ticker("btc_idr"))
+    case("fetch.usdt_idr_rate", md._fetch_usdt_idr_rate)
+    case("fetch.binance_orderbook.100", lambda: md._fetch_binance_orderbook_usdt("BTC", 100))
+    case("fetch.ohlcv.500", lambda: md._fetch_ohlcv_binance("BTC", "1m", 500))
+
+    def convert_uncached():
+        md.CACHE.clear()
+        return md.convert_binance_orderbook_to_idr("BTC", 100)
+
+    case("fetch.convert_binance_orderbook_to_idr.100", convert_uncached)
+
+    # async (httpx pool) via mock server
+    loop = asyncio.new_event_loop()
+
+    async def async_convert():
+        md.CACHE.clear()
+        return await mda.convert_binance_orderbook_to_idr("BTC", 100)
+
+    case("async.convert_binance_orderbook_to_idr.100", lambda: loop.run_until_complete(async_convert()))
+    case("async.ohlcv.500", lambda: loop.run_until_complete(mda._fetch_ohlcv_binance("BTC", "1m", 500)))
+    loop.run_until_complete(mda.aclose())
+    loop.close()
+
+    # response encoding chart
+    chart = md.parse_ohlcv("BTC", "1m", server.payloads["binance_klines"][-500:])
+    json_req = Request({"type": "http", "headers": [(b"accept", b"application/json")]})
+    msgpack_req = Request({"type": "http", "headers": [(b"accept", b"application/msgpack")]})
+    case("encode.chart.rows.500", lambda: encode(json_req, chart))
+    case("encode.chart.columnar.500", lambda: encode(json_req, chart, "columnar"))
+    case("encode.chart.msgpack_columnar.500", lambda: encode(msgpack_req, chart, "columnar"))
+
+    ratelimit.BUCKETS.update(buckets)
+    server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="market_data parse/convert benchmarks against a mock exchange")
+    parser.add_argument("--payloads", help="directory with recorded payloads (mock_exchange record)")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--out", help="write/merge JSON results into this file")
+    args = parser.parse_args()
+
+    results = run(args.payloads, 0.05 if args.quick else 0.2)
+    print_results(results)
+    if args.out:
+        write_results(args.out, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# app/benchmarks/bench_signal_writer.py
+"""
+Signal insert throughput: per-row add/commit/refresh (cara lama worker)
+vs SignalWriter bulk flush.
+
+    DATABASE_URL=postgresql://... python -m app.benchmarks.bench_signal_writer --rows 5000
+    python -m app.benchmarks.bench_signal_writer            # SQLite file di /tmp
+
+Rows written by the benchmark are deleted afterwards (symbol "BENCH*").
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.gettempdir(), "indotrader_bench.db")
+
+from sqlalchemy import delete  # noqa: E402
+
+from app.benchmarks.common import write_results  # noqa: E402
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.model import Signal  # noqa: E402
+from app.services.signal_writer import SignalWriter  # noqa: E402
+
+
+def per_row(rows: int) -> float:
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        for i in range(rows):
+            s = Signal(symbol=f"BENCH{i % 50}", signal_type="pump", confidence=0.5)
+            db.add(s)
+            db.commit()
+            db.refresh(s)
+    finally:
+        db.close()
+    return time.perf_counter() - start
+
+
+def bulk(rows: int, batch_size: int) -> float:
+    ids = []
+    writer = SignalWriter(batch_size=batch_size, flush_interval=1.0)
+    writer.listeners.append(lambda saved: ids.extend(s.id for s in saved))
+    start = time.perf_counter()
+    for i in range(rows):
+        writer.add(f"BENCH{i % 50}", "pump", 0.5, meta={"text": str(i)})
+    writer.close()
+    elapsed = time.perf_counter() - start
+    assert len(ids) == rows and None not in ids, "missing ids"
+    return elapsed
+
+
+def cleanup():
+    with engine.begin() as conn:
+        conn.execute(delete(Signal).where(Signal.symbol.like("BENCH%")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-row vs bulk signal inserts")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--out", help="write/merge JSON results into this file")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}, rows: {args.rows}")
+    results = {}
+    try:
+        for name, run in (("per_row_commit", lambda: per_row(args.rows)), ("bulk_writer", lambda: bulk(args.rows, args.batch_size))):
+            elapsed = run()
+            print(f"{name:<16} {elapsed:8.3f}s  {args.rows / elapsed:10.0f} rows/s")
+            results[f"signal_writer.{name}.{engine.dialect.name}"] = {
+                "metric": "us_per_row", "us_per_row": elapsed / args.rows * 1e6, "rows_per_s": args.rows / elapsed,
+            }
+    finally:
+        cleanup()
+    if args.out:
+        write_results(args.out, results)
+
+
+if __name__ == "__main__":
+    main()
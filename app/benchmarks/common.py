@@ -0,0 +1,88 @@
+# app/benchmarks/common.py
+"""
+Timing helpers and the JSON result format shared by the benchmark suites.
+
+Result file:
+
+    {"meta": {"commit": ..., "python": ..., "created_at": ...},
+     "results": {"<suite>.<case>": {"metric": "p50_us", "p50_us": ..., ...}}}
+
+Every entry names its primary metric (lower is better); compare.py uses
+that to spot regressions between two result files.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+
+def percentiles(samples: List[float], scale: float = 1.0) -> Dict[str, float]:
+    a = np.asarray(samples, dtype=np.float64) * scale
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(a.mean()), "min": float(a.min())}
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.2, max_runs: int = 10000) -> Dict[str, Any]:
+    """
+    Call fn repeatedly for about min_time seconds (at least 5 runs, after
+    one warm-up call). Returns per-call timings in microseconds.
+    """
+    fn()
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < 5 or (time.perf_counter() < deadline and len(samples) < max_runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    stats = percentiles(samples, 1e6)
+    return {
+        "metric": "p50_us",
+        "p50_us": stats["p50"],
+        "p95_us": stats["p95"],
+        "mean_us": stats["mean"],
+        "min_us": stats["min"],
+        "runs": len(samples),
+    }
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def meta() -> Dict[str, Any]:
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def write_results(path: str, results: Dict[str, Dict[str, Any]]):
+    """Merge results into path (keeps entries of other suites already in the file)"""
+    data = {"meta": meta(), "results": {}}
+    if os.path.exists(path):
+        with open(path) as f:
+            data["results"] = json.load(f).get("results", {})
+    data["results"].update(results)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    print(f"Wrote {len(results)} results to {path}")
+
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    for name, r in results.items():
+        metric = r["metric"]
+        extra = "  ".join(f"{k}={v:.1f}" for k, v in r.items() if k not in ("metric", metric) and isinstance(v, float))
+        print(f"{name:<60} {metric}={r[metric]:>10.1f}  {extra}")
@@ -0,0 +1,56 @@
+# app/benchmarks/compare.py
+"""
+Compare two benchmark result files (e.g. from two commits).
+
+    python -m app.benchmarks.compare base.json new.json --threshold 0.15
+
+Uses each entry's primary metric (lower is better). Exits with status 1
+if any case got slower than base by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 = 10%%")
+    parser.add_argument("--filter", default="", help="only cases containing this substring")
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    print(f"base: {base['meta'].get('commit')}  new: {new['meta'].get('commit')}")
+    regressions = 0
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        if args.filter not in name:
+            continue
+        b, n = base["results"].get(name), new["results"].get(name)
+        if b is None or n is None:
+            print(f"{name:<60} {'only in ' + ('new' if b is None else 'base'):>30}")
+            continue
+        metric = n["metric"]
+        old_v, new_v = b.get(metric), n[metric]
+        if not old_v:
+            continue
+        change = new_v / old_v - 1
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<60} {metric}: {old_v:>10.1f} -> {new_v:>10.1f}  {change * 100:+7.1f}%{flag}")
+    print(f"{regressions} regression(s) over {args.threshold * 100:.0f}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# app/benchmarks/mock_exchange.py
+"""
+Local mock of the Indodax / Binance REST endpoints used by market_data.
+
+Payload diambil dari direktori rekaman (`record` menyimpan response asli)
+atau, kalau belum ada, dibuat deterministik dengan bentuk yang sama.
+Response sudah di-encode sekali di awal, jadi server hampir tidak makan
+CPU dan yang terukur adalah sisi client (parse / convert).
+
+    python -m app.benchmarks.mock_exchange record --dir payloads/
+    python -m app.benchmarks.mock_exchange serve --port 8900 --dir payloads/
+    INDODAX_BASE=http://127.0.0.1:8900/api BINANCE_BASE=http://127.0.0.1:8900/api/v3 uvicorn app.main:app
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+PAYLOADS = (
+    "indodax_ticker", "indodax_depth", "usdt_idr", "indodax_summaries",
+    "binance_price", "binance_depth", "binance_klines", "binance_book_ticker",
+)
+
+LIVE_URLS = {
+    "indodax_ticker": "https://indodax.com/api/ticker/btc_idr",
+    "indodax_depth": "https://indodax.com/api/btc_idr/depth",
+    "usdt_idr": "https://indodax.com/api/ticker/usdt_idr",
+    "indodax_summaries": "https://indodax.com/api/summaries",
+    "binance_price": "https://api.binance.com/api/v3/ticker/price?symbol=BTCUSDT",
+    "binance_depth": "https://api.binance.com/api/v3/depth?symbol=BTCUSDT&limit=1000",
+    "binance_klines": "https://api.binance.com/api/v3/klines?symbol=BTCUSDT&interval=1m&limit=1000",
+    "binance_book_ticker": "https://api.binance.com/api/v3/ticker/bookTicker",
+}
+
+
+def synthetic_payloads(seed: int = 42) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    price = 65000.0
+    rate = 16250.0
+
+    def levels(start: float, step: float, n: int):
+        return [[f"{start + i * step:.2f}", f"{rng.uniform(0.001, 2):.8f}"] for i in range(n)]
+
+    klines = []
+    t = 1_700_000_000_000
+    p = price
+    for i in range(1000):
+        o = p
+        p = p * (1 + rng.gauss(0, 0.001))
+        hi, lo = max(o, p) * 1.0005, min(o, p) * 0.9995
+        vol = rng.uniform(1, 50)
+        klines.append([
+            t + i * 60_000, f"{o:.2f}", f"{hi:.2f}", f"{lo:.2f}", f"{p:.2f}", f"{vol:.8f}",
+            t + i * 60_000 + 59_999, f"{vol * p:.8f}", rng.randint(100, 5000),
+            f"{vol / 2:.8f}", f"{vol * p / 2:.8f}", "0",
+        ])
+    idr = price * rate
+    # scanner: ~300 pair, sebagian hanya ada di salah satu exchange
+    summaries = {"usdt_idr": {"last": f"{rate:.0f}", "buy": f"{rate - 5:.0f}", "sell": f"{rate + 5:.0f}", "vol_idr": "1000000000"}}
+    book_ticker = []
+    for i in range(300):
+        coin = f"C{i:03d}"
+        usdt = rng.uniform(0.01, 500)
+        if i % 10:
+            idr_last = usdt * rate * (1 + rng.gauss(0, 0.01))
+            summaries[f"{coin.lower()}_idr"] = {
+                "last": f"{idr_last:.2f}", "buy": f"{idr_last * 0.999:.2f}", "sell": f"{idr_last * 1.001:.2f}",
+                "vol_idr": f"{rng.uniform(1e6, 1e10):.0f}",
+            }
+        if i % 7:
+            book_ticker.append({
+                "symbol": f"{coin}USDT", "bidPrice": f"{usdt * 0.9995:.8f}", "bidQty": "1.0",
+                "askPrice": f"{usdt * 1.0005:.8f}", "askQty": "1.0",
+            })
+    ticker = {
+        "high": f"{idr * 1.02:.0f}", "low": f"{idr * 0.98:.0f}", "vol_btc": "123.45",
+        "vol_idr": f"{idr * 123.45:.0f}", "last": f"{idr:.0f}", "buy": f"{idr - 1000:.0f}",
+        "sell": f"{idr + 1000:.0f}", "server_time": 1700000000,
+    }
+    return {
+        "indodax_ticker": {"ticker": ticker},
+        "indodax_depth": {
+            "asks": levels(idr + 1000, 1000, 150),
+            "bids": levels(idr - 1000, -1000, 150),
+        },
+        "usdt_idr": {"ticker": {**ticker, "last": f"{rate:.0f}", "high": "16300", "low": "16200"}},
+        "indodax_summaries": {"tickers": summaries},
+        "binance_price": {"symbol": "BTCUSDT", "price": f"{price:.8f}"},
+        "binance_depth": {
+            "lastUpdateId": 1027024,
+            "bids": levels(price - 0.01, -0.01, 1000),
+            "asks": levels(price + 0.01, 0.01, 1000),
+        },
+        "binance_klines": klines,
+        "binance_book_ticker": book_ticker,
+    }
+
+
+def load_payloads(directory: Optional[str]) -> Dict[str, Any]:
+    """Recorded payloads from directory, synthetic ones for anything missing"""
+    payloads = synthetic_payloads()
+    if directory:
+        for name in PAYLOADS:
+            path = os.path.join(directory, f"{name}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    payloads[name] = json.load(f)
+    return payloads
+
+
+def record(directory: str):
+    os.makedirs(directory, exist_ok=True)
+    for name, url in LIVE_URLS.items():
+        try:
+            res = requests.get(url, timeout=10)
+            res.raise_for_status()
+        except Exception as e:
+            print("Record error:", name, e)
+            continue
+        with open(os.path.join(directory, f"{name}.json"), "w") as f:
+            f.write(res.text)
+        print(f"{name}: {len(res.content)} bytes")
+
+
+class MockExchange(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], payloads: Dict[str, Any], latency: float = 0.0):
+        super().__init__(address, MockHandler)
+        self.latency = latency
+        self.payloads = payloads
+        self.encoded = {name: json.dumps(p).encode() for name, p in payloads.items()}
+
+    @property
+    def base_urls(self) -> Dict[str, str]:
+        host, port = self.server_address[:2]
+        return {"INDODAX_BASE": f"http://{host}:{port}/api", "BINANCE_BASE": f"http://{host}:{port}/api/v3"}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, seperti upstream asli
+    disable_nagle_algorithm = True  # header & body ditulis terpisah; tanpa ini +40ms (delayed ACK)
+    server: MockExchange
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        limit = int(query["limit"][0]) if "limit" in query else None
+        path = url.path
+        if path.startswith("/api/v3/"):
+            endpoint = path[len("/api/v3/"):]
+            if endpoint == "ticker/price":
+                body = self.server.encoded["binance_price"]
+            elif endpoint == "ticker/bookTicker":
+                body = self.server.encoded["binance_book_ticker"]
+            elif endpoint == "depth":
+                body = self._limited("binance_depth", limit, book=True)
+            elif endpoint == "klines":
+                body = self._limited("binance_klines", limit)
+            else:
+                return self._send(404, b'{"code":-1,"msg":"not found"}')
+        elif path == "/api/summaries":
+            body = self.server.encoded["indodax_summaries"]
+        elif path == "/api/ticker/usdt_idr":
+            body = self.server.encoded["usdt_idr"]
+        elif path.startswith("/api/ticker/"):
+            body = self.server.encoded["indodax_ticker"]
+        elif path.startswith("/api/") and path.endswith("/depth"):
+            body = self.server.encoded["indodax_depth"]
+        else:
+            return self._send(404, b'{"error":"not found"}')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self._send(200, body)
+
+    def _limited(self, name: str, limit: Optional[int], book: bool = False) -> bytes:
+        if limit is None:
+            return self.server.encoded[name]
+        p = self.server.payloads[name]
+        if book:
+            return json.dumps({**p, "asks": p["asks"][:limit], "bids": p["bids"][:limit]}).encode()
+        return json.dumps(p[-limit:]).encode()
+
+    def _send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start(port: int = 0, directory: Optional[str] = None, latency: float = 0.0) -> MockExchange:
+    """Start the mock in a daemon thread; port 0 picks a free port"""
+    server = MockExchange(("127.0.0.1", port), load_payloads(directory), latency)
+    threading.Thread(target=server.serve_forever, name="mock-exchange", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Indodax / Binance REST server")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record", help="save live responses as payload files")
+    rec.add_argument("--dir", required=True)
+    srv = sub.add_parser("serve")
+    srv.add_argument("--port", type=int, default=8900)
+    srv.add_argument("--dir")
+    srv.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        record(args.dir)
+        return
+    server = start(args.port, args.dir, args.latency)
+    print(" ".join(f"{k}={v}" for k, v in server.base_urls.items()))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
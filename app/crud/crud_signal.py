@@ -1,5 +1,10 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, func, select, tuple_
 from sqlalchemy.orm import Session
-from app.model import Signal
+from app.model import RollupWatermark, Signal, SignalRollup
 from app.schemas import SignalCreate
 
 def create_signal(db: Session, data: SignalCreate):
@@ -9,5 +14,112 @@ def create_signal(db: Session, data: SignalCreate):
     db.refresh(signal)
     return signal
 
-def get_signals(db: Session):
-    return db.query(Signal).order_by(Signal.created_at.desc()).limit(10).all()
+def encode_cursor(signal: Signal) -> str:
+    raw = f"{signal.created_at.isoformat()}|{signal.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, _, signal_id = raw.partition("|")
+        return datetime.fromisoformat(created_at), int(signal_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"invalid cursor: {cursor}") from e
+
+def signals_query(
+    symbol: Optional[str] = None,
+    signal_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    timeframe: Optional[str] = None,
+) -> Select:
+    """
+    Newest first, keyset-paginated on (created_at, id); fetches limit + 1
+    rows to know whether there is a next page. Shared by the sync and async
+    CRUD (app.crud.crud_signal_async).
+    Index range scan on ix_signals_symbol_created_at / ix_signals_created_at_id,
+    jadi biaya per halaman tidak tergantung ukuran tabel atau posisi halaman.
+    """
+    q = select(Signal)
+    if symbol:
+        q = q.where(Signal.symbol == symbol)
+    if signal_type:
+        q = q.where(Signal.signal_type == signal_type)
+    if timeframe:
+        q = q.where(Signal.timeframe == timeframe)
+    if start:
+        q = q.where(Signal.created_at >= start)
+    if end:
+        q = q.where(Signal.created_at < end)
+    if cursor:
+        created_at, signal_id = decode_cursor(cursor)
+        q = q.where(tuple_(Signal.created_at, Signal.id) < tuple_(created_at, signal_id))
+    return q.order_by(Signal.created_at.desc(), Signal.id.desc()).limit(limit + 1)
+
+def page(rows: List[Signal], limit: int) -> Tuple[List[Signal], Optional[str]]:
+    """(rows, next_cursor); next_cursor is None on the last page"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+def get_signals(
+    db: Session,
+    symbol: Optional[str] = None,
+    signal_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    timeframe: Optional[str] = None,
+) -> Tuple[List[Signal], Optional[str]]:
+    """Returns (rows, next_cursor), see signals_query. Raises ValueError for a bad cursor."""
+    q = signals_query(symbol, signal_type, start, end, limit, cursor, timeframe)
+    return page(list(db.scalars(q)), limit)
+
+def signal_stats_query(
+    bucket: str = "hour",
+    symbol: Optional[str] = None,
+    signal_type: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 500,
+) -> Select:
+    """
+    Count + average confidence per (bucket, symbol, signal_type), newest
+    bucket first, read from signal_rollups (app.services.rollups) instead of
+    signals: range scan on the PK / ix_signal_rollups_symbol_bucket, jadi
+    latency tergantung jumlah bucket yang diminta, bukan ukuran tabel signals.
+    Timeframes are summed unless one is given.
+    """
+    r = SignalRollup
+    q = select(
+        r.bucket, r.symbol, r.signal_type,
+        func.sum(r.count).label("count"),
+        (func.sum(r.confidence_sum) / func.nullif(func.sum(r.confidence_count), 0)).label("avg_confidence"),
+    ).where(r.bucket_size == bucket)
+    if symbol:
+        q = q.where(r.symbol == symbol)
+    if signal_type:
+        q = q.where(r.signal_type == signal_type)
+    if timeframe:
+        q = q.where(r.timeframe == timeframe)
+    if start:
+        q = q.where(r.bucket >= start)
+    if end:
+        q = q.where(r.bucket < end)
+    q = q.group_by(r.bucket, r.symbol, r.signal_type)
+    return q.order_by(r.bucket.desc(), r.symbol, r.signal_type).limit(limit)
+
+def watermark_query() -> Select:
+    return select(RollupWatermark.last_id, RollupWatermark.updated_at).where(RollupWatermark.name == "signal_rollups")
+
+def get_signal_stats(db: Session, bucket: str = "hour", **filters) -> dict:
+    """{"rows": [...], "last_id": .., "updated_at": ..}, see signal_stats_query"""
+    rows = [dict(r._mapping) for r in db.execute(signal_stats_query(bucket, **filters))]
+    wm = db.execute(watermark_query()).first()
+    return {"rows": rows, "last_id": wm.last_id if wm else 0, "updated_at": wm.updated_at if wm else None}
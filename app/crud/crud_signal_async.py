@@ -0,0 +1,44 @@
+# app/crud/crud_signal_async.py
+"""
+Async version of app.crud.crud_signal (AsyncSession, app.db.get_async_db).
+Same function names and return shapes; the queries are shared.
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_signal import page, signal_stats_query, signals_query, watermark_query
+from app.model import Signal
+from app.schemas import SignalCreate
+
+
+async def create_signal(db: AsyncSession, data: SignalCreate) -> Signal:
+    signal = Signal(**data.dict())
+    db.add(signal)
+    await db.commit()
+    await db.refresh(signal)
+    return signal
+
+
+async def get_signals(
+    db: AsyncSession,
+    symbol: Optional[str] = None,
+    signal_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    timeframe: Optional[str] = None,
+) -> Tuple[List[Signal], Optional[str]]:
+    """Returns (rows, next_cursor). Raises ValueError for a bad cursor."""
+    q = signals_query(symbol, signal_type, start, end, limit, cursor, timeframe)
+    return page(list(await db.scalars(q)), limit)
+
+
+async def get_signal_stats(db: AsyncSession, bucket: str = "hour", **filters) -> dict:
+    """{"rows": [...], "last_id": .., "updated_at": ..}, see crud_signal.signal_stats_query"""
+    rows = [dict(r._mapping) for r in await db.execute(signal_stats_query(bucket, **filters))]
+    wm = (await db.execute(watermark_query())).first()
+    return {"rows": rows, "last_id": wm.last_id if wm else 0, "updated_at": wm.updated_at if wm else None}
@@ -1,9 +1,19 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.model import User
 from app.auth.security import hash_password
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+def user_by_username_query(username: str):
+    return select(User).where(User.username == username).limit(1)
+
+def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    return db.scalars(user_by_username_query(username)).first()
+
+async def get_user_by_username_async(db: AsyncSession, username: str) -> Optional[User]:
+    return (await db.scalars(user_by_username_query(username))).first()
 
 def create_admin(db: Session, username: str, email: str, password: str):
     hashed = hash_password(password)
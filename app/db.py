@@ -1,10 +1,56 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
+from app.metrics import instrument_engine, pool_collector
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Pool (per proses; uvicorn/gunicorn worker × pool_size + max_overflow harus < max_connections Postgres)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # detik menunggu checkout sebelum error
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # detik; di bawah idle timeout PgBouncer / LB
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "500"))  # prepared statement per koneksi (asyncpg)
+
+
+def sync_url(url: str) -> str:
+    """URL for the sync engine / Alembic, also when DATABASE_URL names an async driver"""
+    u = make_url(url)
+    if u.drivername in ("postgresql+asyncpg", "postgres"):
+        u = u.set(drivername="postgresql")
+    elif u.drivername == "sqlite+aiosqlite":
+        u = u.set(drivername="sqlite")
+    return u.render_as_string(hide_password=False)
+
+
+def async_url(url: str) -> str:
+    """postgresql:// → postgresql+asyncpg://, sqlite:// → sqlite+aiosqlite://"""
+    u = make_url(sync_url(url))
+    if u.get_backend_name() == "postgresql":
+        u = u.set(drivername="postgresql+asyncpg")
+        u = u.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE)})
+    elif u.get_backend_name() == "sqlite":
+        u = u.set(drivername="sqlite+aiosqlite")
+    return u.render_as_string(hide_password=False)
+
+
+def pool_options(url: str) -> dict:
+    options = {"pool_pre_ping": True}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+
+engine = create_engine(sync_url(DATABASE_URL), **pool_options(DATABASE_URL))
+instrument_engine(engine)
+pool_collector(engine, "sync")
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
@@ -17,3 +63,41 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# -------------------------------------------------------------------
+# ASYNC (API routes: /signal, /auth). Dibuat saat pertama dipakai, jadi
+# worker / Alembic tidak butuh asyncpg.
+# -------------------------------------------------------------------
+_async_engine = None
+_async_sessionmaker = None
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(async_url(DATABASE_URL), **pool_options(DATABASE_URL))
+        instrument_engine(_async_engine.sync_engine)
+        pool_collector(_async_engine.sync_engine, "async")
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    """Close pooled async connections (call on app shutdown)"""
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
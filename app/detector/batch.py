@@ -0,0 +1,195 @@
+# app/detector/batch.py
+"""
+Vectorized detector engine.
+
+Semua symbol dievaluasi sekaligus: candle disusun jadi matrix
+symbols × candles (numpy), lalu tiap detector dihitung satu kali untuk
+seluruh matrix. Hasilnya dict status yang sama persis bentuknya dengan
+fungsi di app/detectors.py (yang tetap jadi referensi pure-Python).
+
+Series shorter than the matrix are left-padded with NaN; `counts` holds the
+number of real candles per symbol so the "not enough data" cases match.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from app.metrics import DETECTOR_SECONDS, timer
+
+DEFAULT_PARAMS: Dict[str, Dict[str, Any]] = {
+    "pump_dump": {"pump_threshold": 0.07, "window": 5},
+    "stagnant": {"threshold": 0.02, "window": 30},
+    "sideway": {"ma_window": 20, "std_threshold": 0.008},
+    "breakout": {"lookback": 50, "breakout_mult": 0.01},
+    "support_resistance": {"window": 50},
+}
+
+NOT_ENOUGH = {"status": "unknown", "reason": "not enough data"}
+
+
+class OHLCVBatch(NamedTuple):
+    symbols: List[str]
+    high: np.ndarray    # (S, T)
+    low: np.ndarray     # (S, T)
+    close: np.ndarray   # (S, T)
+    counts: np.ndarray  # (S,) real candles per row
+
+
+def _columns(series) -> Dict[int, np.ndarray]:
+    """high/low/close of a CandleBuffer or raw kline rows as float arrays"""
+    if hasattr(series, "column"):
+        return {i: series.column(i) for i in (2, 3, 4)}
+    rows = np.asarray([r[2:5] for r in series], dtype=np.float64).reshape(-1, 3)
+    return {2: rows[:, 0], 3: rows[:, 1], 4: rows[:, 2]}
+
+
+def build_matrix(series: Dict[str, Any], length: Optional[int] = None) -> OHLCVBatch:
+    """
+    Stack symbol → candles (CandleBuffer or raw Binance rows) into one batch,
+    keeping the last `length` candles (default: longest series).
+    """
+    symbols = list(series)
+    cols = [_columns(series[s]) for s in symbols]
+    if length is None:
+        length = max((len(c[4]) for c in cols), default=0)
+
+    shape = (len(symbols), length)
+    high = np.full(shape, np.nan)
+    low = np.full(shape, np.nan)
+    close = np.full(shape, np.nan)
+    counts = np.zeros(len(symbols), dtype=np.int64)
+    for i, c in enumerate(cols):
+        n = min(len(c[4]), length)
+        counts[i] = n
+        if n:
+            high[i, length - n:] = c[2][-n:]
+            low[i, length - n:] = c[3][-n:]
+            close[i, length - n:] = c[4][-n:]
+    return OHLCVBatch(symbols, high, low, close, counts)
+
+
+# -------------------------------------------------------------------
+# DETECTORS (satu pass untuk semua symbol)
+# -------------------------------------------------------------------
+def batch_pump_dump(b: OHLCVBatch, pump_threshold: float = 0.10, window: int = 5) -> List[Dict[str, Any]]:
+    if b.close.shape[1] < window + 1:
+        return [dict(NOT_ENOUGH) for _ in b.symbols]
+    start = b.close[:, -(window + 1)]
+    end = b.close[:, -1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(start != 0, (end - start) / start, 0.0)
+
+    out = []
+    for enough, p in zip(b.counts >= window + 1, pct.tolist()):
+        if not enough:
+            out.append(dict(NOT_ENOUGH))
+        elif p >= pump_threshold:
+            out.append({"status": "pump", "pct": p})
+        elif p <= -pump_threshold:
+            out.append({"status": "dump", "pct": p})
+        else:
+            out.append({"status": "none", "pct": p})
+    return out
+
+
+def batch_stagnant(b: OHLCVBatch, threshold: float = 0.02, window: int = 20) -> List[Dict[str, Any]]:
+    if b.close.shape[1] < window:
+        return [dict(NOT_ENOUGH) for _ in b.symbols]
+    win = b.close[:, -window:]
+    maxi = win.max(axis=1)
+    mini = win.min(axis=1)
+    total = maxi + mini
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.where(total != 0, (maxi - mini) / (total / 2), 0.0)
+
+    out = []
+    for enough, f in zip(b.counts >= window, frac.tolist()):
+        if not enough:
+            out.append(dict(NOT_ENOUGH))
+        else:
+            out.append({"status": "stagnant" if f <= threshold else "active", "range_frac": f})
+    return out
+
+
+def batch_sideway(b: OHLCVBatch, ma_window: int = 20, std_threshold: float = 0.01) -> List[Dict[str, Any]]:
+    if b.close.shape[1] < ma_window:
+        return [dict(NOT_ENOUGH) for _ in b.symbols]
+    win = b.close[:, -ma_window:]
+    prev = win[:, :-1]
+    valid = prev != 0  # sama seperti versi pure-Python: return dengan prev 0 di-skip
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(valid, (win[:, 1:] - prev) / prev, 0.0)
+    n = valid.sum(axis=1)
+    safe_n = np.maximum(n, 1)
+    mean = returns.sum(axis=1) / safe_n
+    dev = np.where(valid, returns - mean[:, None], 0.0)
+    std = np.sqrt((dev * dev).sum(axis=1) / safe_n)
+
+    out = []
+    for enough, k, s in zip(b.counts >= ma_window, n.tolist(), std.tolist()):
+        if not enough:
+            out.append(dict(NOT_ENOUGH))
+        elif not k:
+            out.append({"status": "unknown", "reason": "no returns"})
+        else:
+            out.append({"status": "sideway" if s <= std_threshold else "trend", "std": s})
+    return out
+
+
+def batch_breakout(b: OHLCVBatch, lookback: int = 50, breakout_mult: float = 0.015) -> List[Dict[str, Any]]:
+    if b.close.shape[1] < lookback + 1:
+        return [dict(NOT_ENOUGH) for _ in b.symbols]
+    prev_high = b.close[:, -(lookback + 1):-1].max(axis=1)
+    last = b.close[:, -1]
+
+    out = []
+    for enough, ph, l in zip(b.counts >= lookback + 1, prev_high.tolist(), last.tolist()):
+        if not enough:
+            out.append(dict(NOT_ENOUGH))
+        elif ph and l > ph * (1 + breakout_mult):
+            out.append({"status": "breakout", "last": l, "prev_high": ph})
+        elif ph and l < ph * (1 - breakout_mult):
+            out.append({"status": "below_resistance", "last": l, "prev_high": ph})
+        else:
+            out.append({"status": "no_breakout", "last": l, "prev_high": ph})
+    return out
+
+
+def batch_support_resistance(b: OHLCVBatch, window: int = 50) -> List[Dict[str, Any]]:
+    if b.close.shape[1] < window:
+        return [{"reason": "not enough data"} for _ in b.symbols]
+    k = min(3, window)
+    lows = np.sort(np.partition(b.low[:, -window:], k - 1, axis=1)[:, :k], axis=1)
+    highs = -np.sort(np.partition(-b.high[:, -window:], k - 1, axis=1)[:, :k], axis=1)
+    support = lows.sum(axis=1) / k
+    resistance = highs.sum(axis=1) / k
+
+    out = []
+    for enough, s, r in zip(b.counts >= window, support.tolist(), resistance.tolist()):
+        if not enough:
+            out.append({"reason": "not enough data"})
+        else:
+            out.append({"support": s, "resistance": r})
+    return out
+
+
+BATCH_DETECTORS = {
+    "pump_dump": batch_pump_dump,
+    "stagnant": batch_stagnant,
+    "sideway": batch_sideway,
+    "breakout": batch_breakout,
+    "support_resistance": batch_support_resistance,
+}
+
+
+def evaluate_batch(b: OHLCVBatch, params: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Run every detector in `params` over the batch → {symbol: {detector: status dict}}"""
+    params = DEFAULT_PARAMS if params is None else params
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {s: {} for s in b.symbols}
+    for name, kwargs in params.items():
+        with timer(DETECTOR_SECONDS.labels(name)):
+            out = BATCH_DETECTORS[name](b, **kwargs)
+        for sym, res in zip(b.symbols, out):
+            results[sym][name] = res
+    return results
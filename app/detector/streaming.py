@@ -0,0 +1,291 @@
+# app/detector/streaming.py
+"""
+Stateful streaming detectors.
+
+Tiap candle baru di-update dalam waktu O(1) amortized (kecuali support /
+resistance, lihat SortedWindow), jadi window panjang (1000+ candle) untuk
+banyak symbol di frekuensi tick tidak membuat CPU naik seiring panjang
+window.
+
+The still-open ("live") candle is kept outside the rolling structures: only
+closed candles are pushed into the deques/sums, and every query combines the
+closed window with the live candle. That makes revising the live candle (a
+new tick with the same open_time) free and exact. Results match
+app/detectors.py evaluated on closed candles + the live candle.
+"""
+
+import bisect
+import math
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from app.detector.batch import DEFAULT_PARAMS
+
+NOT_ENOUGH = {"status": "unknown", "reason": "not enough data"}
+
+
+# -------------------------------------------------------------------
+# ROLLING PRIMITIVES
+# -------------------------------------------------------------------
+class RollingExtreme:
+    """Max (or min) of the last `size` pushed values, monotonic deque (size 0 → always empty)"""
+
+    def __init__(self, size: int, mode: str = "max"):
+        self.size = max(size, 0)
+        self._is_max = mode == "max"
+        self._dq: deque = deque()  # (index, value), value monoton
+        self._i = 0
+
+    def push(self, value: float):
+        dq = self._dq
+        if self._is_max:
+            while dq and dq[-1][1] <= value:
+                dq.pop()
+        else:
+            while dq and dq[-1][1] >= value:
+                dq.pop()
+        dq.append((self._i, value))
+        self._i += 1
+        while dq and dq[0][0] <= self._i - 1 - self.size:
+            dq.popleft()
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._dq[0][1] if self._dq else None
+
+
+class RollingMean:
+    """Mean of the last `size` values with a running sum"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._values: deque = deque()
+        self._sum = 0.0
+        self._pushes = 0
+
+    def push(self, value: float):
+        self._values.append(value)
+        self._sum += value
+        if len(self._values) > self.size:
+            self._sum -= self._values.popleft()
+        self._pushes += 1
+        if self._pushes % max(self.size, 1) == 0:
+            self._sum = math.fsum(self._values)  # buang drift floating point
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self._values) < self.size:
+            return None
+        return self._sum / self.size
+
+
+class RollingMoments:
+    """
+    Count / sum / sum of squares over the last `size` slots. A slot can be
+    None (e.g. a return skipped because the previous close was 0), it still
+    occupies a position in the window but doesn't count.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._values: deque = deque()
+        self.n = 0
+        self.s = 0.0
+        self.ss = 0.0
+        self._pushes = 0
+
+    def push(self, value: Optional[float]):
+        self._values.append(value)
+        if value is not None:
+            self.n += 1
+            self.s += value
+            self.ss += value * value
+        if len(self._values) > self.size:
+            old = self._values.popleft()
+            if old is not None:
+                self.n -= 1
+                self.s -= old
+                self.ss -= old * old
+        self._pushes += 1
+        if self._pushes % max(self.size, 1) == 0:
+            self._recompute()
+
+    def _recompute(self):
+        vals = [v for v in self._values if v is not None]
+        self.n = len(vals)
+        self.s = math.fsum(vals)
+        self.ss = math.fsum(v * v for v in vals)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class SortedWindow:
+    """
+    Last `size` values kept sorted, for k-smallest / k-largest queries.
+    Insert/remove are a bisect plus a memmove; queries are O(k).
+    """
+
+    def __init__(self, size: int):
+        self.size = max(size, 0)
+        self._order: deque = deque()
+        self._sorted: list = []
+
+    def push(self, value: float):
+        self._order.append(value)
+        bisect.insort(self._sorted, value)
+        if len(self._order) > self.size:
+            old = self._order.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+
+    def smallest(self, k: int) -> list:
+        return self._sorted[:k]
+
+    def largest(self, k: int) -> list:
+        return self._sorted[-k:][::-1]
+
+
+# -------------------------------------------------------------------
+# STREAMING DETECTORS
+# -------------------------------------------------------------------
+class StreamingDetectors:
+    """All five detectors for one symbol, updated one candle at a time"""
+
+    def __init__(self, params: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.params = DEFAULT_PARAMS if params is None else params
+        p = self.params
+        self._pump_w = p["pump_dump"]["window"]
+        self._stag_w = p["stagnant"]["window"]
+        self._side_w = p["sideway"]["ma_window"]
+        self._brk_w = p["breakout"]["lookback"]
+        self._sr_w = p["support_resistance"]["window"]
+
+        # struktur rolling hanya berisi candle yang sudah close (window - 1 + live candle;
+        # window 1 → ukuran 0, hanya live candle)
+        self._closes: deque = deque(maxlen=max(self._pump_w, 1))
+        self._stag_max = RollingExtreme(self._stag_w - 1, "max")
+        self._stag_min = RollingExtreme(self._stag_w - 1, "min")
+        self._returns = RollingMoments(max(self._side_w - 2, 0))
+        self._brk_max = RollingExtreme(self._brk_w, "max")
+        self._sr_lows = SortedWindow(self._sr_w - 1)
+        self._sr_highs = SortedWindow(self._sr_w - 1)
+        self._last_closed: Optional[float] = None
+        self.n_closed = 0
+
+        self.live: Optional[Tuple[int, float, float, float]] = None  # open_time, high, low, close
+
+    def __len__(self) -> int:
+        return self.n_closed + (1 if self.live else 0)
+
+    def update(self, open_time: int, high: float, low: float, close: float) -> bool:
+        """
+        Feed a candle tick. Same open_time as the live candle → revise it,
+        newer open_time → the live candle closes and the new one becomes live.
+        Returns False for out-of-order (older) candles, which are ignored.
+        """
+        if self.live is not None:
+            if open_time < self.live[0]:
+                return False
+            if open_time > self.live[0]:
+                self._close(self.live)
+        self.live = (open_time, high, low, close)
+        return True
+
+    def update_row(self, row) -> bool:
+        """Feed a raw kline row [open_time, open, high, low, close, ...]"""
+        return self.update(int(row[0]), float(row[2]), float(row[3]), float(row[4]))
+
+    def _close(self, candle: Tuple[int, float, float, float]):
+        _, high, low, close = candle
+        prev = self._last_closed
+        if prev is not None and self._side_w > 2:
+            self._returns.push((close - prev) / prev if prev else None)
+        self._closes.append(close)
+        self._stag_max.push(close)
+        self._stag_min.push(close)
+        self._brk_max.push(close)
+        self._sr_lows.push(low)
+        self._sr_highs.push(high)
+        self._last_closed = close
+        self.n_closed += 1
+
+    # ---------------------------------------------------------------
+    # queries
+    # ---------------------------------------------------------------
+    def pump_dump(self) -> Dict[str, Any]:
+        w = self._pump_w
+        if self.live is None or self.n_closed < w:
+            return dict(NOT_ENOUGH)
+        start = self._closes[-w]
+        end = self.live[3]
+        pct = (end - start) / start if start else 0.0
+        threshold = self.params["pump_dump"]["pump_threshold"]
+        if pct >= threshold:
+            return {"status": "pump", "pct": pct}
+        if pct <= -threshold:
+            return {"status": "dump", "pct": pct}
+        return {"status": "none", "pct": pct}
+
+    def stagnant(self) -> Dict[str, Any]:
+        if self.live is None or len(self) < self._stag_w:
+            return dict(NOT_ENOUGH)
+        live = self.live[3]
+        maxi = max(self._stag_max.value, live) if self._stag_max.value is not None else live
+        mini = min(self._stag_min.value, live) if self._stag_min.value is not None else live
+        frac = (maxi - mini) / ((maxi + mini) / 2) if (maxi + mini) else 0.0
+        if frac <= self.params["stagnant"]["threshold"]:
+            return {"status": "stagnant", "range_frac": frac}
+        return {"status": "active", "range_frac": frac}
+
+    def sideway(self) -> Dict[str, Any]:
+        if self.live is None or len(self) < self._side_w:
+            return dict(NOT_ENOUGH)
+        n, s, ss = 0, 0.0, 0.0
+        if self._side_w > 2:
+            n, s, ss = self._returns.n, self._returns.s, self._returns.ss
+        prev = self._last_closed
+        if self._side_w > 1 and prev:
+            r = (self.live[3] - prev) / prev
+            n += 1
+            s += r
+            ss += r * r
+        if not n:
+            return {"status": "unknown", "reason": "no returns"}
+        mean = s / n
+        std = math.sqrt(max(ss / n - mean * mean, 0.0))
+        if std <= self.params["sideway"]["std_threshold"]:
+            return {"status": "sideway", "std": std}
+        return {"status": "trend", "std": std}
+
+    def breakout(self) -> Dict[str, Any]:
+        if self.live is None or self.n_closed < self._brk_w:
+            return dict(NOT_ENOUGH)
+        prev_high = self._brk_max.value
+        last = self.live[3]
+        mult = self.params["breakout"]["breakout_mult"]
+        if prev_high and last > prev_high * (1 + mult):
+            return {"status": "breakout", "last": last, "prev_high": prev_high}
+        if prev_high and last < prev_high * (1 - mult):
+            return {"status": "below_resistance", "last": last, "prev_high": prev_high}
+        return {"status": "no_breakout", "last": last, "prev_high": prev_high}
+
+    def support_resistance(self) -> Dict[str, Any]:
+        if self.live is None or len(self) < self._sr_w:
+            return {"reason": "not enough data"}
+        k = min(3, self._sr_w)
+        supports = sorted(self._sr_lows.smallest(k) + [self.live[2]])[:k]
+        resistances = sorted(self._sr_highs.largest(k) + [self.live[1]], reverse=True)[:k]
+        return {"support": sum(supports) / k, "resistance": sum(resistances) / k}
+
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        """Same shape as one symbol of app.detector.batch.evaluate_batch"""
+        return {
+            "pump_dump": self.pump_dump(),
+            "stagnant": self.stagnant(),
+            "sideway": self.sideway(),
+            "breakout": self.breakout(),
+            "support_resistance": self.support_resistance(),
+        }
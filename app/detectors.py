@@ -3,12 +3,28 @@ from typing import List, Dict, Any
 import statistics
 import math
 
+def _col(ohlcv, idx: int, n: int = 0) -> List[float]:
+    """
+    Column `idx` of the kline rows (2=high, 3=low, 4=close) as floats,
+    only the last `n` candles if n > 0. Works on raw Binance rows and on
+    CandleBuffer (app.services.candle_store), which is read directly from
+    its numeric column instead of re-parsing strings.
+    """
+    if hasattr(ohlcv, "column"):
+        values = ohlcv.column(idx)
+        return (values[-n:] if n else values).tolist()
+    rows = ohlcv[-n:] if n else ohlcv
+    return [float(c[idx]) for c in rows]
+
 def moving_average(prices: List[float], window: int) -> List[float]:
+    """Simple MA with a running sum: O(n) instead of O(n*window)"""
     if len(prices) < window:
         return []
-    ma = []
-    for i in range(window - 1, len(prices)):
-        ma.append(sum(prices[i-window+1:i+1]) / window)
+    total = sum(prices[:window])
+    ma = [total / window]
+    for i in range(window, len(prices)):
+        total += prices[i] - prices[i-window]
+        ma.append(total / window)
     return ma
 
 def detect_pump_dump(ohlcv: List[List[Any]], pump_threshold: float = 0.10, window: int = 5) -> Dict[str,Any]:
@@ -18,7 +34,7 @@ def detect_pump_dump(ohlcv: List[List[Any]], pump_threshold: float = 0.10, windo
     """
     if not ohlcv or len(ohlcv) < window+1:
         return {"status": "unknown", "reason": "not enough data"}
-    closes = [float(candle[4]) for candle in ohlcv]
+    closes = _col(ohlcv, 4, window+1)
     start = closes[-(window+1)]
     end = closes[-1]
     pct = (end - start) / start if start else 0.0
@@ -32,7 +48,7 @@ def detect_stagnant(ohlcv: List[List[Any]], threshold: float = 0.02, window: int
     """If max-min over window is within threshold fraction, consider stagnant"""
     if not ohlcv or len(ohlcv) < window:
         return {"status": "unknown", "reason": "not enough data"}
-    closes = [float(candle[4]) for candle in ohlcv[-window:]]
+    closes = _col(ohlcv, 4, window)
     maxi = max(closes); mini = min(closes)
     frac = (maxi-mini)/((maxi+mini)/2) if (maxi+mini) else 0.0
     if frac <= threshold:
@@ -43,7 +59,7 @@ def detect_sideway(ohlcv: List[List[Any]], ma_window: int = 20, std_threshold: f
     """Sideway: small volatility around MA; check stddev of returns"""
     if not ohlcv or len(ohlcv) < ma_window:
         return {"status": "unknown", "reason": "not enough data"}
-    closes = [float(c[4]) for c in ohlcv[-ma_window:]]
+    closes = _col(ohlcv, 4, ma_window)
     returns = []
     for i in range(1, len(closes)):
         if closes[i-1]:
@@ -59,7 +75,7 @@ def detect_breakout(ohlcv: List[List[Any]], lookback:int=50, breakout_mult:float
     """Detect breakout if last close > previous high * (1 + breakout_mult)"""
     if not ohlcv or len(ohlcv) < lookback+1:
         return {"status": "unknown", "reason": "not enough data"}
-    closes = [float(c[4]) for c in ohlcv]
+    closes = _col(ohlcv, 4, lookback+1)
     prev_high = max(closes[-(lookback+1):-1])
     last = closes[-1]
     if prev_high and last > prev_high * (1 + breakout_mult):
@@ -77,9 +93,8 @@ def simple_support_resistance(ohlcv: List[List[Any]], window:int=50) -> Dict[str
     """
     if not ohlcv or len(ohlcv) < window:
         return {"reason": "not enough data"}
-    closes = [float(c[4]) for c in ohlcv[-window:]]
-    highs = [float(c[2]) for c in ohlcv[-window:]]
-    lows = [float(c[3]) for c in ohlcv[-window:]]
+    highs = _col(ohlcv, 2, window)
+    lows = _col(ohlcv, 3, window)
     # support ~ average of lowest 3 closes
     supports = sorted(lows)[:3]
     resistances = sorted(highs, reverse=True)[:3]
@@ -1,26 +1,79 @@
-from fastapi import FastAPI, Depends
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import database
-from app.db import get_db, Base, engine
+from app.db import Base, dispose_async_engine, engine, get_async_db, get_async_engine
 
 # Auth Router
 from app.auth.auth import router as auth_router
+from app.auth.security import shutdown_hash_pool
 
 # CRUD Signal
-from app.crud.crud_signal import create_signal, get_signals
+from app.crud import crud_signal_async
 
 # Schemas
-from app.schemas import SignalCreate, SignalResponse
+from app.schemas import SignalCreate, SignalResponse, SignalStatsResponse
 
-# Services (Market Data)
-from app.services.market_data import (
+# Services (Market Data, async + pooled)
+from app.services import market_data_async, resilience
+from app.services.market_data_async import (
     get_indodax_ticker,
     get_indodax_orderbook,
-    convert_binance_orderbook_to_idr,
+    get_binance_orderbook_usdt,
     get_ohlcv_binance,
+    get_ohlcv_pages,
+    get_usdt_idr_rate,
 )
+from app.services.scanner import SORT_KEYS, get_spreads, select
+from app.services.stream import BinanceStream
+from app.services.candle_history import CandleHistory
+from app.services.candle_store import MAX_KLINES_LIMIT
+from app.services.market_data import interval_seconds
+from app.services.orderbook import OrderBook, SnapshotBooks, merged_top, snapshot_depth
+from app.services.pubsub import Broadcaster, PgListener
+from app.services.serialization import FORMATS, encode
+from app import metrics
+
+# Binance depth via WebSocket (top 20), REST tetap jadi fallback
+STREAM_ENABLED = os.getenv("STREAM_ENABLED", "0") == "1"
+STREAM_SYMBOLS = [s.strip().upper() for s in os.getenv("SYMBOLS", "BTC,ETH").split(",") if s.strip()]
+STREAM_BOOK_MAX_AGE = float(os.getenv("STREAM_BOOK_MAX_AGE", "5"))
+STREAM = None
+
+# OrderBook dari snapshot REST (Indodax, Binance tanpa stream) per (exchange, symbol), reload hanya kalau snapshot berubah
+SNAPSHOT_BOOKS = SnapshotBooks(int(os.getenv("SNAPSHOT_BOOKS_MAX", "512")))
+
+# Candle history yang ditulis worker; /chart fallback ke REST kalau tidak ada / basi
+HISTORY = CandleHistory()
+
+# Live fan-out: snapshot & signal dari worker (Postgres NOTIFY) → client SSE/WS
+LIVE_KEEPALIVE = float(os.getenv("LIVE_KEEPALIVE", "15"))
+BROADCASTER = Broadcaster()
+LISTENER = None
+
+
+def live_collector():
+    g = metrics.GaugeMetricFamily("indotrader_live_clients", "Connected SSE/WebSocket clients")
+    g.add_metric([], BROADCASTER.client_count())
+    yield g
+    c = metrics.CounterMetricFamily("indotrader_live_delivered", "Events queued to live clients")
+    c.add_metric([], BROADCASTER.delivered)
+    yield c
+    c = metrics.CounterMetricFamily("indotrader_live_slow_consumers", "Live clients dropped for falling behind")
+    c.add_metric([], BROADCASTER.slow_consumers)
+    yield c
+
+
+metrics.register_collector(live_collector)
 
 # Inisialisasi App
 app = FastAPI(title="Server NBFSOFT", version="1.0")
@@ -32,8 +85,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# gzip untuk response >= 1 KB (chart / orderbook); level sedang, CPU lebih penting dari rasio
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=int(os.getenv("GZIP_LEVEL", "5")))
+
+# latency per route template (paling luar, jadi termasuk gzip)
+app.add_middleware(metrics.RouteMetricsMiddleware)
+
+# ?format=rows (default, seperti sebelumnya) | columnar (array numerik paralel)
+Format = Literal[FORMATS]
+
 # Create DB tables
 Base.metadata.create_all(bind=engine)
 
@@ -41,6 +104,93 @@ Base.metadata.create_all(bind=engine)
 app.include_router(auth_router, prefix="/auth", tags=["Auth"])
 
 
+@app.on_event("startup")
+async def start_stream():
+    global STREAM, LISTENER
+    if STREAM_ENABLED:
+        STREAM = BinanceStream(STREAM_SYMBOLS, candles=None)
+        STREAM.start()
+    LISTENER = PgListener(BROADCASTER, asyncio.get_running_loop())
+    LISTENER.start()
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    if STREAM is not None:
+        await STREAM.stop()
+    if LISTENER is not None:
+        LISTENER.stop()
+    await market_data_async.aclose()
+    await dispose_async_engine()
+    shutdown_hash_pool()
+
+
+async def binance_l2(symbol: str, limit: int):
+    """Binance L2 source: synced WebSocket book when fresh, else REST snapshot (dict)"""
+    book = STREAM.l2(symbol, STREAM_BOOK_MAX_AGE) if STREAM is not None else None
+    if book is not None:
+        return book
+    return await get_binance_orderbook_usdt(symbol, limit=snapshot_depth(limit))
+
+
+def snapshot_book(exchange: str, symbol: str, source) -> OrderBook:
+    """OrderBook for a binance_l2 / REST result; read it before the next await"""
+    return source if isinstance(source, OrderBook) else SNAPSHOT_BOOKS.get(exchange, symbol, source)
+
+
+async def binance_idr_orderbook(symbol: str, limit: int):
+    """Binance book converted to IDR at read time"""
+    source, rate = await asyncio.gather(binance_l2(symbol, limit), get_usdt_idr_rate())
+    if isinstance(source, dict) and "error" in source:
+        return source
+    if not rate:
+        return {"error": "failed to get USDT->IDR rate"}
+    book = snapshot_book("binance", symbol, source)
+    return {"exchange": "binance", "symbol": f"{symbol}_idr", **book.top(limit, rate)}
+
+
+async def merged_orderbook(symbol: str, limit: int, cumulative: bool):
+    """Indodax + Binance in one IDR book"""
+    indodax, binance, rate = await asyncio.gather(
+        get_indodax_orderbook(f"{symbol.lower()}_idr", limit=snapshot_depth(limit)),
+        binance_l2(symbol.upper(), limit),
+        get_usdt_idr_rate(),
+    )
+    if "error" in indodax:
+        return indodax
+    if isinstance(binance, dict) and "error" in binance:
+        return binance
+    if not rate:
+        return {"error": "failed to get USDT->IDR rate"}
+    books = {
+        "indodax": (snapshot_book("indodax", symbol.upper(), indodax), 1.0),
+        "binance": (snapshot_book("binance", symbol.upper(), binance), rate),
+    }
+    return {"symbol": f"{symbol.lower()}_idr", "rate": rate, **merged_top(books, limit, cumulative)}
+
+
+async def chart_data(symbol: str, interval: str, limit: int, start: Optional[int], end: Optional[int]):
+    """Candles from the local history, Binance REST when it can't answer"""
+    try:
+        res = await asyncio.get_running_loop().run_in_executor(None, HISTORY.read, symbol, interval, start, end, limit)
+    except (KeyError, ValueError):
+        return {"error": f"invalid interval: {interval}"}
+    if res is not None:
+        return res
+    if start is None and (end is not None or limit > MAX_KLINES_LIMIT):
+        # `limit` candle terakhir sampai end (atau sampai candle yang masih open)
+        step_ms = interval_seconds(interval) * 1000
+        last = (end if end is not None else int(time.time() * 1000)) // step_ms
+        start = (last - limit + 1) * step_ms
+    if start is None:
+        res = await get_ohlcv_binance(symbol, interval=interval, limit=limit)
+    else:
+        res = await get_ohlcv_pages(symbol, interval, limit, start)
+    if end is not None and "error" not in res:
+        res = {**res, "ohlcv": [row for row in res["ohlcv"] if row[0] <= end]}
+    return res
+
+
 # ───────────────────────────────────────────────
 # ROUTES UTAMA
 # ───────────────────────────────────────────────
@@ -50,43 +200,195 @@ def home():
     return {"message": "Indotrader Server is running 🚀"}
 
 
+async def check_db() -> Optional[str]:
+    try:
+        async with get_async_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return None
+    except Exception as e:
+        metrics.error("health_db")
+        return str(e)
+
+
+@app.get("/health")
+async def health():
+    """Liveness + DB reachability (docker-compose healthcheck); 503 kalau DB tidak bisa dihubungi"""
+    db_error = await check_db()
+    body = {
+        "status": "ok" if db_error is None else "error",
+        "db": "ok" if db_error is None else db_error,
+        "stream": None if STREAM is None else {"connected": STREAM.connected},
+        "live_clients": BROADCASTER.client_count(),
+        # upstream yang sedang diputus tidak membuat API unhealthy (ada fallback stale)
+        "circuits": resilience.open_circuits(),
+    }
+    return JSONResponse(body, status_code=200 if db_error is None else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 # ORDERBOOK
 @app.get("/orderbook/indodax/{symbol}")
-def orderbook_indodax(symbol: str, limit: int = 50):
+async def orderbook_indodax(
+    symbol: str,
+    request: Request,
+    limit: int = Query(50, ge=1, le=5000),
+    fmt: Format = Query("rows", alias="format"),
+):
     pair = f"{symbol.lower()}_idr"
-    return get_indodax_orderbook(pair, limit=limit)
+    return encode(request, await get_indodax_orderbook(pair, limit=limit), fmt)
 
 
 @app.get("/orderbook/binance/{symbol}")
-def orderbook_binance(symbol: str, limit: int = 50):
-    return convert_binance_orderbook_to_idr(symbol.upper(), limit=limit)
+async def orderbook_binance(
+    symbol: str,
+    request: Request,
+    limit: int = Query(50, ge=1, le=5000),
+    fmt: Format = Query("rows", alias="format"),
+):
+    return encode(request, await binance_idr_orderbook(symbol.upper(), limit), fmt)
+
+
+@app.get("/orderbook/merged/{symbol}")
+async def orderbook_merged(
+    symbol: str,
+    request: Request,
+    limit: int = Query(50, ge=1, le=5000),
+    cumulative: bool = False,
+    fmt: Format = Query("rows", alias="format"),
+):
+    """Indodax + Binance in one IDR book, rows: [price_idr, qty, exchange(, cumulative qty)]"""
+    return encode(request, await merged_orderbook(symbol, limit, cumulative), fmt)
 
 
 # CHART
 @app.get("/chart/binance/{symbol}")
-def chart_binance(symbol: str, interval: str = "1m", limit: int = 500):
-    return get_ohlcv_binance(symbol.upper(), interval=interval, limit=limit)
+async def chart_binance(
+    symbol: str,
+    request: Request,
+    interval: str = "1m",
+    limit: int = Query(500, ge=1, le=5000),
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    fmt: Format = Query("rows", alias="format"),
+):
+    # start / end: open_time dalam ms (inclusive), seperti startTime / endTime Binance
+    return encode(request, await chart_data(symbol.upper(), interval, limit, start, end), fmt)
 
 
 # SIGNAL
 @app.post("/signal/", response_model=SignalResponse)
-def create_signal_api(data: SignalCreate, db: Session = Depends(get_db)):
-    return create_signal(db, data)
+async def create_signal_api(data: SignalCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud_signal_async.create_signal(db, data)
 
 
 @app.get("/signal/", response_model=list[SignalResponse])
-def get_signals_api(db: Session = Depends(get_db)):
-    return get_signals(db)
+async def get_signals_api(
+    response: Response,
+    symbol: Optional[str] = None,
+    signal_type: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(10, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # halaman berikutnya: ulangi request dengan ?cursor=<X-Next-Cursor>
+    try:
+        rows, next_cursor = await crud_signal_async.get_signals(
+            db, symbol, signal_type, start, end, limit, cursor, timeframe=timeframe,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+@app.get("/signal/stats", response_model=SignalStatsResponse)
+async def signal_stats_api(
+    bucket: Literal["hour", "day"] = "hour",
+    symbol: Optional[str] = None,
+    signal_type: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Signal count + average confidence per hour / day, from the rollup tables (up to last_id)"""
+    data = await crud_signal_async.get_signal_stats(
+        db, bucket, symbol=symbol, signal_type=signal_type, timeframe=timeframe, start=start, end=end, limit=limit,
+    )
+    return {"bucket_size": bucket, "last_id": data["last_id"], "updated_at": data["updated_at"], "stats": data["rows"]}
 
 
 # MARKET
+@app.get("/market/spreads")
+async def market_spreads(
+    request: Request,
+    sort: Literal[SORT_KEYS] = "abs_spread",
+    order: Literal["asc", "desc"] = "desc",
+    limit: Optional[int] = Query(None, ge=1),
+    min_volume: float = 0.0,
+    min_spread: float = 0.0,
+):
+    """Indodax vs Binance (IDR) spread of every common pair, from one bulk request per exchange"""
+    spreads = await get_spreads()
+    if "error" in spreads:
+        return encode(request, spreads)
+    return encode(request, select(spreads, sort, order, limit, min_volume, min_spread))
+
+
 @app.get("/market/{symbol}")
-def get_market_data(symbol: str):
-    indodax = get_indodax_ticker(f"{symbol.lower()}_idr")
-    binance = convert_binance_orderbook_to_idr(symbol.upper(), limit=10)
+async def get_market_data(symbol: str, request: Request, fmt: Format = Query("rows", alias="format")):
+    # ticker, depth & rate jalan paralel → latency ≈ call paling lambat
+    indodax, binance = await asyncio.gather(
+        get_indodax_ticker(f"{symbol.lower()}_idr"),
+        binance_idr_orderbook(symbol.upper(), 10),
+    )
 
-    return {
+    return encode(request, {
         "symbol": symbol.upper(),
         "indodax": indodax,
         "binance": binance,
-    }
+    }, fmt)
+
+
+# LIVE (SSE / WebSocket), symbol "all" = semua symbol
+@app.get("/live/{symbol}")
+async def live_sse(symbol: str, request: Request):
+    sub = BROADCASTER.subscribe(symbol)
+
+    async def events():
+        try:
+            while not sub.closed and not await request.is_disconnected():
+                msg = await sub.get(LIVE_KEEPALIVE)
+                yield f"data: {msg}\n\n" if msg is not None else ": keepalive\n\n"
+        finally:
+            BROADCASTER.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/live/{symbol}/ws")
+async def live_ws(websocket: WebSocket, symbol: str):
+    await websocket.accept()
+    sub = BROADCASTER.subscribe(symbol)
+    try:
+        while not sub.closed:
+            msg = await sub.get(LIVE_KEEPALIVE)
+            await websocket.send_text(msg if msg is not None else '{"type":"keepalive"}')
+        await websocket.close(code=1013)  # slow consumer
+    except WebSocketDisconnect:
+        pass
+    finally:
+        BROADCASTER.unsubscribe(sub)
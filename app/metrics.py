@@ -0,0 +1,254 @@
+# app/metrics.py
+"""
+Prometheus metrics untuk API dan worker.
+
+API expose lewat GET /metrics (app.main), worker lewat start_http_server
+(WORKER_METRICS_PORT). Semua metric di default registry prometheus_client.
+
+Hot paths only do a histogram observe / counter inc (a few µs); cache,
+DB pool and live-client numbers are read at scrape time by collectors.
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# upstream REST + route: ms sampai puluhan detik
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# detector / DB: µs sampai detik
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+UPSTREAM_LATENCY = Histogram(
+    "indotrader_upstream_request_seconds", "Upstream REST request latency (incl. parse)",
+    ["exchange", "endpoint"], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "indotrader_upstream_errors_total", "Upstream REST requests that failed", ["exchange", "endpoint"],
+)
+HEDGED_REQUESTS = Counter(
+    "indotrader_hedged_requests_total", "Hedges fired after the latency percentile (skipped without rate budget), and how many won",
+    ["exchange", "endpoint", "outcome"],
+)
+CIRCUIT_OPENED = Counter("indotrader_circuit_opened_total", "Upstream circuit breaker trips", ["endpoint"])
+RATE_LIMIT_WAIT = Histogram(
+    "indotrader_rate_limit_wait_seconds", "Time waiting for an upstream rate limit token",
+    ["exchange", "priority"], buckets=FAST_BUCKETS + (2.5, 5, 10, 30),
+)
+RATE_LIMIT_THROTTLED = Counter(
+    "indotrader_rate_limit_throttled_total", "Requests refused locally (wait) or by the upstream (429 / 418)",
+    ["exchange", "reason"],
+)
+ROUTE_LATENCY = Histogram(
+    "indotrader_http_request_seconds", "API request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+DETECTOR_SECONDS = Histogram(
+    "indotrader_detector_seconds", "Batch detector execution time per cycle", ["detector"], buckets=FAST_BUCKETS,
+)
+WORKER_CYCLE_SECONDS = Histogram(
+    "indotrader_worker_cycle_seconds", "Worker cycle duration", buckets=LATENCY_BUCKETS + (30, 60),
+)
+WORKER_CYCLE_LAG = Gauge("indotrader_worker_cycle_lag_seconds", "How late the last cycle started vs its tick")
+WORKER_MISSED_TICKS = Counter("indotrader_worker_missed_ticks_total", "Ticks skipped because the worker was behind")
+WORKER_SYMBOLS = Counter("indotrader_worker_symbols_total", "Symbols per cycle by outcome", ["state"])
+WORKER_POLL_INTERVAL = Gauge("indotrader_worker_poll_interval_seconds", "Adaptive per-symbol poll interval", ["stat"])
+WORKER_POLL_LOAD = Gauge(
+    "indotrader_worker_poll_budget_ratio", "Polling weight/s vs the background rate limit budget (>1: over budget at max interval)",
+)
+DB_CHECKOUT_SECONDS = Histogram(
+    "indotrader_db_pool_checkout_seconds", "Time waiting for a pooled DB connection", buckets=FAST_BUCKETS,
+)
+DB_COMMIT_SECONDS = Histogram("indotrader_db_commit_seconds", "DBAPI commit time", buckets=FAST_BUCKETS)
+AUTH_HASH_SECONDS = Histogram(
+    "indotrader_auth_hash_seconds", "Password verification time incl. waiting for the hash pool", buckets=LATENCY_BUCKETS,
+)
+AUTH_HASH_REJECTED = Counter("indotrader_auth_hash_rejected_total", "Logins refused because the hash pool was full")
+ROLLUP_SECONDS = Histogram("indotrader_rollup_seconds", "Signal rollup run duration", buckets=LATENCY_BUCKETS)
+ROLLUP_SIGNALS = Counter("indotrader_rollup_signals_total", "Signals added to the hour / day rollups")
+SHARD_WORKERS = Gauge("indotrader_shard_workers", "Live worker replicas seen by this worker")
+SHARD_OWNED = Gauge("indotrader_shard_owned_symbols", "Symbols locked (processed) by this worker")
+ERRORS = Counter("indotrader_errors_total", "Errors handled (logged and swallowed) per component", ["component"])
+
+
+class _Timer:
+    __slots__ = ("hist", "errors", "start")
+
+    def __init__(self, hist, errors=None):
+        self.hist = hist
+        self.errors = errors
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.hist.observe(time.perf_counter() - self.start)
+        if exc_type is not None and self.errors is not None:
+            self.errors.inc()
+        return False
+
+
+_upstream_children: Dict[tuple, tuple] = {}
+
+
+def upstream(exchange: str, endpoint: str) -> _Timer:
+    """`with upstream("binance", "depth"): ...` — latency, and an error count if it raises"""
+    key = (exchange, endpoint)
+    pair = _upstream_children.get(key)
+    if pair is None:
+        pair = _upstream_children[key] = (UPSTREAM_LATENCY.labels(exchange, endpoint), UPSTREAM_ERRORS.labels(exchange, endpoint))
+    return _Timer(*pair)
+
+
+def timer(hist) -> _Timer:
+    return _Timer(hist)
+
+
+def error(component: str):
+    ERRORS.labels(component).inc()
+
+
+# -------------------------------------------------------------------
+# ROUTES (ASGI middleware)
+# -------------------------------------------------------------------
+class RouteMetricsMiddleware:
+    """
+    Observe request latency per route template (/chart/binance/{symbol},
+    not the raw path). Streaming responses (SSE) are not observed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        state = {"status": 500, "stream": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                for k, v in message.get("headers", ()):
+                    if k == b"content-type" and v.startswith(b"text/event-stream"):
+                        state["stream"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not state["stream"]:
+                route = scope.get("route")
+                path = getattr(route, "path", "unmatched")
+                ROUTE_LATENCY.labels(scope["method"], path, str(state["status"])).observe(time.perf_counter() - start)
+
+
+# -------------------------------------------------------------------
+# DB (SQLAlchemy engine)
+# -------------------------------------------------------------------
+def instrument_engine(engine):
+    """Time pool checkouts and DBAPI commits of a sync SQLAlchemy engine"""
+    pool = engine.pool
+    do_get = pool._do_get  # dipanggil untuk setiap checkout, termasuk waktu tunggu pool penuh
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            DB_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+    pool._do_get = timed_do_get
+
+    dialect = engine.dialect
+    do_commit = dialect.do_commit
+
+    def timed_commit(dbapi_connection):
+        start = time.perf_counter()
+        try:
+            return do_commit(dbapi_connection)
+        finally:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - start)
+
+    dialect.do_commit = timed_commit
+
+
+class _CallbackCollector:
+    """Read counters owned by other objects (cache, pool, broadcaster) at scrape time"""
+
+    def __init__(self, collect_fn: Callable):
+        self._collect = collect_fn
+
+    def collect(self):
+        try:
+            yield from self._collect()
+        except Exception as e:
+            print("Metrics collector error:", e)
+
+
+def register_collector(collect_fn: Callable):
+    REGISTRY.register(_CallbackCollector(collect_fn))
+
+
+_caches: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+
+def cache_collector(name: str, stats_fn: Callable[[], Dict[str, float]]):
+    """Expose TTLCache.stats() as indotrader_cache_* metrics (one family, one `cache` label per cache)"""
+    first = not _caches
+    _caches[name] = stats_fn
+    if not first:
+        return
+
+    def collect():
+        stats = {cache_name: fn() for cache_name, fn in list(_caches.items())}
+        for key in ("hits", "misses", "coalesced", "evictions", "stale_served"):
+            c = CounterMetricFamily(f"indotrader_cache_{key}", f"TTL cache {key}", labels=["cache"])
+            for cache_name, s in stats.items():
+                c.add_metric([cache_name], s.get(key, 0))
+            yield c
+        g = GaugeMetricFamily("indotrader_cache_entries", "TTL cache entries", labels=["cache"])
+        for cache_name, s in stats.items():
+            g.add_metric([cache_name], s.get("size", 0))
+        yield g
+
+    register_collector(collect)
+
+
+_pools: Dict[str, Any] = {}
+
+
+def pool_collector(engine, name: str = "sync"):
+    """Expose pool usage of engine (sync, or async_engine.sync_engine) as indotrader_db_pool_connections"""
+    first = not _pools
+    _pools[name] = engine
+    if not first:
+        return
+
+    def collect():
+        g = GaugeMetricFamily("indotrader_db_pool_connections", "DB pool connections", labels=["engine", "state"])
+        for pool_name, eng in list(_pools.items()):
+            pool = eng.pool
+            if hasattr(pool, "checkedout"):
+                g.add_metric([pool_name, "checked_out"], pool.checkedout())
+                g.add_metric([pool_name, "idle"], pool.checkedin())
+        yield g
+
+    register_collector(collect)
+
+
+def render(registry=REGISTRY) -> bytes:
+    return generate_latest(registry)
+
+
+def start_worker_server(port: int) -> Optional[int]:
+    """Scrape endpoint for processes without an HTTP app (the worker)"""
+    if not port:
+        return None
+    from prometheus_client import start_http_server
+
+    start_http_server(port)
+    print("Metrics on :%d/metrics" % port)
+    return port
@@ -5,7 +5,7 @@ from logging.config import fileConfig
 from sqlalchemy import create_engine
 from sqlalchemy import pool
 
-from app.alembic import context
+from alembic import context
 
 # --- FIX PYTHONPATH ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,10 +13,11 @@ ROOT_DIR = os.path.dirname(os.path.dirname(BASE_DIR))
 sys.path.insert(0, ROOT_DIR)
 
 # --- IMPORT MODEL BASE ---
-from app.db import Base
+from app.db import Base, sync_url
+import app.model  # noqa: F401  register tables on Base.metadata
 
 # --- DATABASE URL ---
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = sync_url(os.getenv("DATABASE_URL"))  # Alembic selalu lewat engine sync
 
 config = context.config
 config.set_main_option("sqlalchemy.url", DATABASE_URL)
@@ -0,0 +1,50 @@
+"""signal keyset indexes
+
+Revision ID: a1c3e5f70911
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a1c3e5f70911"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    "ix_signals_symbol_created_at": ["symbol", "created_at", "id"],
+    "ix_signals_created_at_id": ["created_at", "id"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("signals"):
+        return  # tabel baru dibuat oleh create_all, index ikut dari model
+    if bind.dialect.name == "postgresql":
+        # CONCURRENTLY: tabel signals tetap bisa ditulis worker selama build index
+        with op.get_context().autocommit_block():
+            for name, cols in INDEXES.items():
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON signals ({', '.join(cols)})")
+    else:
+        for name, cols in INDEXES.items():
+            op.create_index(name, "signals", cols, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name in INDEXES:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    else:
+        for name in INDEXES:
+            op.drop_index(name, table_name="signals", if_exists=True)
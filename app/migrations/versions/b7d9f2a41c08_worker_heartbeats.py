@@ -0,0 +1,39 @@
+"""worker heartbeats
+
+Revision ID: b7d9f2a41c08
+Revises: a1c3e5f70911
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d9f2a41c08"
+down_revision: Union[str, Sequence[str], None] = "a1c3e5f70911"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table("worker_heartbeats"):
+        return  # sudah dibuat oleh worker (create_all)
+    op.create_table(
+        "worker_heartbeats",
+        sa.Column("worker_id", sa.String(length=128), primary_key=True),
+        sa.Column("host", sa.String(length=255), nullable=True),
+        sa.Column("owned", sa.Integer(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("last_seen", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_worker_heartbeats_last_seen", "worker_heartbeats", ["last_seen"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_worker_heartbeats_last_seen", table_name="worker_heartbeats")
+    op.drop_table("worker_heartbeats")
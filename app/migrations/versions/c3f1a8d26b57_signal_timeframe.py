@@ -0,0 +1,34 @@
+"""signal timeframe
+
+Revision ID: c3f1a8d26b57
+Revises: b7d9f2a41c08
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3f1a8d26b57"
+down_revision: Union[str, Sequence[str], None] = "b7d9f2a41c08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("signals"):
+        return  # tabel baru dibuat oleh create_all, kolom ikut dari model
+    if "timeframe" in {c["name"] for c in inspector.get_columns("signals")}:
+        return
+    # default konstan: di Postgres 11+ hanya update katalog, tanpa rewrite tabel
+    op.add_column("signals", sa.Column("timeframe", sa.String(length=8), nullable=False, server_default="1m"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("signals", "timeframe")
@@ -0,0 +1,51 @@
+"""signal rollups
+
+Revision ID: d5e2b9c71a40
+Revises: c3f1a8d26b57
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5e2b9c71a40"
+down_revision: Union[str, Sequence[str], None] = "c3f1a8d26b57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("signal_rollups"):
+        op.create_table(
+            "signal_rollups",
+            sa.Column("bucket_size", sa.String(length=8), primary_key=True),
+            sa.Column("bucket", sa.DateTime(), primary_key=True),
+            sa.Column("symbol", sa.String(length=64), primary_key=True),
+            sa.Column("signal_type", sa.String(length=64), primary_key=True),
+            sa.Column("timeframe", sa.String(length=8), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.Column("confidence_sum", sa.Float(), nullable=False),
+            sa.Column("confidence_count", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_signal_rollups_symbol_bucket", "signal_rollups", ["bucket_size", "symbol", "bucket"])
+    if not inspector.has_table("rollup_watermarks"):
+        # watermark 0: job pertama mengisi rollup dari semua signal yang sudah ada (per batch)
+        op.create_table(
+            "rollup_watermarks",
+            sa.Column("name", sa.String(length=64), primary_key=True),
+            sa.Column("last_id", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("rollup_watermarks")
+    op.drop_index("ix_signal_rollups_symbol_bucket", table_name="signal_rollups")
+    op.drop_table("signal_rollups")
@@ -1,7 +1,7 @@
 # app/models.py
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, Index
 #from db import Base
 from app.db import Base
 
@@ -25,9 +25,16 @@ class Signal(Base):
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String(64), index=True, nullable=False)
     signal_type = Column(String(64), nullable=False)
+    timeframe = Column(String(8), nullable=False, default="1m", server_default="1m")  # candle interval detector
     confidence = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # keyset pagination GET /signal/: (created_at, id) desc, per symbol atau semua
+    __table_args__ = (
+        Index("ix_signals_symbol_created_at", "symbol", "created_at", "id"),
+        Index("ix_signals_created_at_id", "created_at", "id"),
+    )
+
 class User(Base):
     __tablename__ = "users"
 
@@ -40,3 +47,41 @@ class User(Base):
     telegram_token = Column(String(500), nullable=True)
     telegram_enabled = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class WorkerHeartbeat(Base):
+    """Replica worker yang hidup (app.services.sharding), dipakai untuk membagi symbol"""
+    __tablename__ = "worker_heartbeats"
+
+    worker_id = Column(String(128), primary_key=True)
+    host = Column(String(255), nullable=True)
+    owned = Column(Integer, default=0)  # jumlah symbol yang sedang di-lock
+    started_at = Column(DateTime, default=datetime.utcnow)
+    last_seen = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class SignalRollup(Base):
+    """Jumlah signal per jam / hari (app.services.rollups), untuk GET /signal/stats tanpa scan tabel signals"""
+    __tablename__ = "signal_rollups"
+
+    bucket_size = Column(String(8), primary_key=True)  # "hour" | "day"
+    bucket = Column(DateTime, primary_key=True)  # awal jam / hari (UTC, seperti Signal.created_at)
+    symbol = Column(String(64), primary_key=True)
+    signal_type = Column(String(64), primary_key=True)
+    timeframe = Column(String(8), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    confidence_count = Column(Integer, nullable=False, default=0)  # signal dengan confidence tidak null
+
+    __table_args__ = (
+        Index("ix_signal_rollups_symbol_bucket", "bucket_size", "symbol", "bucket"),
+    )
+
+
+class RollupWatermark(Base):
+    """Signal.id terakhir yang sudah masuk rollup"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(64), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
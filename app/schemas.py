@@ -1,11 +1,14 @@
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List, Optional
 
 class SignalBase(BaseModel):
-    symbol: str
-    signal_type: str
+    # panjang maksimal = kolom String(n) di tabel signals (Postgres menolak yang lebih panjang)
+    symbol: str = Field(..., min_length=1, max_length=64)
+    signal_type: str = Field(..., min_length=1, max_length=64)
     confidence: float
+    timeframe: str = Field("1m", min_length=1, max_length=8)
 
 class SignalCreate(SignalBase):
     pass
@@ -17,6 +20,19 @@ class SignalResponse(SignalBase):
     class Config:
         orm_mode = True
 
+class SignalStat(BaseModel):
+    bucket: datetime
+    symbol: str
+    signal_type: str
+    count: int
+    avg_confidence: Optional[float] = None
+
+class SignalStatsResponse(BaseModel):
+    bucket_size: str
+    last_id: int  # signal terakhir yang sudah masuk rollup
+    updated_at: Optional[datetime] = None
+    stats: List[SignalStat]
+
 class UserLogin(BaseModel):
     username: str
     password: str
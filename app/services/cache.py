@@ -0,0 +1,267 @@
+# app/services/cache.py
+"""
+Small in-process TTL cache with LRU eviction and single-flight.
+
+Dipakai oleh market_data / market_data_async supaya banyak request untuk key
+yang sama (mis. 500 client minta ticker btc_idr bersamaan) cuma menghasilkan
+satu fetch ke upstream. Works from threads (get_or_fetch) and from asyncio
+(aget_or_fetch); both share the same store.
+
+Cached values are shared between callers, treat them as read-only.
+The last value of each key is kept after it expires, so callers can opt in
+to stale-while-revalidate / stale-if-error (see get_or_fetch).
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def _always(_value: Any) -> bool:
+    return True
+
+
+def _keep(value: Any, _age: float) -> Any:
+    return value
+
+
+class _Call:
+    """In-flight sync fetch that other threads can wait on"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._ainflight: Dict[Hashable, "asyncio.Future"] = {}
+        # nilai terakhir per key (juga yang sudah expired), untuk stale / stale_if_error
+        self._stale: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.stale_served = 0
+
+    # ---------------------------------------------------------------
+    # basic store
+    # ---------------------------------------------------------------
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """Must be called with self._lock held"""
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+            return found, value
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            self._stale[key] = (now, value)
+            self._stale.move_to_end(key)
+            while len(self._stale) > self.maxsize:
+                self._stale.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._stale.clear()
+
+    # ---------------------------------------------------------------
+    # last good value (stale-while-revalidate / stale-if-error)
+    # ---------------------------------------------------------------
+    def _last_good(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """(value, age in seconds) of the last value set for key, expired or not"""
+        with self._lock:
+            item = self._stale.get(key)
+        if item is None:
+            return None
+        stored_at, value = item
+        return value, time.monotonic() - stored_at
+
+    def _serve_stale(self, key: Hashable, max_age: float, mark: Callable[[Any, float], Any]) -> Tuple[bool, Any]:
+        last = self._last_good(key) if max_age > 0 else None
+        if last is None or last[1] > max_age:
+            return False, None
+        with self._lock:
+            self.stale_served += 1
+        return True, mark(*last)
+
+    # ---------------------------------------------------------------
+    # single-flight (threads)
+    # ---------------------------------------------------------------
+    def _lead(self, key: Hashable, ttl: float, fetch: Callable[[], Any], cacheable: Callable[[Any], bool], call: _Call):
+        try:
+            call.value = fetch()
+        except BaseException as e:
+            call.error = e
+        try:
+            # set dulu, baru lepas in-flight: caller di antaranya selalu melihat salah satunya
+            if call.error is None and cacheable(call.value):
+                self.set(key, call.value, ttl)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+            call.event.set()
+
+    def get_or_fetch(
+        self,
+        key: Hashable,
+        ttl: float,
+        fetch: Callable[[], Any],
+        cacheable: Callable[[Any], bool] = _always,
+        stale: float = 0.0,
+        stale_if_error: float = 0.0,
+        mark: Callable[[Any, float], Any] = _keep,
+    ) -> Any:
+        """
+        stale: seconds after expiry the old value is returned right away
+        while one background thread refreshes it.
+        stale_if_error: max age of the old value returned when the fetch
+        raises or gives a non-cacheable result. Old values go through mark.
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._inflight[key] = call
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if stale:
+            served, value = self._serve_stale(key, ttl + stale, mark)
+            if served:
+                if leader:
+                    threading.Thread(
+                        target=self._lead, args=(key, ttl, fetch, cacheable, call), name="cache-refresh", daemon=True,
+                    ).start()
+                return value
+
+        if leader:
+            self._lead(key, ttl, fetch, cacheable, call)
+        else:
+            call.event.wait()
+        if call.error is not None or not cacheable(call.value):
+            served, value = self._serve_stale(key, stale_if_error, mark)
+            if served:
+                return value
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    # ---------------------------------------------------------------
+    # single-flight (asyncio)
+    # ---------------------------------------------------------------
+    def _astart(self, key: Hashable, ttl: float, fetch: Callable[[], Awaitable[Any]], cacheable: Callable[[Any], bool]) -> "asyncio.Future":
+        # fetch jalan sebagai task sendiri: kalau request pertama di-cancel,
+        # request lain yang ikut menunggu tetap dapat hasil
+        task = asyncio.ensure_future(fetch())
+        self._ainflight[key] = task
+
+        def _done(t: "asyncio.Future"):
+            try:
+                if not t.cancelled() and t.exception() is None and cacheable(t.result()):
+                    self.set(key, t.result(), ttl)
+            finally:
+                if self._ainflight.get(key) is t:
+                    del self._ainflight[key]
+
+        task.add_done_callback(_done)
+        return task
+
+    async def aget_or_fetch(
+        self,
+        key: Hashable,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = _always,
+        stale: float = 0.0,
+        stale_if_error: float = 0.0,
+        mark: Callable[[Any, float], Any] = _keep,
+    ) -> Any:
+        """Same as get_or_fetch; the background refresh is a task on the running loop"""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            task = self._ainflight.get(key)
+            if task is None:
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if task is None:
+            task = self._astart(key, ttl, fetch, cacheable)
+        if stale:
+            served, value = self._serve_stale(key, ttl + stale, mark)
+            if served:
+                return value
+
+        try:
+            value = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            served, value = self._serve_stale(key, stale_if_error, mark)
+            if served:
+                return value
+            raise
+        if not cacheable(value):
+            served, stale_value = self._serve_stale(key, stale_if_error, mark)
+            if served:
+                return stale_value
+        return value
+
+    # ---------------------------------------------------------------
+    # counters
+    # ---------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "stale_served": self.stale_served,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
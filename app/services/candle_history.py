@@ -0,0 +1,284 @@
+# app/services/candle_history.py
+"""
+Local 1m candle history per symbol, untuk /chart.
+
+Satu file append-only per symbol (`{dir}/{SYMBOL}_1m.bin`) berisi record
+numpy fixed-size (open_time int64 + open/high/low/close/volume float64,
+48 byte). Worker menambah candle baru di akhir file dan menulis ulang
+record terakhir di tempat selama candle itu masih open. Pembaca memakai
+np.memmap, jadi baca range = binary search open_time + slice, tanpa load
+seluruh file; resample ke 5m/15m/1h/1d dilakukan saat baca (reduceat).
+
+Deeper history comes from the backfill CLI:
+
+    python -m app.services.candle_history backfill BTC ETH --days 365
+
+Only the worker process (and the CLI) write; the API only reads.
+"""
+
+import argparse
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app import metrics
+from app.services.candle_store import MAX_KLINES_LIMIT, CandleBuffer
+from app.services.market_data import get_ohlcv_binance, interval_seconds
+
+CANDLE_HISTORY_DIR = os.getenv("CANDLE_HISTORY_DIR", "data/candles")
+HISTORY_MAX_LAG = float(os.getenv("HISTORY_MAX_LAG", "180"))  # detik; lebih tua → /chart pakai REST
+
+RECORD = np.dtype([("t", "<i8"), ("o", "<f8"), ("h", "<f8"), ("l", "<f8"), ("c", "<f8"), ("v", "<f8")])
+STEP_MS = 60_000  # base interval 1m
+MAX_RESAMPLE_MS = 86_400_000  # 1d; minggu/bulan Binance tidak align ke epoch
+
+
+def resample(rec: np.ndarray, step_ms: int) -> np.ndarray:
+    """Aggregate 1m records (ascending) into step_ms candles aligned to UTC"""
+    if step_ms == STEP_MS or not len(rec):
+        return np.array(rec)
+    bucket = rec["t"] // step_ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    ends = np.append(starts[1:], len(rec)) - 1
+    out = np.empty(len(starts), dtype=RECORD)
+    out["t"] = bucket[starts] * step_ms
+    out["o"] = rec["o"][starts]
+    out["h"] = np.maximum.reduceat(rec["h"], starts)
+    out["l"] = np.minimum.reduceat(rec["l"], starts)
+    out["c"] = rec["c"][ends]
+    out["v"] = np.add.reduceat(rec["v"], starts)
+    return out
+
+
+def from_rows(rows: List[List[Any]]) -> np.ndarray:
+    """Raw kline rows ([open_time, open, high, low, close, volume, ...]) → records"""
+    rec = np.empty(len(rows), dtype=RECORD)
+    for i, row in enumerate(rows):
+        rec[i] = (int(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5]))
+    return rec
+
+
+def to_rows(rec: np.ndarray) -> List[List[Any]]:
+    """Records → kline-like rows [open_time, open, high, low, close, volume]"""
+    return [[int(r[0]), r[1], r[2], r[3], r[4], r[5]] for r in rec.tolist()]
+
+
+class CandleHistory:
+    def __init__(self, directory: str = CANDLE_HISTORY_DIR):
+        self.directory = directory
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.directory, f"{symbol.upper()}_1m.bin")
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    # ---------------------------------------------------------------
+    # reads
+    # ---------------------------------------------------------------
+    def records(self, symbol: str) -> Optional[np.ndarray]:
+        """All 1m records as a read-only memmap (None if there is no history)"""
+        path = self.path(symbol)
+        try:
+            n = os.path.getsize(path) // RECORD.itemsize  # record yang belum selesai ditulis diabaikan
+        except OSError:
+            return None
+        if not n:
+            return None
+        return np.memmap(path, dtype=RECORD, mode="r", shape=(n,))
+
+    def last_open_time(self, symbol: str) -> Optional[int]:
+        path = self.path(symbol)
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                n = size // RECORD.itemsize
+                if not n:
+                    return None
+                f.seek((n - 1) * RECORD.itemsize)
+                return int(np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)["t"][0])
+        except OSError:
+            return None
+
+    def read(
+        self,
+        symbol: str,
+        interval: str = "1m",
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        limit: int = 500,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Candles of `interval` between start and end (open_time ms, inclusive),
+        like Binance /klines: first `limit` from start, or the last `limit`
+        up to end. Returns None when the history can't answer the request
+        (no file, unsupported interval, stale and no end given, or the file
+        doesn't cover the whole window, e.g. right after a fresh deploy).
+        """
+        step_ms = interval_seconds(interval) * 1000
+        if step_ms % STEP_MS or step_ms > MAX_RESAMPLE_MS:
+            return None
+        rec = self.records(symbol)
+        if rec is None:
+            return None
+        times = rec["t"]
+        last = int(times[-1])
+        now_ms = time.time() * 1000
+        if end is None and now_ms - last > HISTORY_MAX_LAG * 1000 + STEP_MS:
+            return None  # worker tidak jalan / ketinggalan
+
+        if start is not None:
+            lo_ms = start // step_ms * step_ms
+            hi_ms = lo_ms + limit * step_ms - 1
+            if end is not None:
+                hi_ms = min(hi_ms, end)
+        else:
+            hi_ms = last if end is None else min(end, last)
+            lo_ms = (hi_ms // step_ms - limit + 1) * step_ms
+        # window harus tercakup penuh; history parsial → None (REST), bukan chart yang terpotong
+        if lo_ms < int(times[0]) or min(hi_ms, now_ms) - last > HISTORY_MAX_LAG * 1000 + STEP_MS:
+            return None
+        lo = bisect_left(times, lo_ms)
+        hi = bisect_right(times, hi_ms)
+        candles = resample(rec[lo:hi], step_ms)
+        return {
+            "exchange": "binance",
+            "symbol": symbol,
+            "interval": interval,
+            "source": "history",
+            "ohlcv": to_rows(candles),
+        }
+
+    # ---------------------------------------------------------------
+    # writes (worker / CLI)
+    # ---------------------------------------------------------------
+    def write(self, symbol: str, rec: np.ndarray) -> int:
+        """
+        Merge ascending 1m records: a record with the same open_time as the
+        last one replaces it in place, newer ones are appended, older ones
+        are ignored. Returns number of appended records.
+        """
+        if not len(rec):
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        size_rec = RECORD.itemsize
+        with self._lock(symbol):
+            fd = os.open(self.path(symbol), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                n = size // size_rec
+                if size != n * size_rec:
+                    os.ftruncate(fd, n * size_rec)  # sisa write yang terpotong
+                pos = n * size_rec
+                if n:
+                    last = int(np.frombuffer(os.pread(fd, size_rec, pos - size_rec), dtype=RECORD)["t"][0])
+                    rec = rec[rec["t"] >= last]
+                    if len(rec) and rec["t"][0] == last:
+                        pos -= size_rec  # candle terakhir masih open: tulis ulang di tempat
+                if len(rec):
+                    os.pwrite(fd, rec.tobytes(), pos)
+                return len(rec) - (n - pos // size_rec)
+            finally:
+                os.close(fd)
+
+    def write_rows(self, symbol: str, rows: List[List[Any]]) -> int:
+        return self.write(symbol, from_rows(rows))
+
+    def write_buffer(self, symbol: str, buf: CandleBuffer, since: Optional[int] = None) -> int:
+        """Write candles of a 1m CandleBuffer with open_time >= since"""
+        with buf.lock:
+            times = buf.open_times
+            i = 0 if since is None else int(np.searchsorted(times, since))
+            rec = np.empty(len(times) - i, dtype=RECORD)
+            rec["t"] = times[i:]
+            for name, col in zip("ohlcv", (buf.opens, buf.highs, buf.lows, buf.closes, buf.volumes)):
+                rec[name] = col[i:]
+        return self.write(symbol, rec)
+
+    def fetch_range(self, symbol: str, start: int, end: int) -> np.ndarray:
+        """1m records in [start, end) from Binance REST, paged by MAX_KLINES_LIMIT"""
+        rows: List[List[Any]] = []
+        cursor = start
+        while cursor < end:
+            res = get_ohlcv_binance(symbol, interval="1m", limit=MAX_KLINES_LIMIT, start_time=cursor)
+            if "error" in res:
+                raise RuntimeError(res["error"])
+            page = [r for r in res["ohlcv"] if int(r[0]) < end]
+            if not page:
+                break
+            rows.extend(page)
+            cursor = int(page[-1][0]) + STEP_MS
+        return from_rows(rows)
+
+    def sync(self, symbol: str, buf: CandleBuffer) -> int:
+        """
+        Worker hook: write new candles from the buffer, first filling any
+        gap between the end of the file and the buffer via REST (e.g. after
+        the worker was down longer than the buffer covers).
+        """
+        last = self.last_open_time(symbol)
+        first = buf.open_times[0] if len(buf) else None
+        added = 0
+        if last is not None and first is not None and first > last + STEP_MS:
+            added += self.write(symbol, self.fetch_range(symbol, last + STEP_MS, int(first)))
+        return added + self.write_buffer(symbol, buf, since=last)
+
+    def backfill(self, symbol: str, days: float) -> int:
+        """
+        Make the file cover at least the last `days` days. Missing head is
+        fetched and the file rewritten (old data kept), missing tail appended.
+        """
+        now = int(time.time() * 1000)
+        start = (now - int(days * 86_400_000)) // STEP_MS * STEP_MS
+        rec = self.records(symbol)
+        if rec is None:
+            return self.write(symbol, self.fetch_range(symbol, start, now + STEP_MS))
+
+        added = 0
+        first = int(rec["t"][0])
+        if start < first:
+            head = self.fetch_range(symbol, start, first)
+            if len(head):
+                tmp = self.path(symbol) + ".tmp"
+                with self._lock(symbol):
+                    with open(tmp, "wb") as f:
+                        f.write(head.tobytes())
+                        f.write(np.asarray(self.records(symbol)).tobytes())
+                    os.replace(tmp, self.path(symbol))
+                added += len(head)
+        last = int(rec["t"][-1])
+        return added + self.write(symbol, self.fetch_range(symbol, last, now + STEP_MS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local 1m candle history")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    bf = sub.add_parser("backfill", help="fetch missing history from Binance REST")
+    bf.add_argument("symbols", nargs="+")
+    bf.add_argument("--days", type=float, default=30)
+    bf.add_argument("--dir", default=CANDLE_HISTORY_DIR)
+    args = parser.parse_args()
+
+    history = CandleHistory(args.dir)
+    for sym in args.symbols:
+        sym = sym.upper()
+        start = time.time()
+        try:
+            added = history.backfill(sym, args.days)
+        except Exception as e:
+            print("Backfill error:", sym, e)
+            metrics.error("history_backfill")
+            continue
+        rec = history.records(sym)
+        print(f"{sym}: +{added} candles, {0 if rec is None else len(rec)} total ({time.time() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
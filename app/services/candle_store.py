@@ -0,0 +1,177 @@
+# app/services/candle_store.py
+"""
+Per-symbol in-memory OHLCV store.
+
+Setiap symbol punya CandleBuffer: ring buffer kapasitas tetap dengan kolom
+numerik berbasis numpy. Setelah backfill awal, refresh() hanya mengambil
+candle dengan open_time >= candle terakhir (Binance `startTime`), jadi
+candle yang masih open di-update in place dan candle baru di-append.
+
+Buffers are written with every value stored twice (at i and i + capacity),
+so the ordered window is always one contiguous slice and reads are zero-copy
+views.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.market_data import get_ohlcv_binance, interval_seconds
+
+# kline row index → column in CandleBuffer._data
+# (Binance row: [open_time, open, high, low, close, volume, ...])
+OPEN, HIGH, LOW, CLOSE, VOLUME = 1, 2, 3, 4, 5
+
+MAX_KLINES_LIMIT = 1000  # batas `limit` di Binance /klines
+
+
+class CandleBuffer:
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self._time = np.zeros(2 * capacity, dtype=np.int64)
+        self._data = np.zeros((5, 2 * capacity), dtype=np.float64)  # open, high, low, close, volume
+        self._start = 0
+        self._len = 0
+        self.updated_at = 0.0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i):
+        """Row access like the raw kline list: [open_time, open, high, low, close, volume]"""
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("candle index out of range")
+        pos = self._start + i
+        return [int(self._time[pos])] + self._data[:, pos].tolist()
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        if not self._len:
+            return None
+        return int(self._time[self._start + self._len - 1])
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+
+    def _write(self, pos: int, open_time: int, values):
+        self._time[pos] = open_time
+        self._time[pos + self.capacity] = open_time
+        self._data[:, pos] = values
+        self._data[:, pos + self.capacity] = values
+
+    def append(self, open_time: int, values):
+        if self._len < self.capacity:
+            pos = (self._start + self._len) % self.capacity
+            self._len += 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._write(pos, open_time, values)
+
+    def update_last(self, values):
+        pos = (self._start + self._len - 1) % self.capacity
+        self._write(pos, int(self._time[pos]), values)
+
+    def apply(self, rows: List[List[Any]]) -> int:
+        """
+        Merge raw kline rows (ascending open_time). Row with the same
+        open_time as the last candle replaces it in place, newer rows are
+        appended, older rows are ignored. Returns number of appended candles.
+        """
+        appended = 0
+        for row in rows:
+            open_time = int(row[0])
+            values = (float(row[OPEN]), float(row[HIGH]), float(row[LOW]), float(row[CLOSE]), float(row[VOLUME]))
+            last = self.last_open_time
+            if last is None or open_time > last:
+                self.append(open_time, values)
+                appended += 1
+            elif open_time == last:
+                self.update_last(values)
+        self.updated_at = time.time()
+        return appended
+
+    # ---------------------------------------------------------------
+    # column views (oldest → newest), no copy
+    # ---------------------------------------------------------------
+    def column(self, idx: int) -> np.ndarray:
+        """Column by kline row index (0=open_time, 1=open ... 5=volume)"""
+        if idx == 0:
+            return self._time[self._start:self._start + self._len]
+        return self._data[idx - 1, self._start:self._start + self._len]
+
+    @property
+    def open_times(self) -> np.ndarray:
+        return self.column(0)
+
+    @property
+    def opens(self) -> np.ndarray:
+        return self.column(OPEN)
+
+    @property
+    def highs(self) -> np.ndarray:
+        return self.column(HIGH)
+
+    @property
+    def lows(self) -> np.ndarray:
+        return self.column(LOW)
+
+    @property
+    def closes(self) -> np.ndarray:
+        return self.column(CLOSE)
+
+    @property
+    def volumes(self) -> np.ndarray:
+        return self.column(VOLUME)
+
+
+class CandleStore:
+    """CandleBuffer per symbol, filled from Binance klines"""
+
+    def __init__(self, interval: str = "1m", capacity: int = 200):
+        self.interval = interval
+        self.capacity = capacity
+        self._buffers: Dict[str, CandleBuffer] = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str) -> CandleBuffer:
+        with self._lock:
+            buf = self._buffers.get(symbol)
+            if buf is None:
+                buf = self._buffers[symbol] = CandleBuffer(self.capacity)
+            return buf
+
+    def _backfill(self, symbol: str, buf: CandleBuffer) -> Dict[str, Any]:
+        res = get_ohlcv_binance(symbol, interval=self.interval, limit=self.capacity)
+        if "error" in res:
+            return res  # candle lama tetap dipakai detector sampai backfill berhasil
+        buf.clear()
+        return {"symbol": symbol, "backfill": True, "new": buf.apply(res["ohlcv"])}
+
+    def refresh(self, symbol: str) -> Dict[str, Any]:
+        """Backfill on first call, afterwards fetch only candles since the last open_time"""
+        buf = self.get(symbol)
+        with buf.lock:
+            last = buf.last_open_time
+            if last is None:
+                return self._backfill(symbol, buf)
+
+            # perkiraan jumlah candle sejak last (+ candle yang masih open)
+            step_ms = interval_seconds(self.interval) * 1000
+            expected = int((time.time() * 1000 - last) // step_ms) + 2
+            if expected > MAX_KLINES_LIMIT:
+                # gap terlalu jauh (mis. worker sempat mati) → backfill ulang
+                return self._backfill(symbol, buf)
+
+            res = get_ohlcv_binance(symbol, interval=self.interval, limit=expected, start_time=last)
+            if "error" in res:
+                return res
+            return {"symbol": symbol, "backfill": False, "new": buf.apply(res["ohlcv"])}
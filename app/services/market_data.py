@@ -1,13 +1,20 @@
 # app/services/market_data.py
 
+import os
+import time
 import requests
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from app.metrics import cache_collector, upstream
+from app.services import ratelimit, resilience
+from app.services.cache import TTLCache
 
 # -------------------------------------------------------------------
 # BASE URLs
 # -------------------------------------------------------------------
-INDODAX_BASE = "https://indodax.com/api"
-BINANCE_BASE = "https://api.binance.com/api/v3"
+# bisa di-override, mis. ke mock server (app.benchmarks)
+INDODAX_BASE = os.getenv("INDODAX_BASE", "https://indodax.com/api")
+BINANCE_BASE = os.getenv("BINANCE_BASE", "https://api.binance.com/api/v3")
 
 # -------------------------------------------------------------------
 # GLOBAL SESSION (lebih cepat)
@@ -15,43 +22,194 @@ BINANCE_BASE = "https://api.binance.com/api/v3"
 SESSION = requests.Session()
 SESSION.headers.update({"User-Agent": "Indotrader/1.0"})
 
+# modul sync dipakai worker (polling), jadi antri sebagai BACKGROUND; API memakai market_data_async
+EXCHANGES = {INDODAX_BASE: "indodax", BINANCE_BASE: "binance"}
+
+
+def _get_json(endpoint: str, base_url: str, path: str, params: Optional[Dict[str, Any]] = None, timeout: float = 6) -> Any:
+    """GET through the endpoint's circuit breaker, the exchange's rate limit bucket and hedging"""
+    bucket = ratelimit.bucket(EXCHANGES[base_url])
+    cost = ratelimit.weight(bucket.name, path, params)
+    ep = resilience.endpoint(bucket.name, endpoint)
+    probe = ep.breaker.before()
+    try:
+        bucket.acquire(cost, ratelimit.BACKGROUND)
+    except ratelimit.RateLimited:
+        if probe:
+            ep.breaker.release()  # probe tidak pernah keluar: jangan tahan half-open sampai CB_RESET
+        raise
+
+    def attempt(i: int) -> Any:
+        if i and not bucket.try_acquire(cost):
+            raise ratelimit.RateLimited(f"{bucket.name}: no budget for hedge")
+        res = SESSION.get(f"{resilience.hedge_base(base_url, i)}{path}", params=params, timeout=timeout)
+        bucket.observe(res.status_code, res.headers)
+        res.raise_for_status()
+        return res.json()
+
+    return ep.call(attempt, probe)
+
+
+# -------------------------------------------------------------------
+# CACHE (TTL per jenis data, LRU, single-flight)
+# -------------------------------------------------------------------
+CACHE_TTL = {
+    "ticker": float(os.getenv("CACHE_TTL_TICKER", "1")),
+    "rate": float(os.getenv("CACHE_TTL_RATE", "5")),
+    "orderbook": float(os.getenv("CACHE_TTL_ORDERBOOK", "1")),
+    # klines di-cache sampai candle terakhir close, maksimal segini
+    "klines_max": float(os.getenv("CACHE_TTL_KLINES_MAX", "60")),
+    # range start_time yang semua candle-nya sudah close tidak berubah lagi
+    "klines_closed": float(os.getenv("CACHE_TTL_KLINES_CLOSED", "3600")),
+}
+CACHE = TTLCache(maxsize=int(os.getenv("CACHE_MAXSIZE", "2048")))
+cache_collector("market_data", CACHE.stats)
+
+# nilai lama yang masih boleh dipakai (TTLCache.get_or_fetch stale / stale_if_error):
+# sesudah TTL habis langsung dikirim sambil refresh di background selama CACHE_STALE_WHILE_REVALIDATE,
+# dan kalau upstream gagal / circuit open masih dipakai sampai umur CACHE_STALE_IF_ERROR
+CACHE_SWR = float(os.getenv("CACHE_STALE_WHILE_REVALIDATE", "2"))
+CACHE_STALE_IF_ERROR = float(os.getenv("CACHE_STALE_IF_ERROR", "120"))
+CACHE_STALE_RATE_IF_ERROR = float(os.getenv("CACHE_STALE_RATE_IF_ERROR", "3600"))  # kurs USDT/IDR bergerak lambat
+
+
+def mark_stale(value: Any, age: float) -> Any:
+    """Old value served from the cache; dict responses say so (floats, e.g. the rate, stay as is)"""
+    if isinstance(value, dict):
+        return {**value, "stale": True, "stale_age": round(age, 1)}
+    return value
+
+
+STALE_POLICY = {
+    "ticker": {"stale": CACHE_SWR, "stale_if_error": CACHE_STALE_IF_ERROR, "mark": mark_stale},
+    "orderbook": {"stale": CACHE_SWR, "stale_if_error": CACHE_STALE_IF_ERROR, "mark": mark_stale},
+    "rate": {"stale": CACHE_SWR, "stale_if_error": CACHE_STALE_RATE_IF_ERROR, "mark": mark_stale},
+    # candle yang baru close harus kelihatan, jadi tanpa stale-while-revalidate
+    "klines": {"stale_if_error": CACHE_STALE_IF_ERROR, "mark": mark_stale},
+}
+
+_INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def interval_seconds(interval: str) -> int:
+    """'1m' → 60, '4h' → 14400. Month ('1M') is approximated as 30 days."""
+    if interval.endswith("M"):
+        return int(interval[:-1]) * 30 * 86400
+    return int(interval[:-1]) * _INTERVAL_UNITS[interval[-1]]
+
+
+def klines_ttl(interval: str) -> float:
+    """Seconds until the currently open candle of `interval` closes"""
+    try:
+        step = interval_seconds(interval)
+    except (KeyError, ValueError):
+        return 0.0
+    return min(step - (time.time() % step), CACHE_TTL["klines_max"])
+
+
+def closed_range(interval: str, start_time: int, limit: int) -> bool:
+    """True when every candle of a start_time request has closed (open_time rounded up to the interval)"""
+    step_ms = interval_seconds(interval) * 1000
+    return start_time + (limit + 1) * step_ms <= time.time() * 1000
+
+
+def is_cacheable(value: Any) -> bool:
+    """Don't cache upstream failures ({"error": ...} or a 0.0 rate)"""
+    if isinstance(value, dict):
+        return "error" not in value
+    return bool(value)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return CACHE.stats()
+
+
+# -------------------------------------------------------------------
+# PARSERS (dipakai juga oleh market_data_async)
+# -------------------------------------------------------------------
+def parse_indodax_ticker(symbol_idr: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    d = data["ticker"]
+    return {
+        "exchange": "indodax",
+        "symbol": symbol_idr,
+        "last": float(d["last"]),
+        "high": float(d["high"]),
+        "low": float(d["low"]),
+        "vol": float(d.get("vol_idr") or d.get("vol")),
+        "raw": d,
+    }
+
+
+def parse_indodax_orderbook(symbol_idr: str, data: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    return {
+        "exchange": "indodax",
+        "symbol": symbol_idr,
+        "asks": data.get("asks", [])[:limit],
+        "bids": data.get("bids", [])[:limit],
+    }
+
+
+def parse_binance_ticker(symbol: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "exchange": "binance",
+        "symbol": symbol,
+        "price": float(data["price"]),
+    }
+
+
+def parse_binance_orderbook(symbol: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "exchange": "binance",
+        "symbol": symbol + "USDT",
+        "asks": data.get("asks", []),
+        "bids": data.get("bids", []),
+        "last_update_id": data.get("lastUpdateId"),
+    }
+
+
+def parse_usdt_idr_rate(data: Dict[str, Any]) -> float:
+    return float(data["ticker"]["last"])
+
+
+def build_idr_orderbook(symbol: str, ob: Dict[str, Any], rate: float) -> Dict[str, Any]:
+    """Convert a parsed Binance USDT orderbook into IDR using `rate`"""
+    def convert(rows: List[List[str]]):
+        return [[float(price) * rate, float(qty)] for price, qty in rows]
+
+    return {
+        "exchange": "binance",
+        "symbol": f"{symbol}_idr",
+        "asks": convert(ob["asks"]),
+        "bids": convert(ob["bids"]),
+    }
+
+
+def parse_ohlcv(symbol: str, interval: str, data: List[List[Any]]) -> Dict[str, Any]:
+    return {
+        "exchange": "binance",
+        "symbol": symbol,
+        "interval": interval,
+        "ohlcv": data,
+    }
+
 
 # -------------------------------------------------------------------
 # INDODAX API
 # -------------------------------------------------------------------
-def get_indodax_ticker(symbol_idr: str) -> Dict[str, Any]:
+def _fetch_indodax_ticker(symbol_idr: str) -> Dict[str, Any]:
     """symbol_idr example: 'btc_idr'"""
     try:
-        res = SESSION.get(f"{INDODAX_BASE}/ticker/{symbol_idr}", timeout=6)
-        res.raise_for_status()
-        d = res.json()["ticker"]
-        return {
-            "exchange": "indodax",
-            "symbol": symbol_idr,
-            "last": float(d["last"]),
-            "high": float(d["high"]),
-            "low": float(d["low"]),
-            "vol": float(d.get("vol_idr") or d.get("vol")),
-            "raw": d,
-        }
+        with upstream("indodax", "ticker"):
+            return parse_indodax_ticker(symbol_idr, _get_json("ticker", INDODAX_BASE, f"/ticker/{symbol_idr}"))
     except Exception as e:
         return {"error": str(e)}
 
 
-def get_indodax_orderbook(symbol_idr: str, limit: int = 50) -> Dict[str, Any]:
+def _fetch_indodax_orderbook(symbol_idr: str, limit: int = 50) -> Dict[str, Any]:
     """Indodax depth API → returns asks/bids"""
     try:
-        res = SESSION.get(f"{INDODAX_BASE}/{symbol_idr}/depth", timeout=6)
-        res.raise_for_status()
-        d = res.json()
-        asks = d.get("asks", [])[:limit]
-        bids = d.get("bids", [])[:limit]
-        return {
-            "exchange": "indodax",
-            "symbol": symbol_idr,
-            "asks": asks,
-            "bids": bids,
-        }
+        with upstream("indodax", "depth"):
+            return parse_indodax_orderbook(symbol_idr, _get_json("depth", INDODAX_BASE, f"/{symbol_idr}/depth"), limit)
     except Exception as e:
         return {"error": str(e)}
 
@@ -59,102 +217,131 @@ def get_indodax_orderbook(symbol_idr: str, limit: int = 50) -> Dict[str, Any]:
 # -------------------------------------------------------------------
 # BINANCE API (USDT market)
 # -------------------------------------------------------------------
-def get_binance_ticker(symbol: str) -> Dict[str, Any]:
+def _fetch_binance_ticker(symbol: str) -> Dict[str, Any]:
     """Get simple price ticker, e.g. BTCUSDT"""
     try:
-        res = SESSION.get(f"{BINANCE_BASE}/ticker/price", params={"symbol": symbol}, timeout=6)
-        res.raise_for_status()
-        data = res.json()
-        return {
-            "exchange": "binance",
-            "symbol": symbol,
-            "price": float(data["price"]),
-        }
+        with upstream("binance", "ticker_price"):
+            data = _get_json("ticker_price", BINANCE_BASE, "/ticker/price", params={"symbol": symbol})
+            return parse_binance_ticker(symbol, data)
     except Exception as e:
         return {"error": str(e)}
 
 
-def get_binance_price_usdt(symbol: str) -> Dict[str, Any]:
-    """Get price for {symbol}USDT (symbol example: 'BTC')"""
-    return get_binance_ticker(f"{symbol}USDT")
-
-
-def get_binance_orderbook_usdt(symbol: str, limit: int = 50) -> Dict[str, Any]:
+def _fetch_binance_orderbook_usdt(symbol: str, limit: int = 50) -> Dict[str, Any]:
     """Return orderbook for SYMBOL + USDT (e.g 'BTCUSDT')"""
     try:
-        res = SESSION.get(
-            f"{BINANCE_BASE}/depth",
-            params={"symbol": f"{symbol}USDT", "limit": limit},
-            timeout=6,
-        )
-        res.raise_for_status()
-        data = res.json()
-        return {
-            "exchange": "binance",
-            "symbol": symbol + "USDT",
-            "asks": data.get("asks", []),
-            "bids": data.get("bids", []),
-        }
+        with upstream("binance", "depth"):
+            data = _get_json("depth", BINANCE_BASE, "/depth", params={"symbol": f"{symbol}USDT", "limit": limit})
+            return parse_binance_orderbook(symbol, data)
     except Exception as e:
         return {"error": str(e)}
 
 
 # -------------------------------------------------------------------
-# CONVERSION USDT → IDR
+# USDT → IDR RATE
 # -------------------------------------------------------------------
-def get_usdt_idr_rate() -> float:
+def _fetch_usdt_idr_rate() -> float:
     """Get USDT → IDR rate from Indodax"""
     try:
-        res = SESSION.get(f"{INDODAX_BASE}/ticker/usdt_idr", timeout=6)
-        res.raise_for_status()
-        data = res.json()["ticker"]
-        return float(data["last"])
+        with upstream("indodax", "ticker_usdt_idr"):
+            return parse_usdt_idr_rate(_get_json("ticker_usdt_idr", INDODAX_BASE, "/ticker/usdt_idr"))
     except Exception:
         return 0.0  # fallback, lebih baik error ke client
 
 
-def convert_binance_orderbook_to_idr(symbol: str, limit: int = 50) -> Dict[str, Any]:
-    """Fetch binance orderbook then convert all prices from USDT → IDR"""
-    ob = get_binance_orderbook_usdt(symbol, limit=limit)
-    if "error" in ob:
-        return ob
-
-    rate = get_usdt_idr_rate()
-    if not rate:
-        return {"error": "failed to get USDT->IDR rate"}
-
-    def convert(rows: List[List[str]]):
-        return [[float(price) * rate, float(qty)] for price, qty in rows]
-
-    return {
-        "exchange": "binance",
-        "symbol": f"{symbol}_idr",
-        "asks": convert(ob["asks"]),
-        "bids": convert(ob["bids"]),
-    }
-
-
 # -------------------------------------------------------------------
 # OHLCV / KLINE
 # -------------------------------------------------------------------
-def get_ohlcv_binance(symbol: str, interval: str = "1m", limit: int = 500) -> Dict[str, Any]:
+def _fetch_ohlcv_binance(symbol: str, interval: str = "1m", limit: int = 500, start_time: Optional[int] = None) -> Dict[str, Any]:
     """
     Get kline candles from Binance (e.g. BTCUSDT)
     Returns 2D-array: [ [open_time, open, high, low, close, volume, ...], ... ]
     """
+    params = {"symbol": f"{symbol}USDT", "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = start_time
     try:
-        res = SESSION.get(
-            f"{BINANCE_BASE}/klines",
-            params={"symbol": f"{symbol}USDT", "interval": interval, "limit": limit},
-            timeout=8,
-        )
-        res.raise_for_status()
-        data = res.json()
-        return {
-            "exchange": "binance",
-            "symbol": symbol,
-            "interval": interval,
-            "ohlcv": data,
-        }
+        with upstream("binance", "klines"):
+            return parse_ohlcv(symbol, interval, _get_json("klines", BINANCE_BASE, "/klines", params=params, timeout=8))
     except Exception as e:
         return {"error": str(e)}
+
+
+# -------------------------------------------------------------------
+# CACHED PUBLIC API
+# -------------------------------------------------------------------
+def get_indodax_ticker(symbol_idr: str) -> Dict[str, Any]:
+    """symbol_idr example: 'btc_idr'"""
+    return CACHE.get_or_fetch(
+        ("indodax_ticker", symbol_idr), CACHE_TTL["ticker"],
+        lambda: _fetch_indodax_ticker(symbol_idr), is_cacheable, **STALE_POLICY["ticker"],
+    )
+
+
+def get_indodax_orderbook(symbol_idr: str, limit: int = 50) -> Dict[str, Any]:
+    """Indodax depth API → returns asks/bids"""
+    return CACHE.get_or_fetch(
+        ("indodax_depth", symbol_idr, limit), CACHE_TTL["orderbook"],
+        lambda: _fetch_indodax_orderbook(symbol_idr, limit), is_cacheable, **STALE_POLICY["orderbook"],
+    )
+
+
+def get_binance_ticker(symbol: str) -> Dict[str, Any]:
+    """Get simple price ticker, e.g. BTCUSDT"""
+    return CACHE.get_or_fetch(
+        ("binance_ticker", symbol), CACHE_TTL["ticker"],
+        lambda: _fetch_binance_ticker(symbol), is_cacheable, **STALE_POLICY["ticker"],
+    )
+
+
+def get_binance_price_usdt(symbol: str) -> Dict[str, Any]:
+    """Get price for {symbol}USDT (symbol example: 'BTC')"""
+    return get_binance_ticker(f"{symbol}USDT")
+
+
+def get_binance_orderbook_usdt(symbol: str, limit: int = 50) -> Dict[str, Any]:
+    """Return orderbook for SYMBOL + USDT (e.g 'BTCUSDT')"""
+    return CACHE.get_or_fetch(
+        ("binance_depth", symbol, limit), CACHE_TTL["orderbook"],
+        lambda: _fetch_binance_orderbook_usdt(symbol, limit), is_cacheable, **STALE_POLICY["orderbook"],
+    )
+
+
+def get_usdt_idr_rate() -> float:
+    """Get USDT → IDR rate from Indodax"""
+    return CACHE.get_or_fetch(
+        ("usdt_idr_rate",), CACHE_TTL["rate"],
+        _fetch_usdt_idr_rate, is_cacheable, **STALE_POLICY["rate"],
+    )
+
+
+def get_ohlcv_binance(symbol: str, interval: str = "1m", limit: int = 500, start_time: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Get kline candles from Binance (e.g. BTCUSDT)
+    Returns 2D-array: [ [open_time, open, high, low, close, volume, ...], ... ]
+
+    start_time (ms) only returns candles opened at/after it. Those are
+    incremental polls (see candle_store) and always bypass the cache.
+    """
+    if start_time is not None:
+        return _fetch_ohlcv_binance(symbol, interval, limit, start_time)
+    return CACHE.get_or_fetch(
+        ("klines", symbol, interval, limit), klines_ttl(interval),
+        lambda: _fetch_ohlcv_binance(symbol, interval, limit), is_cacheable, **STALE_POLICY["klines"],
+    )
+
+
+# -------------------------------------------------------------------
+# CONVERSION USDT → IDR
+# -------------------------------------------------------------------
+def convert_binance_orderbook_to_idr(symbol: str, limit: int = 50) -> Dict[str, Any]:
+    """Fetch binance orderbook then convert all prices from USDT → IDR"""
+    ob = get_binance_orderbook_usdt(symbol, limit=limit)
+    if "error" in ob:
+        return ob
+
+    rate = get_usdt_idr_rate()
+    if not rate:
+        return {"error": "failed to get USDT->IDR rate"}
+
+    return build_idr_orderbook(symbol, ob, rate)
@@ -0,0 +1,284 @@
+# app/services/market_data_async.py
+"""
+Async version of app.services.market_data.
+
+Same function names and return shapes, but every call goes through a pooled
+httpx.AsyncClient (keep-alive) so the FastAPI routes can fan out to several
+upstreams concurrently instead of blocking a threadpool slot per call.
+Each exchange gets its own client, which gives us per-host connection limits.
+Results share the TTL cache / single-flight of the sync module (CACHE).
+"""
+
+import os
+import asyncio
+import httpx
+from typing import Dict, Any, Optional
+
+from app.metrics import upstream
+from app.services import ratelimit, resilience
+from app.services.market_data import (
+    INDODAX_BASE,
+    BINANCE_BASE,
+    EXCHANGES,
+    CACHE,
+    CACHE_TTL,
+    STALE_POLICY,
+    closed_range,
+    interval_seconds,
+    klines_ttl,
+    is_cacheable,
+    parse_indodax_ticker,
+    parse_indodax_orderbook,
+    parse_binance_ticker,
+    parse_binance_orderbook,
+    parse_usdt_idr_rate,
+    build_idr_orderbook,
+    parse_ohlcv,
+)
+from app.services.candle_store import MAX_KLINES_LIMIT
+
+# -------------------------------------------------------------------
+# POOL CONFIG (per host)
+# -------------------------------------------------------------------
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _client(base_url: str) -> httpx.AsyncClient:
+    """Lazily create one pooled client per upstream host"""
+    client = _clients.get(base_url)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"User-Agent": "Indotrader/1.0"},
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _clients[base_url] = client
+    return client
+
+
+async def aclose():
+    """Close all pooled clients (call on app shutdown)"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+async def _get_json(endpoint: str, base_url: str, path: str, params: Optional[Dict[str, Any]] = None, timeout: float = 6) -> Any:
+    """
+    GET through the endpoint's circuit breaker, the exchange's rate limit
+    bucket (API requests queue ahead of worker polling) and hedging.
+    """
+    bucket = ratelimit.bucket(EXCHANGES[base_url])
+    cost = ratelimit.weight(bucket.name, path, params)
+    ep = resilience.endpoint(bucket.name, endpoint)
+    probe = ep.breaker.before()
+    try:
+        await bucket.aacquire(cost, ratelimit.INTERACTIVE)
+    except ratelimit.RateLimited:
+        if probe:
+            ep.breaker.release()  # probe tidak pernah keluar: jangan tahan half-open sampai CB_RESET
+        raise
+
+    async def attempt(i: int) -> Any:
+        if i and not bucket.try_acquire(cost):
+            raise ratelimit.RateLimited(f"{bucket.name}: no budget for hedge")
+        res = await _client(resilience.hedge_base(base_url, i)).get(path, params=params, timeout=timeout)
+        bucket.observe(res.status_code, res.headers)
+        res.raise_for_status()
+        return res.json()
+
+    return await ep.acall(attempt, probe)
+
+
+# -------------------------------------------------------------------
+# INDODAX API
+# -------------------------------------------------------------------
+async def _fetch_indodax_ticker(symbol_idr: str) -> Dict[str, Any]:
+    """symbol_idr example: 'btc_idr'"""
+    try:
+        with upstream("indodax", "ticker"):
+            data = await _get_json("ticker", INDODAX_BASE, f"/ticker/{symbol_idr}")
+            return parse_indodax_ticker(symbol_idr, data)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def _fetch_indodax_orderbook(symbol_idr: str, limit: int = 50) -> Dict[str, Any]:
+    """Indodax depth API → returns asks/bids"""
+    try:
+        with upstream("indodax", "depth"):
+            data = await _get_json("depth", INDODAX_BASE, f"/{symbol_idr}/depth")
+            return parse_indodax_orderbook(symbol_idr, data, limit)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# -------------------------------------------------------------------
+# BINANCE API (USDT market)
+# -------------------------------------------------------------------
+async def _fetch_binance_ticker(symbol: str) -> Dict[str, Any]:
+    """Get simple price ticker, e.g. BTCUSDT"""
+    try:
+        with upstream("binance", "ticker_price"):
+            data = await _get_json("ticker_price", BINANCE_BASE, "/ticker/price", params={"symbol": symbol})
+            return parse_binance_ticker(symbol, data)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def _fetch_binance_orderbook_usdt(symbol: str, limit: int = 50) -> Dict[str, Any]:
+    """Return orderbook for SYMBOL + USDT (e.g 'BTCUSDT')"""
+    try:
+        with upstream("binance", "depth"):
+            data = await _get_json("depth", BINANCE_BASE, "/depth", params={"symbol": f"{symbol}USDT", "limit": limit})
+            return parse_binance_orderbook(symbol, data)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# -------------------------------------------------------------------
+# USDT → IDR RATE
+# -------------------------------------------------------------------
+async def _fetch_usdt_idr_rate() -> float:
+    """Get USDT → IDR rate from Indodax"""
+    try:
+        with upstream("indodax", "ticker_usdt_idr"):
+            data = await _get_json("ticker_usdt_idr", INDODAX_BASE, "/ticker/usdt_idr")
+            return parse_usdt_idr_rate(data)
+    except Exception:
+        return 0.0
+
+
+# -------------------------------------------------------------------
+# OHLCV / KLINE
+# -------------------------------------------------------------------
+async def _fetch_ohlcv_binance(symbol: str, interval: str = "1m", limit: int = 500, start_time: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Get kline candles from Binance (e.g. BTCUSDT)
+    Returns 2D-array: [ [open_time, open, high, low, close, volume, ...], ... ]
+    """
+    params = {"symbol": f"{symbol}USDT", "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = start_time
+    try:
+        with upstream("binance", "klines"):
+            data = await _get_json("klines", BINANCE_BASE, "/klines", params=params, timeout=8)
+            return parse_ohlcv(symbol, interval, data)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# -------------------------------------------------------------------
+# CACHED PUBLIC API
+# -------------------------------------------------------------------
+async def get_indodax_ticker(symbol_idr: str) -> Dict[str, Any]:
+    """symbol_idr example: 'btc_idr'"""
+    return await CACHE.aget_or_fetch(
+        ("indodax_ticker", symbol_idr), CACHE_TTL["ticker"],
+        lambda: _fetch_indodax_ticker(symbol_idr), is_cacheable, **STALE_POLICY["ticker"],
+    )
+
+
+async def get_indodax_orderbook(symbol_idr: str, limit: int = 50) -> Dict[str, Any]:
+    """Indodax depth API → returns asks/bids"""
+    return await CACHE.aget_or_fetch(
+        ("indodax_depth", symbol_idr, limit), CACHE_TTL["orderbook"],
+        lambda: _fetch_indodax_orderbook(symbol_idr, limit), is_cacheable, **STALE_POLICY["orderbook"],
+    )
+
+
+async def get_binance_ticker(symbol: str) -> Dict[str, Any]:
+    """Get simple price ticker, e.g. BTCUSDT"""
+    return await CACHE.aget_or_fetch(
+        ("binance_ticker", symbol), CACHE_TTL["ticker"],
+        lambda: _fetch_binance_ticker(symbol), is_cacheable, **STALE_POLICY["ticker"],
+    )
+
+
+async def get_binance_price_usdt(symbol: str) -> Dict[str, Any]:
+    """Get price for {symbol}USDT (symbol example: 'BTC')"""
+    return await get_binance_ticker(f"{symbol}USDT")
+
+
+async def get_binance_orderbook_usdt(symbol: str, limit: int = 50) -> Dict[str, Any]:
+    """Return orderbook for SYMBOL + USDT (e.g 'BTCUSDT')"""
+    return await CACHE.aget_or_fetch(
+        ("binance_depth", symbol, limit), CACHE_TTL["orderbook"],
+        lambda: _fetch_binance_orderbook_usdt(symbol, limit), is_cacheable, **STALE_POLICY["orderbook"],
+    )
+
+
+async def get_usdt_idr_rate() -> float:
+    """Get USDT → IDR rate from Indodax"""
+    return await CACHE.aget_or_fetch(
+        ("usdt_idr_rate",), CACHE_TTL["rate"],
+        _fetch_usdt_idr_rate, is_cacheable, **STALE_POLICY["rate"],
+    )
+
+
+async def get_ohlcv_binance(symbol: str, interval: str = "1m", limit: int = 500, start_time: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Get kline candles from Binance (e.g. BTCUSDT)
+    Returns 2D-array: [ [open_time, open, high, low, close, volume, ...], ... ]
+    start_time requests are cached only when all their candles have closed;
+    a range that reaches the open candle always goes upstream.
+    """
+    if start_time is not None:
+        if not closed_range(interval, start_time, limit):
+            return await _fetch_ohlcv_binance(symbol, interval, limit, start_time)
+        return await CACHE.aget_or_fetch(
+            ("klines_range", symbol, interval, start_time, limit), CACHE_TTL["klines_closed"],
+            lambda: _fetch_ohlcv_binance(symbol, interval, limit, start_time), is_cacheable, **STALE_POLICY["klines"],
+        )
+    return await CACHE.aget_or_fetch(
+        ("klines", symbol, interval, limit), klines_ttl(interval),
+        lambda: _fetch_ohlcv_binance(symbol, interval, limit), is_cacheable, **STALE_POLICY["klines"],
+    )
+
+
+async def get_ohlcv_pages(symbol: str, interval: str, limit: int, start_time: int) -> Dict[str, Any]:
+    """
+    Up to `limit` candles opened at/after start_time, in MAX_KLINES_LIMIT
+    pages fetched concurrently (Binance caps one /klines call at 1000).
+    Pages that only hold closed candles come from the cache.
+    """
+    step_ms = interval_seconds(interval) * 1000
+    starts = range(start_time, start_time + limit * step_ms, MAX_KLINES_LIMIT * step_ms)
+    pages = await asyncio.gather(*(
+        get_ohlcv_binance(symbol, interval, min(MAX_KLINES_LIMIT, limit - i * MAX_KLINES_LIMIT), start)
+        for i, start in enumerate(starts)
+    ))
+    rows = []
+    for page in pages:
+        if "error" in page:
+            return page
+        # page berikutnya mulai setelah candle terakhir page ini (tidak dobel kalau start tidak rata)
+        last = rows[-1][0] if rows else None
+        rows.extend(row for row in page["ohlcv"] if last is None or row[0] > last)
+    return parse_ohlcv(symbol, interval, rows[:limit])
+
+
+# -------------------------------------------------------------------
+# CONVERSION USDT → IDR
+# -------------------------------------------------------------------
+async def convert_binance_orderbook_to_idr(symbol: str, limit: int = 50) -> Dict[str, Any]:
+    """Fetch binance orderbook and USDT → IDR rate concurrently, then convert"""
+    ob, rate = await asyncio.gather(
+        get_binance_orderbook_usdt(symbol, limit=limit),
+        get_usdt_idr_rate(),
+    )
+    if "error" in ob:
+        return ob
+    if not rate:
+        return {"error": "failed to get USDT->IDR rate"}
+
+    return build_idr_orderbook(symbol, ob, rate)
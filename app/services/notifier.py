@@ -0,0 +1,297 @@
+# app/services/notifier.py
+"""
+Telegram notification outbox.
+
+Worker cukup enqueue() lalu lanjut; satu sender thread yang mengirim ke
+Telegram, jadi API Telegram yang lambat / down tidak menahan deteksi.
+
+- recipients: TELEGRAM_CHAT_ID (boleh beberapa, dipisah koma) + setiap User
+  dengan telegram_enabled, memakai User.telegram_token sebagai chat id
+  untuk bot TELEGRAM_TOKEN. Daftar di-refresh dari DB tiap
+  NOTIFY_RECIPIENTS_REFRESH detik.
+- dedup: pesan dengan key yang sama dalam NOTIFY_DEDUP_WINDOW detik dibuang.
+- batching: pesan per chat dikumpulkan selama NOTIFY_BATCH_WINDOW detik lalu
+  digabung jadi satu message (max 4096 karakter, dipotong hanya di antara
+  pesan; satu pesan yang terlalu panjang dibuang tag HTML-nya dulu).
+- rate limit: token bucket per chat (1 msg/s, grup 20 msg/menit) dan global
+  (NOTIFY_GLOBAL_RATE), sesuai batas Telegram Bot API.
+- retry: error jaringan / 5xx dengan exponential backoff, 429 menunggu
+  `retry_after` dari Telegram.
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import requests
+
+from app import metrics
+from app.db import SessionLocal
+from app.model import User
+
+TELEGRAM_API = os.getenv("TELEGRAM_API", "https://api.telegram.org")
+TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+NOTIFY_BATCH_WINDOW = float(os.getenv("NOTIFY_BATCH_WINDOW", "2"))  # detik
+NOTIFY_DEDUP_WINDOW = float(os.getenv("NOTIFY_DEDUP_WINDOW", "600"))  # detik
+NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "25"))  # msg/s, Telegram: ~30/s per bot
+NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "5"))
+NOTIFY_RECIPIENTS_REFRESH = float(os.getenv("NOTIFY_RECIPIENTS_REFRESH", "60"))
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "10000"))
+
+MAX_MESSAGE_CHARS = 4096
+CHAT_RATE = 1.0  # msg/s per private chat
+GROUP_RATE = 20 / 60  # msg/s per grup (chat id negatif)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 = available now)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+_TAG = re.compile(r"<[^>]*>")
+_PARTIAL = re.compile(r"<[^>]*$|&[^;\s]*$")
+
+
+def truncate_html(text: str, limit: int = MAX_MESSAGE_CHARS) -> str:
+    """
+    Cut a parse_mode=HTML text to `limit` chars without leaving an unclosed
+    tag (Telegram answers 400 and the whole batch would be dropped): tags
+    are stripped from an over-long text, and a cut-off entity is removed.
+    """
+    if len(text) <= limit:
+        return text
+    text = _TAG.sub("", text)
+    if len(text) <= limit:
+        return text
+    return _PARTIAL.sub("", text[:limit])
+
+
+class ChatOutbox:
+    """Pending texts of one chat plus its rate limit / retry state"""
+
+    def __init__(self, chat_id: str):
+        self.chat_id = chat_id
+        self.pending: Deque[str] = deque()
+        self.first_at = 0.0
+        self.bucket = TokenBucket(GROUP_RATE if chat_id.startswith("-") else CHAT_RATE)
+        self.not_before = 0.0  # backoff / retry_after
+        self.attempts = 0
+
+    def add(self, text: str, now: float):
+        if not self.pending:
+            self.first_at = now
+        self.pending.append(text)
+
+    def take_batch(self) -> List[str]:
+        """Pop as many pending texts as fit into one Telegram message (split only between texts)"""
+        batch: List[str] = []
+        size = 0
+        while self.pending:
+            text = self.pending[0]
+            extra = len(text) + (1 if batch else 0)
+            if batch and size + extra > MAX_MESSAGE_CHARS:
+                break
+            text = truncate_html(self.pending.popleft())
+            batch.append(text)
+            size += len(text) + (1 if len(batch) > 1 else 0)
+        return batch
+
+
+class Notifier:
+    def __init__(self, token: str = TELEGRAM_TOKEN, chat_ids: str = TELEGRAM_CHAT_ID):
+        self.token = token
+        self.static_chats = [c.strip() for c in chat_ids.split(",") if c.strip()]
+        self.session = requests.Session()
+        self.sent = 0
+        self.failed = 0
+        self.deduped = 0
+        self.dropped = 0
+
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=NOTIFY_QUEUE_SIZE)
+        self._seen: Dict[str, float] = {}
+        self._seen_lock = threading.Lock()
+        self._outboxes: Dict[str, ChatOutbox] = {}
+        self._global = TokenBucket(NOTIFY_GLOBAL_RATE, capacity=NOTIFY_GLOBAL_RATE)
+        self._recipients: List[str] = list(self.static_chats)
+        self._recipients_at = 0.0
+        self._closing = False
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    def start(self) -> Optional[threading.Thread]:
+        if not self.enabled:
+            print("Telegram not configured")
+            return None
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def enqueue(self, text: str, key: Optional[str] = None) -> bool:
+        """
+        Queue a message for every recipient. Messages with the same key
+        inside the dedup window are dropped. Never blocks.
+        """
+        if not self.enabled or self._closing:
+            return False
+        if key is not None:
+            now = time.monotonic()
+            with self._seen_lock:
+                last = self._seen.get(key)
+                if last is not None and now - last < NOTIFY_DEDUP_WINDOW:
+                    self.deduped += 1
+                    return False
+                self._seen[key] = now  # stamp sebelum put: enqueue bersamaan dengan key sama tidak lolos dua-duanya
+        try:
+            self._queue.put_nowait(text)
+        except queue.Full:
+            self.dropped += 1
+            if key is not None:
+                # tidak terkirim: alert berikutnya dengan key ini bukan duplikat
+                with self._seen_lock:
+                    if self._seen.get(key) == now:
+                        if last is None:
+                            del self._seen[key]
+                        else:
+                            self._seen[key] = last
+            return False
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Stop accepting messages and try to deliver what is pending"""
+        self._closing = True
+        if self._thread is None:
+            return
+        self._thread.join(timeout)
+        self._stopped.set()
+
+    # ---------------------------------------------------------------
+    # sender thread
+    # ---------------------------------------------------------------
+    def recipients(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._recipients_at >= NOTIFY_RECIPIENTS_REFRESH:
+            self._recipients_at = now
+            db = SessionLocal()
+            try:
+                users = db.query(User.telegram_token).filter(User.telegram_enabled.is_(True)).all()
+                chats = list(self.static_chats)
+                for (chat_id,) in users:
+                    if chat_id and chat_id.strip() not in chats:
+                        chats.append(chat_id.strip())
+                self._recipients = chats
+            except Exception as e:
+                print("Notifier recipients error:", e)  # pakai daftar lama
+                metrics.error("notifier_recipients")
+            finally:
+                db.close()
+        return self._recipients
+
+    def _run(self):
+        while not self._stopped.is_set():
+            now = time.monotonic()
+            try:
+                text = self._queue.get(timeout=self._next_due(now))
+                now = time.monotonic()
+                self._fan_out(text, now)
+                while True:
+                    self._fan_out(self._queue.get_nowait(), now)
+            except queue.Empty:
+                pass
+            self._prune_seen(now)
+            self._send_due()
+            if self._closing and self._queue.empty() and not any(o.pending for o in self._outboxes.values()):
+                return
+
+    def _fan_out(self, text: str, now: float):
+        for chat_id in self.recipients():
+            box = self._outboxes.get(chat_id)
+            if box is None:
+                box = self._outboxes[chat_id] = ChatOutbox(chat_id)
+            box.add(text, now)
+
+    def _next_due(self, now: float) -> float:
+        """How long the sender may block on the queue"""
+        due = 1.0
+        for box in self._outboxes.values():
+            if box.pending:
+                ready = max(box.first_at + NOTIFY_BATCH_WINDOW, box.not_before)
+                due = min(due, ready - now)
+        return min(max(due, 0.05), 1.0)
+
+    def _prune_seen(self, now: float):
+        with self._seen_lock:
+            if len(self._seen) > 1000:
+                self._seen = {k: t for k, t in self._seen.items() if now - t < NOTIFY_DEDUP_WINDOW}
+
+    def _send_due(self):
+        for box in list(self._outboxes.values()):
+            now = time.monotonic()
+            if not box.pending or now < box.not_before:
+                continue
+            if not self._closing and now - box.first_at < NOTIFY_BATCH_WINDOW:
+                continue
+            if box.bucket.wait_time(now) or self._global.wait_time(now):
+                continue
+            batch = box.take_batch()
+            box.bucket.take()
+            self._global.take()
+            retry_after = self._send(box.chat_id, "\n".join(batch))
+            if retry_after is None:
+                box.attempts = 0
+                self.sent += 1
+            elif box.attempts + 1 >= NOTIFY_MAX_RETRIES or retry_after < 0:
+                print("Telegram send failed, dropped", len(batch), "message(s) for chat", box.chat_id)
+                box.attempts = 0
+                self.failed += 1
+            else:
+                box.attempts += 1
+                box.not_before = now + retry_after
+                box.pending.extendleft(reversed(batch))
+            if box.pending:
+                box.first_at = now  # sisa batch / retry: tunggu window berikutnya
+
+    def _send(self, chat_id: str, text: str) -> Optional[float]:
+        """None on success, seconds to wait before retrying, or -1 if retrying is pointless"""
+        url = f"{TELEGRAM_API}/bot{self.token}/sendMessage"
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+        backoff = min(2 ** self._outboxes[chat_id].attempts, 60)
+        try:
+            r = self.session.post(url, json=payload, timeout=6)
+        except Exception as e:
+            print("Telegram send error:", e)
+            metrics.error("telegram")
+            return backoff
+        if r.ok:
+            return None
+        try:
+            body = r.json()
+        except ValueError:
+            body = {}
+        print("Telegram send error:", r.status_code, body.get("description", r.text[:200]))
+        metrics.error("telegram")
+        if r.status_code == 429:
+            return float(body.get("parameters", {}).get("retry_after", backoff))
+        if r.status_code >= 500:
+            return backoff
+        return -1  # 400 / 403: chat tidak ada, bot diblokir, HTML invalid
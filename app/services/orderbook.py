@@ -0,0 +1,237 @@
+# app/services/orderbook.py
+"""
+In-memory L2 order book.
+
+Level harga disimpan di list terurut (bisect), jadi update diff per level
+O(log n) + memmove dan baca top-N cuma O(N). Harga disimpan dalam mata
+uang aslinya (USDT untuk Binance); konversi ke IDR dilakukan saat dibaca
+(`rate`), tidak ada list baru per level per request.
+
+Binance diff depth is kept in sync the documented way: REST snapshot
+(lastUpdateId) + buffered `depth@100ms` events, dropping events older than
+the snapshot and resyncing whenever the U/u sequence has a gap (BookSync).
+"""
+
+import heapq
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+
+class BookSide:
+    """One side of the book, best level first (asks ascending, bids descending)"""
+
+    def __init__(self, descending: bool):
+        self._sign = -1.0 if descending else 1.0
+        self._keys: List[float] = []  # sign * price, selalu ascending
+        self._qty: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self):
+        self._keys.clear()
+        self._qty.clear()
+
+    def set(self, price: float, qty: float):
+        """Set level quantity; qty 0 removes the level"""
+        key = self._sign * price
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            if qty:
+                self._qty[i] = qty
+            else:
+                del self._keys[i]
+                del self._qty[i]
+        elif qty:
+            self._keys.insert(i, key)
+            self._qty.insert(i, qty)
+
+    def update(self, levels: Iterable[Sequence[Any]]):
+        for price, qty in levels:
+            self.set(float(price), float(qty))
+
+    def load(self, levels: Iterable[Sequence[Any]]):
+        rows = sorted((self._sign * float(p), float(q)) for p, q in levels if float(q))
+        self._keys = [k for k, _ in rows]
+        self._qty = [q for _, q in rows]
+
+    def best(self) -> Optional[float]:
+        return self._sign * self._keys[0] if self._keys else None
+
+    def top(self, n: int, rate: float = 1.0) -> List[List[float]]:
+        """[[price * rate, qty], ...] of the best n levels"""
+        f = self._sign * rate
+        return [[k * f, q] for k, q in zip(self._keys[:n], self._qty[:n])]
+
+    def cumulative(self, n: int, rate: float = 1.0) -> List[List[float]]:
+        """[[price * rate, qty, cumulative qty], ...] of the best n levels"""
+        f = self._sign * rate
+        qty = self._qty[:n]
+        return [[k * f, q, c] for k, q, c in zip(self._keys[:n], qty, accumulate(qty))]
+
+
+class OrderBook:
+    def __init__(self, exchange: str, symbol: str):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.asks = BookSide(descending=False)
+        self.bids = BookSide(descending=True)
+        self.last_update_id = 0
+        self.updated_at = 0.0
+
+    def load_snapshot(self, asks, bids, last_update_id: int = 0):
+        self.asks.load(asks)
+        self.bids.load(bids)
+        self.last_update_id = last_update_id
+        self.updated_at = time.time()
+
+    def apply_diff(self, asks, bids, final_id: int = 0):
+        self.asks.update(asks)
+        self.bids.update(bids)
+        if final_id:
+            self.last_update_id = final_id
+        self.updated_at = time.time()
+
+    def top(self, n: int, rate: float = 1.0) -> Dict[str, List[List[float]]]:
+        return {"asks": self.asks.top(n, rate), "bids": self.bids.top(n, rate)}
+
+    def depth(self, n: int, rate: float = 1.0) -> Dict[str, List[List[float]]]:
+        return {"asks": self.asks.cumulative(n, rate), "bids": self.bids.cumulative(n, rate)}
+
+
+# -------------------------------------------------------------------
+# BINANCE DIFF DEPTH SYNC
+# -------------------------------------------------------------------
+class BookSync:
+    """
+    Keeps an OrderBook in sync with Binance `depth` diff events.
+    Events are buffered until a REST snapshot is loaded; afterwards each
+    event must continue the sequence (U == previous u + 1) or the book is
+    marked unsynced and needs a new snapshot.
+    """
+
+    MAX_BUFFER = 1000
+
+    def __init__(self, book: OrderBook):
+        self.book = book
+        self.synced = False
+        self._buffer: List[Dict[str, Any]] = []
+        self.resyncs = 0
+
+    def on_event(self, event: Dict[str, Any]) -> bool:
+        """Feed one diff event ({"U", "u", "a", "b"}). Returns False if a snapshot is needed."""
+        if not self.synced:
+            self._buffer.append(event)
+            if len(self._buffer) > self.MAX_BUFFER:
+                del self._buffer[0]
+            return False
+        if event["u"] <= self.book.last_update_id:
+            return True
+        if event["U"] != self.book.last_update_id + 1:
+            self.reset()
+            self._buffer.append(event)
+            return False
+        self.book.apply_diff(event["a"], event["b"], event["u"])
+        return True
+
+    def reset(self):
+        self.synced = False
+        self.resyncs += 1
+
+    def load_snapshot(self, snapshot: Dict[str, Any]) -> bool:
+        """Load a REST snapshot ({"asks", "bids", "last_update_id"}) and replay buffered events"""
+        last_id = snapshot.get("last_update_id") or 0
+        self.book.load_snapshot(snapshot["asks"], snapshot["bids"], last_id)
+        buffered, self._buffer = self._buffer, []
+        first = True
+        for i, event in enumerate(buffered):
+            if event["u"] <= last_id:
+                continue
+            if (event["U"] > last_id + 1) if first else (event["U"] != self.book.last_update_id + 1):
+                # snapshot terlalu lama / ada gap: simpan sisa event, ambil snapshot baru
+                self._buffer = buffered[i:]
+                return False
+            first = False
+            self.book.apply_diff(event["a"], event["b"], event["u"])
+        self.synced = True
+        return True
+
+
+# -------------------------------------------------------------------
+# MERGED BOOK (IDR)
+# -------------------------------------------------------------------
+def _tagged(side: BookSide, n: int, rate: float, exchange: str):
+    for price, qty in side.top(n, rate):
+        yield [price, qty, exchange]
+
+
+def merged_top(books: Dict[str, "tuple"], n: int, cumulative: bool = False) -> Dict[str, List[List[Any]]]:
+    """
+    Merge several books into one IDR book. `books` maps exchange name →
+    (OrderBook, rate to IDR). Each side reads only the best n levels per
+    book and merges them in O(n · books).
+    Rows: [price_idr, qty, exchange] (+ cumulative qty if cumulative).
+    """
+    asks = heapq.merge(*(_tagged(b.asks, n, r, ex) for ex, (b, r) in books.items()), key=lambda row: row[0])
+    bids = heapq.merge(*(_tagged(b.bids, n, r, ex) for ex, (b, r) in books.items()), key=lambda row: -row[0])
+    out = {"asks": [row for _, row in zip(range(n), asks)], "bids": [row for _, row in zip(range(n), bids)]}
+    if cumulative:
+        for rows in out.values():
+            total = 0.0
+            for row in rows:
+                total += row[1]
+                row.append(total)
+    return out
+
+
+# Binance /depth limit yang valid; sampai 100 level weight-nya sama (5)
+SNAPSHOT_DEPTHS = (100, 500, 1000, 5000)
+
+
+def snapshot_depth(limit: int) -> int:
+    """REST snapshot depth fetched for a read of `limit` levels, so every limit up to 100 shares one snapshot"""
+    for depth in SNAPSHOT_DEPTHS:
+        if limit <= depth:
+            return depth
+    return SNAPSHOT_DEPTHS[-1]
+
+
+class SnapshotBooks:
+    """
+    OrderBooks built from REST snapshots (e.g. Indodax, which has no diff
+    feed), one per (exchange, symbol); the least recently used book is
+    dropped past `maxsize`. A book is reloaded only when the snapshot's
+    level lists change, so repeated reads of the same cached snapshot (also
+    a stale copy of it) don't rebuild anything.
+
+    Reads must slice the book with top(limit) right after get(), without
+    awaiting in between: another request may reload it with its own
+    snapshot once the event loop switches.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._books: "OrderedDict[tuple, tuple]" = OrderedDict()  # key → (OrderBook, asks, bids)
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def get(self, exchange: str, symbol: str, snapshot: Dict[str, Any]) -> OrderBook:
+        key = (exchange, symbol)
+        asks, bids = snapshot.get("asks", []), snapshot.get("bids", [])
+        entry = self._books.get(key)
+        if entry is not None:
+            self._books.move_to_end(key)
+            if entry[1] is asks and entry[2] is bids:
+                return entry[0]
+            book = entry[0]
+        else:
+            book = OrderBook(exchange, symbol)
+        book.load_snapshot(asks, bids, snapshot.get("last_update_id") or 0)
+        self._books[key] = (book, asks, bids)
+        if len(self._books) > self.maxsize:
+            self._books.popitem(last=False)
+        return book
@@ -0,0 +1,115 @@
+# app/services/polling.py
+"""
+Interval polling per symbol, mengikuti volatilitas dari detector 1m.
+
+- std return 1m (detector sideway) dibanding POLL_VOL_REF: dua kali lebih
+  volatil → dua kali lebih sering, setengahnya → dua kali lebih jarang.
+- pump / dump / breakout → POLL_MIN_INTERVAL, stagnant → POLL_MAX_INTERVAL.
+- Kalau total weight semua symbol melebihi budget background bucket
+  Binance (lihat ratelimit.budget), interval SEMUA symbol milik worker
+  diperpanjang sama rata (yang sudah di POLL_MAX_INTERVAL tidak bisa, sisanya
+  diperpanjang lagi). Kalau semua sudah di max dan masih over budget,
+  `load_ratio` > 1 (metric + log): worker ini memegang terlalu banyak symbol,
+  tambah replica atau kurangi SYMBOLS.
+
+Symbols without detector results yet are polled every POLL_INTERVAL.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "30"))  # seconds, interval awal / volatilitas normal
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", str(min(10, POLL_INTERVAL))))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", str(POLL_INTERVAL * 4)))
+POLL_VOL_REF = float(os.getenv("POLL_VOL_REF", "0.002"))  # std return 1m yang dianggap normal
+
+HOT = ("pump", "dump", "breakout")
+
+
+class PollPlan:
+    def __init__(
+        self,
+        base: float = POLL_INTERVAL,
+        min_interval: float = POLL_MIN_INTERVAL,
+        max_interval: float = POLL_MAX_INTERVAL,
+        vol_ref: float = POLL_VOL_REF,
+    ):
+        self.base = base
+        self.min_interval = min(min_interval, base)
+        self.max_interval = max(max_interval, base)
+        self.vol_ref = vol_ref
+        self.intervals: Dict[str, float] = {}
+        self.next_due: Dict[str, float] = {}
+        self.load_ratio = 0.0  # weight/s polling / budget (setelah diperpanjang)
+
+    def due(self, symbols: List[str], now: float) -> List[str]:
+        return [s for s in symbols if self.next_due.get(s, 0.0) <= now]
+
+    def retry(self, symbols: List[str], now: float):
+        """Failed refresh: keep the symbol's interval (no hammering a limited upstream)"""
+        for s in symbols:
+            self.next_due[s] = now + self.intervals.get(s, self.base)
+
+    def update(self, results: Dict[str, dict], now: float, cost: float = 0.0, budget: Optional[float] = None):
+        """
+        results: symbol → 1m evaluate_batch result of the symbols just refreshed.
+        cost: upstream weight of one refresh, budget: weight/s the polling may use.
+        """
+        if not results:
+            return
+        syms = list(results)
+        std = np.array([r.get("sideway", {}).get("std", np.nan) for r in results.values()], dtype=np.float64)
+        hot = np.array([any(r.get(d, {}).get("status") in HOT for d in ("pump_dump", "breakout")) for r in results.values()])
+        quiet = np.array([r.get("stagnant", {}).get("status") == "stagnant" for r in results.values()])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            interval = np.where(std > 0, self.base * self.vol_ref / std, self.base)
+        interval = np.where(quiet, self.max_interval, interval)
+        interval = np.clip(np.where(hot, self.min_interval, interval), self.min_interval, self.max_interval)
+        for s, iv in zip(syms, interval.tolist()):
+            self.intervals[s] = iv
+
+        for s in syms:
+            self.next_due[s] = now + self.intervals[s]
+        if cost and budget:
+            self._fit_budget(cost, budget)
+
+    def _fit_budget(self, cost: float, budget: float):
+        """Stretch every owned symbol's interval until cost × Σ 1/interval ≤ budget (or all are at max)"""
+        old = dict(self.intervals)
+        load = cost * sum(1.0 / iv for iv in self.intervals.values())
+        while load > budget * (1 + 1e-9):
+            free = [s for s, iv in self.intervals.items() if iv < self.max_interval]
+            if not free:
+                break
+            capped = load - cost * sum(1.0 / self.intervals[s] for s in free)
+            if capped >= budget:
+                scale = float("inf")  # symbol lain sudah di max: sisanya juga ke max
+            else:
+                scale = (load - capped) / (budget - capped)
+            for s in free:
+                self.intervals[s] = min(self.intervals[s] * scale, self.max_interval)
+            load = cost * sum(1.0 / iv for iv in self.intervals.values())
+        for s, iv in self.intervals.items():
+            if iv != old[s] and s in self.next_due:
+                self.next_due[s] += iv - old[s]  # refresh berikutnya ikut mundur
+        ratio = load / budget
+        if ratio > 1 + 1e-9 and self.load_ratio <= 1 + 1e-9:
+            print(
+                f"Polling over budget ({ratio:.2f}x) with every symbol at {self.max_interval:g}s: "
+                f"{len(self.intervals)} symbols are too many for this worker"
+            )
+        self.load_ratio = ratio
+
+    def forget(self, keep: List[str]):
+        """Drop symbols no longer owned by this worker"""
+        for d in (self.intervals, self.next_due):
+            for s in list(d):
+                if s not in keep:
+                    del d[s]
+
+    def stats(self) -> Dict[str, float]:
+        iv = list(self.intervals.values())
+        return {"min": min(iv), "mean": sum(iv) / len(iv), "max": max(iv)} if iv else {}
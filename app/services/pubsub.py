@@ -0,0 +1,179 @@
+# app/services/pubsub.py
+"""
+Worker → API live updates over Postgres LISTEN/NOTIFY.
+
+Worker mem-publish snapshot (candle terakhir, hasil detector, orderbook)
+dan event signal ke satu channel Postgres. API mendengarkan channel itu di
+satu thread dan membagikan (fan-out) pesan yang sama ke semua client
+SSE / WebSocket per symbol, jadi jumlah client tidak menambah traffic ke
+upstream.
+
+Every subscriber has a small bounded queue. When it is full the oldest
+message is dropped (dashboards only care about the latest snapshot); a
+subscriber that keeps overflowing is disconnected as a slow consumer.
+"""
+
+import asyncio
+import json
+import os
+import select
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import text
+
+from app import metrics
+from app.db import engine
+
+PUBSUB_CHANNEL = os.getenv("PUBSUB_CHANNEL", "indotrader_events")
+SUBSCRIBER_QUEUE = int(os.getenv("SUBSCRIBER_QUEUE", "32"))
+SLOW_CONSUMER_DROPS = int(os.getenv("SLOW_CONSUMER_DROPS", "64"))  # drop berturut-turut sebelum diputus
+
+NOTIFY_MAX_BYTES = 7900  # batas payload NOTIFY Postgres 8000 byte
+ALL_SYMBOLS = "ALL"
+
+_is_postgres = engine.dialect.name == "postgresql"
+
+
+def _encode(event: Dict[str, Any]) -> str:
+    return json.dumps(event, separators=(",", ":"), default=str)
+
+
+# -------------------------------------------------------------------
+# PUBLISH (worker)
+# -------------------------------------------------------------------
+def publish_many(events: Iterable[Dict[str, Any]]):
+    """NOTIFY every event in one transaction. Each event needs a "symbol"."""
+    payloads = []
+    for event in events:
+        payload = _encode(event)
+        if len(payload.encode()) > NOTIFY_MAX_BYTES:
+            print("Pubsub payload too large, skipped:", event.get("type"), event.get("symbol"))
+            continue
+        payloads.append({"ch": PUBSUB_CHANNEL, "payload": payload})
+    if not payloads or not _is_postgres:
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:ch, :payload)"), payloads)
+    except Exception as e:
+        print("Pubsub publish error:", e)
+        metrics.error("pubsub_publish")
+
+
+def publish(event: Dict[str, Any]):
+    publish_many([event])
+
+
+# -------------------------------------------------------------------
+# FAN-OUT (API)
+# -------------------------------------------------------------------
+class Subscriber:
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, message: str):
+        if self.queue.full():
+            self.queue.get_nowait()  # buang yang paling lama, snapshot terbaru lebih penting
+            self.dropped += 1
+            if self.dropped >= SLOW_CONSUMER_DROPS:
+                self.closed = True
+        else:
+            self.dropped = 0
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broadcaster:
+    def __init__(self):
+        self._subs: Dict[str, Set[Subscriber]] = {}
+        self.delivered = 0
+        self.slow_consumers = 0
+
+    def subscribe(self, symbol: str) -> Subscriber:
+        sub = Subscriber(symbol.upper())
+        self._subs.setdefault(sub.symbol, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        subs = self._subs.get(sub.symbol)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.symbol]
+
+    def client_count(self) -> int:
+        return sum(len(s) for s in self._subs.values())
+
+    def dispatch(self, payload: str):
+        """Called on the event loop for every NOTIFY payload (already JSON)"""
+        try:
+            symbol = json.loads(payload).get("symbol", "").upper()
+        except ValueError:
+            return
+        for key in (symbol, ALL_SYMBOLS):
+            for sub in list(self._subs.get(key, ())):
+                sub.offer(payload)
+                self.delivered += 1
+                if sub.closed:
+                    self.slow_consumers += 1
+                    self.unsubscribe(sub)
+
+
+class PgListener:
+    """LISTEN on the pubsub channel in a thread and hand payloads to the loop"""
+
+    def __init__(self, broadcaster: Broadcaster, loop: asyncio.AbstractEventLoop):
+        self.broadcaster = broadcaster
+        self.loop = loop
+        self._stopped = threading.Event()
+
+    def start(self) -> Optional[threading.Thread]:
+        if not _is_postgres:
+            print("Pubsub disabled: LISTEN/NOTIFY needs Postgres")
+            return None
+        t = threading.Thread(target=self._run, name="pg-listener", daemon=True)
+        t.start()
+        return t
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stopped.is_set():
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{PUBSUB_CHANNEL}"')
+                backoff = 1.0
+                while not self._stopped.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        n = conn.notifies.pop(0)
+                        self.loop.call_soon_threadsafe(self.broadcaster.dispatch, n.payload)
+            except Exception as e:
+                print("Pubsub listener error:", e)
+                metrics.error("pubsub_listen")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.invalidate()  # koneksi LISTEN jangan balik ke pool
+                    except Exception:
+                        pass
@@ -0,0 +1,219 @@
+# app/services/ratelimit.py
+"""
+Rate limit upstream REST (Binance request weight, Indodax request/menit).
+
+Satu token bucket per exchange per proses; semua request di market_data
+(sync, worker) dan market_data_async (API) lewat `acquire` dulu.
+
+- Bucket terisi terus (limit per menit / 60 per detik), kapasitas =
+  limit × RATE_LIMIT_SHARE karena API dan worker berbagi IP yang sama.
+- Response Binance membawa X-MBX-USED-WEIGHT-1M (weight terpakai seluruh
+  IP menit ini): token dipotong supaya tidak melewati sisa limit itu.
+- 429 / 418 (ban) → bucket diblok sampai Retry-After.
+- Waiter antri per prioritas (INTERACTIVE = request API, BACKGROUND =
+  polling worker), FIFO di prioritas yang sama. BACKGROUND juga tidak boleh
+  memakai RATE_LIMIT_RESERVE terakhir, jadi request user tetap punya budget.
+
+A request that would have to wait longer than its RATE_LIMIT_MAX_WAIT
+raises RateLimited, which the fetch functions turn into {"error": ...}.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from typing import Any, Dict, Mapping, Optional
+
+from app import metrics
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# limit resmi per IP per menit
+LIMITS = {
+    "binance": float(os.getenv("BINANCE_WEIGHT_PER_MIN", "6000")),
+    "indodax": float(os.getenv("INDODAX_REQUESTS_PER_MIN", "180")),
+}
+RATE_LIMIT_SHARE = float(os.getenv("RATE_LIMIT_SHARE", "0.5"))  # bagian limit IP untuk proses ini
+RATE_LIMIT_RESERVE = float(os.getenv("RATE_LIMIT_RESERVE", "0.2"))  # fraksi bucket yang tidak dipakai BACKGROUND
+RATE_LIMIT_MAX_WAIT = {
+    INTERACTIVE: float(os.getenv("RATE_LIMIT_MAX_WAIT", "3")),
+    BACKGROUND: float(os.getenv("RATE_LIMIT_MAX_WAIT_BACKGROUND", "30")),
+}
+DEFAULT_RETRY_AFTER = 60.0  # 429 tanpa header Retry-After
+_STEP = 0.05  # detik antar cek ulang waiter yang belum di depan antrian
+
+
+class RateLimited(Exception):
+    pass
+
+
+def weight(exchange: str, path: str, params: Optional[Mapping[str, Any]] = None) -> int:
+    """Request weight of a REST call (Binance /api/v3 weights, Indodax 1 per request)"""
+    if exchange != "binance":
+        return 1
+    params = params or {}
+    if path == "/depth":
+        limit = int(params.get("limit", 100))
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+    if path in ("/ticker/price", "/ticker/bookTicker"):
+        return 2 if "symbol" in params else 4
+    return 2  # /klines dan lainnya
+
+
+class TokenBucket:
+    def __init__(self, name: str, per_minute: float, share: float = RATE_LIMIT_SHARE, reserve: float = RATE_LIMIT_RESERVE):
+        self.name = name
+        self.limit = per_minute
+        self.capacity = per_minute * share
+        self.rate = self.capacity / 60.0
+        self.reserve = self.capacity * reserve
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.used_weight: Optional[float] = None  # header terakhir (binance)
+        self._lock = threading.Lock()
+        self._waiters: list = []  # heap (priority, seq)
+        self._seq = itertools.count()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _enqueue(self, priority: int) -> tuple:
+        ticket = (priority, next(self._seq))
+        with self._lock:
+            heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _discard(self, ticket: tuple):
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+
+    def _try(self, ticket: tuple, cost: float) -> float:
+        """0.0 = granted (tokens taken, ticket dequeued), else seconds until it is worth trying again"""
+        now = time.monotonic()
+        with self._lock:
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self._waiters[0] != ticket:
+                return _STEP
+            self._refill(now)
+            floor = self.reserve if ticket[0] > INTERACTIVE else 0.0
+            need = min(cost + floor, self.capacity)
+            if self.tokens >= need:
+                self.tokens -= cost
+                heapq.heappop(self._waiters)
+                return 0.0
+            return (need - self.tokens) / self.rate
+
+    def try_acquire(self, cost: float = 1) -> bool:
+        """Take tokens only if nobody is queued and the reserve stays untouched (extra / hedge requests)"""
+        now = time.monotonic()
+        with self._lock:
+            if now < self.blocked_until or self._waiters:
+                return False
+            self._refill(now)
+            if self.tokens - cost < self.reserve:
+                return False
+            self.tokens -= cost
+            return True
+
+    def _give_up(self, ticket: tuple, wait: float):
+        metrics.RATE_LIMIT_THROTTLED.labels(self.name, "wait").inc()
+        raise RateLimited(f"{self.name} rate limit: retry in {wait:.1f}s")
+
+    def acquire(self, cost: float = 1, priority: int = BACKGROUND):
+        """Block (thread) until `cost` tokens are available"""
+        start = time.monotonic()
+        deadline = start + RATE_LIMIT_MAX_WAIT[priority]
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try(ticket, cost)
+                if not wait:
+                    break
+                if time.monotonic() + wait > deadline:
+                    self._give_up(ticket, wait)
+                time.sleep(min(wait, 0.25))
+        finally:
+            self._discard(ticket)
+        metrics.RATE_LIMIT_WAIT.labels(self.name, PRIORITY_NAMES[priority]).observe(time.monotonic() - start)
+
+    async def aacquire(self, cost: float = 1, priority: int = INTERACTIVE):
+        """acquire for coroutines (sleeps on the event loop)"""
+        start = time.monotonic()
+        deadline = start + RATE_LIMIT_MAX_WAIT[priority]
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try(ticket, cost)
+                if not wait:
+                    break
+                if time.monotonic() + wait > deadline:
+                    self._give_up(ticket, wait)
+                await asyncio.sleep(min(wait, 0.25))
+        finally:
+            self._discard(ticket)
+        metrics.RATE_LIMIT_WAIT.labels(self.name, PRIORITY_NAMES[priority]).observe(time.monotonic() - start)
+
+    def observe(self, status: int, headers: Mapping[str, str]):
+        """Sync the bucket with an upstream response (weight header, 429 / 418)"""
+        used = headers.get("x-mbx-used-weight-1m")
+        retry_after = headers.get("retry-after")
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if used is not None:
+                self.used_weight = float(used)
+                self.tokens = min(self.tokens, self.limit - self.used_weight)
+            if status in (418, 429):
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = DEFAULT_RETRY_AFTER
+                self.blocked_until = max(self.blocked_until, now + delay)
+                self.tokens = 0.0
+        if status in (418, 429):
+            metrics.RATE_LIMIT_THROTTLED.labels(self.name, str(status)).inc()
+            print(f"Rate limited by {self.name} ({status}), paused {self.blocked_until - time.monotonic():.0f}s")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "tokens": self.tokens,
+                "capacity": self.capacity,
+                "waiters": len(self._waiters),
+                "blocked_seconds": max(0.0, self.blocked_until - time.monotonic()),
+                "used_weight": self.used_weight if self.used_weight is not None else float("nan"),
+            }
+
+
+BUCKETS: Dict[str, TokenBucket] = {name: TokenBucket(name, limit) for name, limit in LIMITS.items()}
+
+
+def bucket(exchange: str) -> TokenBucket:
+    return BUCKETS[exchange]
+
+
+def budget(exchange: str) -> float:
+    """Tokens per second BACKGROUND work can spend on average"""
+    b = BUCKETS[exchange]
+    return b.rate * (1 - RATE_LIMIT_RESERVE)
+
+
+def _collect():
+    g = metrics.GaugeMetricFamily("indotrader_rate_limit_bucket", "Upstream rate limit bucket state", labels=["exchange", "field"])
+    for name, b in BUCKETS.items():
+        for field, value in b.stats().items():
+            g.add_metric([name, field], value)
+    yield g
+
+
+metrics.register_collector(_collect)
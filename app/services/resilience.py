@@ -0,0 +1,285 @@
+# app/services/resilience.py
+"""
+Circuit breaker + hedged request untuk REST upstream.
+
+Dipakai oleh _get_json di market_data (thread) dan market_data_async
+(asyncio), satu Endpoint per (exchange, endpoint) sama seperti label
+metrics.upstream.
+
+- Circuit breaker: CB_FAILURES kegagalan berturut-turut (timeout, koneksi,
+  5xx) → open; request langsung gagal dengan CircuitOpen selama CB_RESET
+  detik, lalu satu request percobaan (half-open) menentukan close / open.
+  4xx dan rate limit lokal tidak dihitung.
+- Hedged request: kalau response belum datang setelah persentil
+  HEDGE_PERCENTILE latency endpoint itu (dibatasi HEDGE_MIN/MAX_DELAY),
+  request kedua dikirim (Binance: ke host alternatif) dan yang pertama
+  berhasil dipakai. Hedge hanya dikirim kalau bucket rate limit masih
+  longgar (ratelimit.TokenBucket.try_acquire).
+
+Stale-while-revalidate lives in TTLCache (get_or_fetch stale / stale_if_error).
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app import metrics
+from app.services.ratelimit import RateLimited
+
+CB_FAILURES = int(os.getenv("CB_FAILURES", "5"))
+CB_RESET = float(os.getenv("CB_RESET", "30"))  # detik open sebelum half-open
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.2"))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "2"))
+HEDGE_MIN_SAMPLES = 20  # di bawah ini delay = HEDGE_MAX_DELAY
+HEDGE_THREADS = int(os.getenv("HEDGE_THREADS", "32"))  # pool request sync (worker)
+
+# host cadangan per base URL (Binance punya api1..api4 dengan data yang sama)
+_BINANCE_OFFICIAL = "https://api.binance.com/api/v3"
+HEDGE_BASES: Dict[str, List[str]] = {
+    _BINANCE_OFFICIAL: [
+        b.strip() for b in os.getenv(
+            "BINANCE_HEDGE_BASES", "https://api1.binance.com/api/v3,https://api2.binance.com/api/v3",
+        ).split(",") if b.strip()
+    ],
+}
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+def is_failure(exc: BaseException) -> bool:
+    """Upstream down / slow, as opposed to a bad request or our own rate limit"""
+    if isinstance(exc, (RateLimited, CircuitOpen)):
+        return False
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status is None or status >= 500
+
+
+def hedge_base(base_url: str, attempt: int) -> str:
+    """Base URL for attempt 0 (primary) / 1 (hedge)"""
+    alternates = HEDGE_BASES.get(base_url)
+    if not attempt or not alternates:
+        return base_url
+    return alternates[(attempt - 1) % len(alternates)]
+
+
+# -------------------------------------------------------------------
+# CIRCUIT BREAKER
+# -------------------------------------------------------------------
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failures: int = CB_FAILURES, reset: float = CB_RESET):
+        self.name = name
+        self.threshold = failures
+        self.reset = reset
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_at = 0.0
+        self._lock = threading.Lock()
+
+    def before(self) -> bool:
+        """Raise CircuitOpen unless a request may go out now. True = this request is the half-open probe."""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.reset:
+                    raise CircuitOpen(f"{self.name} circuit open, retry in {self.reset - (now - self.opened_at):.0f}s")
+                self.state = self.HALF_OPEN
+                self.probe_at = now
+                return True
+            if self.state == self.HALF_OPEN:
+                # satu probe sekaligus; probe yang tidak pernah lapor kadaluarsa setelah reset
+                if now - self.probe_at < self.reset:
+                    raise CircuitOpen(f"{self.name} circuit half-open, probe in flight")
+                self.probe_at = now
+                return True
+            return False
+
+    def release(self):
+        """The probe ended without a verdict (local rate limit, 4xx): the next request may probe right away"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probe_at = float("-inf")
+
+    def success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"Circuit {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                metrics.CIRCUIT_OPENED.labels(self.name).inc()
+                print(f"Circuit {self.name} open after {self.failures} failure(s)")
+
+
+# -------------------------------------------------------------------
+# ENDPOINT (breaker + latency window)
+# -------------------------------------------------------------------
+class Endpoint:
+    def __init__(self, exchange: str, name: str, window: int = 200):
+        self.exchange = exchange
+        self.name = name
+        self.breaker = CircuitBreaker(f"{exchange}:{name}")
+        self._latencies: deque = deque(maxlen=window)
+        self._delay = HEDGE_MAX_DELAY
+        self._since_update = 0
+
+    def observe(self, seconds: float):
+        self._latencies.append(seconds)
+        self._since_update += 1
+        if self._since_update >= 10 and len(self._latencies) >= HEDGE_MIN_SAMPLES:
+            self._since_update = 0
+            p = float(np.percentile(np.fromiter(self._latencies, dtype=np.float64), HEDGE_PERCENTILE))
+            self._delay = min(max(p, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    @property
+    def hedge_delay(self) -> float:
+        return self._delay
+
+    # ---------------------------------------------------------------
+    # threads
+    # ---------------------------------------------------------------
+    def call(self, attempt: Callable[[int], Any], probe: bool = False) -> Any:
+        """
+        attempt(0) = primary request, attempt(1) = hedge; the caller checks
+        breaker.before() first and passes on whether it got the probe.
+        """
+        try:
+            result = self._hedged(attempt)
+        except Exception as e:
+            if is_failure(e):
+                self.breaker.failure()
+            elif probe:
+                self.breaker.release()
+            raise
+        self.breaker.success()
+        return result
+
+    def _timed(self, attempt: Callable[[int], Any], i: int) -> Any:
+        start = time.perf_counter()
+        result = attempt(i)
+        if i == 0:
+            self.observe(time.perf_counter() - start)  # hanya primary: delay tidak bias ke hedge yang menang
+        return result
+
+    def _hedged(self, attempt: Callable[[int], Any]) -> Any:
+        if not HEDGE_ENABLED:
+            return self._timed(attempt, 0)
+        primary = _POOL.submit(self._timed, attempt, 0)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+        metrics.HEDGED_REQUESTS.labels(self.exchange, self.name, "fired").inc()
+        pending = {primary, _POOL.submit(self._timed, attempt, 1)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    if f is not primary:
+                        metrics.HEDGED_REQUESTS.labels(self.exchange, self.name, "won").inc()
+                    return f.result()
+                if f is primary or error is None:
+                    error = f.exception()
+        raise error
+
+    # ---------------------------------------------------------------
+    # asyncio
+    # ---------------------------------------------------------------
+    async def acall(self, attempt: Callable[[int], Awaitable[Any]], probe: bool = False) -> Any:
+        try:
+            result = await self._ahedged(attempt)
+        except Exception as e:
+            if is_failure(e):
+                self.breaker.failure()
+            elif probe:
+                self.breaker.release()
+            raise
+        self.breaker.success()
+        return result
+
+    async def _atimed(self, attempt: Callable[[int], Awaitable[Any]], i: int) -> Any:
+        start = time.perf_counter()
+        result = await attempt(i)
+        if i == 0:
+            self.observe(time.perf_counter() - start)
+        return result
+
+    async def _ahedged(self, attempt: Callable[[int], Awaitable[Any]]) -> Any:
+        if not HEDGE_ENABLED:
+            return await self._atimed(attempt, 0)
+        primary = asyncio.ensure_future(self._atimed(attempt, 0))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            if done:
+                return primary.result()
+            metrics.HEDGED_REQUESTS.labels(self.exchange, self.name, "fired").inc()
+            tasks.add(asyncio.ensure_future(self._atimed(attempt, 1)))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None:
+                        if t is not primary:
+                            metrics.HEDGED_REQUESTS.labels(self.exchange, self.name, "won").inc()
+                        return t.result()
+                    if t is primary or error is None:
+                        error = t.exception()
+            raise error
+        finally:
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
+
+
+_POOL = ThreadPoolExecutor(max_workers=HEDGE_THREADS, thread_name_prefix="upstream")
+_ENDPOINTS: Dict[Tuple[str, str], Endpoint] = {}
+_lock = threading.Lock()
+
+
+def endpoint(exchange: str, name: str) -> Endpoint:
+    key = (exchange, name)
+    ep = _ENDPOINTS.get(key)
+    if ep is None:
+        with _lock:
+            ep = _ENDPOINTS.setdefault(key, Endpoint(exchange, name))
+    return ep
+
+
+def open_circuits() -> Dict[str, str]:
+    """Endpoints whose breaker is not closed (for /health)"""
+    return {ep.breaker.name: ep.breaker.state for ep in list(_ENDPOINTS.values()) if ep.breaker.state != CircuitBreaker.CLOSED}
+
+
+def _collect():
+    states = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+    g = metrics.GaugeMetricFamily(
+        "indotrader_circuit_state", "Upstream circuit breaker (0 closed, 1 half-open, 2 open)", labels=["exchange", "endpoint"],
+    )
+    d = metrics.GaugeMetricFamily("indotrader_hedge_delay_seconds", "Current hedge delay per endpoint", labels=["exchange", "endpoint"])
+    for ep in list(_ENDPOINTS.values()):
+        g.add_metric([ep.exchange, ep.name], states[ep.breaker.state])
+        d.add_metric([ep.exchange, ep.name], ep.hedge_delay)
+    yield g
+    yield d
+
+
+metrics.register_collector(_collect)
@@ -0,0 +1,222 @@
+# app/services/rollups.py
+"""
+Rollup signal per jam / hari: count + jumlah confidence per
+bucket × symbol × signal_type × timeframe (tabel signal_rollups).
+
+Incremental lewat watermark (rollup_watermarks.last_id): tiap run hanya
+membaca signal dengan id > last_id (index PK, maksimal ROLLUP_BATCH per
+transaksi), menjumlahkan di Python, lalu upsert additive ke rollup dan
+menggeser watermark di transaksi yang sama. Baris watermark di-lock
+(SELECT ... FOR UPDATE), jadi beberapa worker bisa menjalankan job tanpa
+menghitung dobel.
+
+The watermark only moves over a contiguous id range. A gap in the id
+sequence usually means an INSERT of another writer that has not committed
+yet, so the batch stops there. A gap is skipped only after this process
+has seen it for ROLLUP_GAP_TIMEOUT seconds (rolled back insert / failed
+flush), measured on its own monotonic clock, not on created_at. The
+worker runs RollupJob: every ROLLUP_INTERVAL seconds and shortly after
+each SignalWriter flush.
+
+    python -m app.services.rollups   # backfill / catch up sekali
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+
+from app import metrics
+from app.db import Base, engine as default_engine
+from app.model import RollupWatermark, Signal, SignalRollup
+
+ROLLUP_INTERVAL = float(os.getenv("ROLLUP_INTERVAL", "60"))  # detik antar run periodik
+ROLLUP_DEBOUNCE = float(os.getenv("ROLLUP_DEBOUNCE", "5"))  # run setelah flush, paling cepat tiap segini
+ROLLUP_BATCH = int(os.getenv("ROLLUP_BATCH", "20000"))  # signal per transaksi
+ROLLUP_GAP_TIMEOUT = float(os.getenv("ROLLUP_GAP_TIMEOUT", "120"))  # detik sebelum gap id dianggap permanen
+BUCKET_SIZES = ("hour", "day")
+WATERMARK = "signal_rollups"
+
+KEY_COLUMNS = ("bucket_size", "bucket", "symbol", "signal_type", "timeframe")
+
+
+def bucket_start(ts: datetime, size: str) -> datetime:
+    if size == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if size == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"unknown bucket size: {size}")
+
+
+def aggregate(rows) -> Dict[Tuple, List[float]]:
+    """(symbol, signal_type, timeframe, confidence, created_at) rows → key → [count, confidence_sum, confidence_count]"""
+    acc: Dict[Tuple, List[float]] = {}
+    for symbol, signal_type, timeframe, confidence, created_at in rows:
+        for size in BUCKET_SIZES:
+            key = (size, bucket_start(created_at, size), symbol, signal_type, timeframe or "1m")
+            a = acc.get(key)
+            if a is None:
+                a = acc[key] = [0, 0.0, 0]
+            a[0] += 1
+            if confidence is not None:
+                a[1] += confidence
+                a[2] += 1
+    return acc
+
+
+def _insert(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        return pg_insert
+    if conn.dialect.name == "sqlite":
+        return sqlite_insert
+    raise RuntimeError(f"rollups need ON CONFLICT support, not available for {conn.dialect.name}")
+
+
+def _upsert(conn: Connection, acc: Dict[Tuple, List[float]]):
+    ins = _insert(conn)(SignalRollup)
+    stmt = ins.on_conflict_do_update(
+        index_elements=list(KEY_COLUMNS),
+        set_={
+            "count": SignalRollup.count + ins.excluded.count,
+            "confidence_sum": SignalRollup.confidence_sum + ins.excluded.confidence_sum,
+            "confidence_count": SignalRollup.confidence_count + ins.excluded.confidence_count,
+        },
+    )
+    conn.execute(stmt, [
+        {**dict(zip(KEY_COLUMNS, key)), "count": a[0], "confidence_sum": a[1], "confidence_count": a[2]}
+        for key, a in acc.items()
+    ])
+
+
+def _lock_watermark(conn: Connection) -> int:
+    conn.execute(_insert(conn)(RollupWatermark).values(name=WATERMARK, last_id=0).on_conflict_do_nothing())
+    return conn.scalar(select(RollupWatermark.last_id).where(RollupWatermark.name == WATERMARK).with_for_update())
+
+
+def contiguous(ids: List[int], last_id: int, gaps: Dict[int, float], gap_timeout: float, now: float) -> int:
+    """
+    How many of the ascending ids continue last_id without an unresolved gap.
+    gaps: first id of a gap → monotonic time it was first seen (updated in place).
+    """
+    expected = last_id + 1
+    for i, row_id in enumerate(ids):
+        if row_id != expected:
+            seen = gaps.setdefault(expected, now)
+            if now - seen < gap_timeout:
+                return i  # mungkin INSERT lain yang belum commit: tunggu
+        expected = row_id + 1
+    return len(ids)
+
+
+def run_batch(
+    engine: Engine = default_engine,
+    batch: int = ROLLUP_BATCH,
+    gaps: Optional[Dict[int, float]] = None,
+    gap_timeout: float = ROLLUP_GAP_TIMEOUT,
+) -> int:
+    """Roll up the next contiguous batch of new signals in one transaction. Returns signals processed."""
+    gaps = {} if gaps is None else gaps
+    with engine.begin() as conn:
+        last_id = _lock_watermark(conn)
+        rows = conn.execute(
+            select(Signal.id, Signal.symbol, Signal.signal_type, Signal.timeframe, Signal.confidence, Signal.created_at)
+            .where(Signal.id > last_id)
+            .order_by(Signal.id)
+            .limit(batch)
+        ).all()
+        rows = rows[:contiguous([r.id for r in rows], last_id, gaps, gap_timeout, time.monotonic())]
+        if not rows:
+            return 0
+        now = datetime.utcnow()
+        _upsert(conn, aggregate((r.symbol, r.signal_type, r.timeframe, r.confidence, r.created_at or now) for r in rows))
+        conn.execute(
+            update(RollupWatermark)
+            .where(RollupWatermark.name == WATERMARK)
+            .values(last_id=rows[-1].id, updated_at=now)
+        )
+    for start in [g for g in gaps if g <= rows[-1].id]:
+        del gaps[start]  # sudah dilewati watermark
+    return len(rows)
+
+
+def run_once(
+    engine: Engine = default_engine,
+    max_batches: int = 50,
+    batch: int = ROLLUP_BATCH,
+    gaps: Optional[Dict[int, float]] = None,
+    gap_timeout: float = ROLLUP_GAP_TIMEOUT,
+) -> int:
+    """Catch up (up to max_batches transactions, stops at an unresolved gap). Returns signals processed."""
+    total = 0
+    for _ in range(max_batches):
+        n = run_batch(engine, batch=batch, gaps=gaps, gap_timeout=gap_timeout)
+        total += n
+        if n < batch:
+            break
+    return total
+
+
+class RollupJob:
+    """Background thread: run_once every `interval`, or `debounce` seconds after poke()"""
+
+    def __init__(self, engine: Optional[Engine] = None, interval: float = ROLLUP_INTERVAL, debounce: float = ROLLUP_DEBOUNCE):
+        self.engine = engine or default_engine
+        self.interval = interval
+        self.debounce = debounce
+        self.processed = 0
+        self.gaps: Dict[int, float] = {}  # gap id yang sedang ditunggu
+        self._poked = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        Base.metadata.create_all(bind=self.engine, tables=[SignalRollup.__table__, RollupWatermark.__table__])
+        self._thread = threading.Thread(target=self._run, name="signal-rollups", daemon=True)
+        self._thread.start()
+
+    def poke(self, *_):
+        """New signals were written (SignalWriter listener)"""
+        self._poked.set()
+
+    def _run_safe(self):
+        try:
+            with metrics.timer(metrics.ROLLUP_SECONDS):
+                n = run_once(self.engine, gaps=self.gaps)
+            self.processed += n
+            metrics.ROLLUP_SIGNALS.inc(n)
+        except Exception as e:
+            print("Rollup error:", e)
+            metrics.error("rollups")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._run_safe()
+            # berhenti di gap: cek lagi lebih cepat, commit yang tertunda biasanya datang dalam detik
+            self._poked.wait(min(self.interval, self.debounce) if self.gaps else self.interval)
+            if self._stopped.wait(self.debounce if self._poked.is_set() else 0):
+                break
+            self._poked.clear()
+
+    def close(self, timeout: float = 10.0):
+        """Stop the thread and roll up what is left"""
+        self._stopped.set()
+        self._poked.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._run_safe()
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=default_engine, tables=[SignalRollup.__table__, RollupWatermark.__table__])
+    pending: Dict[int, float] = {}
+    total = run_once(max_batches=10 ** 6, gaps=pending)
+    while pending:  # gap: tunggu commit yang tertunda atau ROLLUP_GAP_TIMEOUT
+        time.sleep(1)
+        total += run_once(max_batches=10 ** 6, gaps=pending)
+    print("Rolled up", total, "signal(s)")
@@ -0,0 +1,174 @@
+# app/services/scanner.py
+"""
+Scanner spread Indodax vs Binance untuk SEMUA pair sekaligus.
+
+Per refresh hanya dua request upstream:
+- Indodax /summaries  → last / buy / sell / vol_idr semua pair xxx_idr
+  (termasuk usdt_idr, jadi rate USDT → IDR ikut dari sini dan mengisi
+  cache rate yang sama dengan get_usdt_idr_rate)
+- Binance /ticker/bookTicker tanpa symbol → bid / ask semua pair
+
+Pair dicocokkan lewat base asset (btc_idr ↔ BTCUSDT), lalu spread semua
+pair dihitung sekali dengan numpy. Hasilnya disimpan di CACHE (TTL
+SCANNER_TTL, single-flight), sort / filter per request dari array itu.
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.metrics import upstream
+from app.services.market_data import BINANCE_BASE, CACHE, CACHE_TTL, INDODAX_BASE, STALE_POLICY, is_cacheable
+from app.services.market_data_async import _get_json, get_usdt_idr_rate
+
+SCANNER_TTL = float(os.getenv("SCANNER_TTL", "5"))
+
+# kolom numerik per pair (semua harga dalam IDR, spread dalam %)
+COLUMNS = (
+    "indodax_last", "indodax_bid", "indodax_ask", "indodax_vol_idr",
+    "binance_bid", "binance_ask",
+    "spread_pct",       # last Indodax vs mid Binance (premium Indodax)
+    "buy_binance_pct",  # beli di ask Binance, jual di bid Indodax
+    "buy_indodax_pct",  # beli di ask Indodax, jual di bid Binance
+)
+SORT_KEYS = ("spread_pct", "abs_spread", "buy_binance_pct", "buy_indodax_pct", "indodax_vol_idr", "symbol")
+
+
+# -------------------------------------------------------------------
+# NORMALISASI SYMBOL
+# -------------------------------------------------------------------
+def indodax_base(pair: str) -> Optional[str]:
+    """'btc_idr' → 'BTC' (None for non-IDR pairs)"""
+    base, sep, quote = pair.rpartition("_")
+    return base.upper() if sep and quote == "idr" else None
+
+
+def binance_base(symbol: str) -> Optional[str]:
+    """'BTCUSDT' → 'BTC' (None for non-USDT pairs)"""
+    return symbol[:-4] if symbol.endswith("USDT") and len(symbol) > 4 else None
+
+
+def _f(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_indodax_summaries(data: Dict[str, Any]) -> Tuple[Dict[str, Tuple[float, float, float, float]], float]:
+    """/summaries → ({base: (last, buy, sell, vol_idr)}, usdt_idr rate or 0.0)"""
+    out = {}
+    rate = 0.0
+    for pair, t in (data.get("tickers") or {}).items():
+        if pair == "usdt_idr":
+            rate = _f(t.get("last"))
+        base = indodax_base(pair)
+        if base is not None:
+            out[base] = (_f(t.get("last")), _f(t.get("buy")), _f(t.get("sell")), _f(t.get("vol_idr")))
+    return out, rate
+
+
+def parse_binance_book_tickers(data: List[Dict[str, Any]]) -> Dict[str, Tuple[float, float]]:
+    """/ticker/bookTicker (all symbols) → {base: (bid, ask)} for USDT pairs"""
+    out = {}
+    for t in data:
+        base = binance_base(t.get("symbol", ""))
+        if base is not None:
+            out[base] = (_f(t.get("bidPrice")), _f(t.get("askPrice")))
+    return out
+
+
+# -------------------------------------------------------------------
+# SPREAD (vectorized)
+# -------------------------------------------------------------------
+def compute_spreads(
+    indodax: Dict[str, Tuple[float, float, float, float]],
+    binance: Dict[str, Tuple[float, float]],
+    rate: float,
+) -> Dict[str, Any]:
+    """Common pairs → {"symbols": array, "rate": .., <column>: array}; pairs without a valid quote are dropped"""
+    symbols = np.array(sorted((indodax.keys() & binance.keys()) - {"USDT"}), dtype=object)
+    idx = np.array([indodax[s] for s in symbols], dtype=np.float64).reshape(-1, 4)
+    bn = np.array([binance[s] for s in symbols], dtype=np.float64).reshape(-1, 2) * rate
+    last, bid, ask, vol = idx.T
+    bn_bid, bn_ask = bn.T
+    ok = (last > 0) & (bid > 0) & (ask > 0) & (bn_bid > 0) & (bn_ask > 0)
+    last, bid, ask, vol, bn_bid, bn_ask = (c[ok] for c in (last, bid, ask, vol, bn_bid, bn_ask))
+    cols = {
+        "indodax_last": last, "indodax_bid": bid, "indodax_ask": ask, "indodax_vol_idr": vol,
+        "binance_bid": bn_bid, "binance_ask": bn_ask,
+        "spread_pct": (last / ((bn_bid + bn_ask) / 2) - 1) * 100,
+        "buy_binance_pct": (bid / bn_ask - 1) * 100,
+        "buy_indodax_pct": (bn_bid / ask - 1) * 100,
+    }
+    return {"symbols": symbols[ok], "rate": rate, "updated_at": time.time(), **cols}
+
+
+def select(
+    spreads: Dict[str, Any],
+    sort: str = "abs_spread",
+    order: str = "desc",
+    limit: Optional[int] = None,
+    min_volume: float = 0.0,
+    min_spread: float = 0.0,
+) -> Dict[str, Any]:
+    """Filter + sort the cached arrays → response rows"""
+    keep = np.flatnonzero(
+        (spreads["indodax_vol_idr"] >= min_volume) & (np.abs(spreads["spread_pct"]) >= min_spread)
+    )
+    if sort == "symbol":
+        key = spreads["symbols"][keep].astype(str)
+    elif sort == "abs_spread":
+        key = np.abs(spreads["spread_pct"][keep])
+    else:
+        key = spreads[sort][keep]
+    ordered = keep[np.argsort(key, kind="stable")]
+    if order == "desc":
+        ordered = ordered[::-1]
+    if limit is not None:
+        ordered = ordered[:limit]
+    cols = {name: spreads[name][ordered].round(4).tolist() for name in COLUMNS}
+    symbols = spreads["symbols"][ordered].tolist()
+    return {
+        "rate": spreads["rate"],
+        "updated_at": spreads["updated_at"],
+        "stale": spreads.get("stale", False),
+        "count": len(symbols),
+        "pairs": [{"symbol": s, **{name: cols[name][i] for name in COLUMNS}} for i, s in enumerate(symbols)],
+    }
+
+
+# -------------------------------------------------------------------
+# FETCH
+# -------------------------------------------------------------------
+async def _fetch_indodax_summaries() -> Dict[str, Any]:
+    with upstream("indodax", "summaries"):
+        return await _get_json("summaries", INDODAX_BASE, "/summaries", timeout=8)
+
+
+async def _fetch_binance_book_tickers() -> List[Dict[str, Any]]:
+    with upstream("binance", "book_ticker"):
+        return await _get_json("book_ticker", BINANCE_BASE, "/ticker/bookTicker", timeout=8)
+
+
+async def _scan() -> Dict[str, Any]:
+    try:
+        summaries, books = await asyncio.gather(_fetch_indodax_summaries(), _fetch_binance_book_tickers())
+        indodax, rate = parse_indodax_summaries(summaries)
+        if rate:
+            CACHE.set(("usdt_idr_rate",), rate, CACHE_TTL["rate"])
+        else:
+            rate = await get_usdt_idr_rate()
+        if not rate:
+            return {"error": "failed to get USDT->IDR rate"}
+        return compute_spreads(indodax, parse_binance_book_tickers(books), rate)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def get_spreads() -> Dict[str, Any]:
+    """Latest spreads of all common pairs (cached SCANNER_TTL seconds)"""
+    return await CACHE.aget_or_fetch(("spreads",), SCANNER_TTL, _scan, is_cacheable, **STALE_POLICY["ticker"])
@@ -0,0 +1,110 @@
+# app/services/serialization.py
+"""
+Response encoding untuk endpoint market (chart, orderbook, market).
+
+- JSON lewat orjson, tanpa jsonable_encoder: route mengembalikan Response
+  dari encode() langsung.
+- `?format=columnar`: kline / level orderbook jadi array numerik paralel
+  (time/open/high/low/close/volume, price/qty) dan field `raw` dibuang.
+  Row Binance berisi 12 string per candle; columnar cuma 6 angka.
+- `Accept: application/msgpack` → MessagePack (binary, lebih kecil & cepat).
+  Setiap response membawa `Vary: Accept`, supaya cache / CDN tidak memberi
+  msgpack ke client JSON.
+
+Compression (gzip) is done by GZipMiddleware in app.main.
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+import msgpack
+import numpy as np
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+FORMATS = ("rows", "columnar")
+
+OHLCV_COLUMNS = ("time", "open", "high", "low", "close", "volume")
+BOOK_COLUMNS = ("price", "qty", "exchange", "cumulative")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"cannot serialize {type(obj).__name__}")
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return any(t in accept for t in MSGPACK_TYPES)
+
+
+# -------------------------------------------------------------------
+# COLUMNAR
+# -------------------------------------------------------------------
+def columnar_ohlcv(rows: List[List[Any]]) -> Dict[str, np.ndarray]:
+    """Kline rows (Binance strings or history floats) → parallel numeric arrays"""
+    cols = np.ascontiguousarray(np.array([row[:6] for row in rows], dtype=np.float64).reshape(-1, 6).T)
+    out = {name: cols[i] for i, name in enumerate(OHLCV_COLUMNS)}
+    out["time"] = out["time"].astype(np.int64)
+    return out
+
+
+def columnar_levels(rows: List[List[Any]]) -> Dict[str, Any]:
+    """Book rows [price, qty(, exchange, cumulative)] → parallel arrays"""
+    if not rows:
+        return {"price": [], "qty": []}
+    width = len(rows[0])
+    out: Dict[str, Any] = {}
+    for i, name in enumerate(BOOK_COLUMNS[:width]):
+        col = [row[i] for row in rows]
+        out[name] = col if name == "exchange" else np.array(col, dtype=np.float64)
+    return out
+
+
+def to_columnar(content: Any) -> Any:
+    """Convert known row lists in a market response, recursing into nested dicts"""
+    if not isinstance(content, dict) or "error" in content:
+        return content
+    out = {}
+    for key, value in content.items():
+        if key == "raw":
+            continue
+        if key == "ohlcv" and isinstance(value, list):
+            out[key] = columnar_ohlcv(value)
+        elif key in ("asks", "bids") and isinstance(value, list):
+            out[key] = columnar_levels(value)
+        elif isinstance(value, dict):
+            out[key] = to_columnar(value)
+        else:
+            out[key] = value
+    return out
+
+
+NEGOTIATED = {"Vary": "Accept"}
+
+
+def encode(request: Request, content: Any, fmt: str = "rows") -> Response:
+    if fmt == "columnar":
+        content = to_columnar(content)
+    if wants_msgpack(request):
+        return MsgPackResponse(content, headers=NEGOTIATED)
+    return FastJSONResponse(content, headers=NEGOTIATED)
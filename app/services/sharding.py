@@ -0,0 +1,215 @@
+# app/services/sharding.py
+"""
+Bagi SYMBOLS ke beberapa replica worker.
+
+- Membership: tiap worker upsert baris di `worker_heartbeats` setiap
+  SHARD_HEARTBEAT detik; worker yang tidak update dalam SHARD_TTL detik
+  dianggap mati.
+- Assignment: rendezvous hashing (highest random weight) atas worker yang
+  hidup. Kalau worker join / mati, hanya symbol milik worker itu yang pindah.
+- Exclusivity: sebelum memproses symbol, worker harus memegang Postgres
+  advisory lock untuk symbol tsb (session-level, di satu koneksi khusus).
+  Selama transisi dua worker bisa sama-sama merasa owner, tapi hanya satu
+  yang dapat lock. Kalau proses mati, koneksinya putus dan lock lepas sendiri.
+
+Ownership is only changed by `claim()`, which the worker calls between
+cycles, so a symbol is never released while it is being processed. Every
+claim also reads this backend's advisory locks from pg_locks: a lock
+connection that silently lost its session (Postgres restart, failover
+behind a proxy) gives up the symbols whose lock is gone instead of
+processing them unlocked.
+Without Postgres (SQLite dev setup) sharding is off and every symbol is owned.
+"""
+
+import hashlib
+import os
+import socket
+import threading
+import uuid
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection, Engine
+
+from app import metrics
+from app.db import Base, engine as default_engine
+from app.model import WorkerHeartbeat
+
+SHARDING_ENABLED = os.getenv("SHARDING_ENABLED", "1") == "1"
+SHARD_HEARTBEAT = float(os.getenv("SHARD_HEARTBEAT", "5"))  # detik antar heartbeat
+SHARD_TTL = float(os.getenv("SHARD_TTL", "20"))  # tanpa heartbeat selama ini → worker dianggap mati
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+LOCK_NAMESPACE = "indotrader:symbol:"
+# advisory lock bigint milik backend ini: key = classid (32 bit atas) | objid (32 bit bawah), objsubid 1
+HELD_LOCKS = text(
+    "SELECT (classid::bigint << 32) | objid::bigint FROM pg_locks"
+    " WHERE locktype = 'advisory' AND objsubid = 1 AND granted AND pid = pg_backend_pid()"
+)
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def lock_key(symbol: str) -> int:
+    """Advisory lock key (bigint) for a symbol, the same in every replica"""
+    return _hash64(LOCK_NAMESPACE + symbol.upper())
+
+
+def assign(symbol: str, workers: Iterable[str]) -> Optional[str]:
+    """Rendezvous hashing: worker with the highest hash(worker, symbol) owns the symbol"""
+    return max(workers, key=lambda w: _hash64(f"{w}:{symbol}"), default=None)
+
+
+def still_held(owned: Iterable[str], held_keys: Iterable[int]) -> Set[str]:
+    """Owned symbols whose advisory lock this backend still holds"""
+    held = set(held_keys)
+    return {sym for sym in owned if lock_key(sym) in held}
+
+
+class ShardCoordinator:
+    def __init__(
+        self,
+        symbols: List[str],
+        worker_id: str = WORKER_ID,
+        engine: Optional[Engine] = None,
+        heartbeat: float = SHARD_HEARTBEAT,
+        ttl: float = SHARD_TTL,
+        enabled: bool = SHARDING_ENABLED,
+    ):
+        self.symbols = [s.upper() for s in symbols]
+        self.worker_id = worker_id
+        self.engine = engine or default_engine
+        self.heartbeat = heartbeat
+        self.ttl = ttl
+        self.enabled = enabled and self.engine.dialect.name == "postgresql"
+
+        self.workers: List[str] = [worker_id]
+        self.owned: Set[str] = set() if self.enabled else set(self.symbols)
+        self._lock_conn: Optional[Connection] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------------------------------------------------------
+    # lifecycle
+    # ---------------------------------------------------------------
+    def start(self):
+        if not self.enabled:
+            print("Sharding disabled: worker owns all", len(self.symbols), "symbols")
+            return
+        Base.metadata.create_all(bind=self.engine, tables=[WorkerHeartbeat.__table__])
+        self._beat()
+        self._thread = threading.Thread(target=self._run, name="shard-heartbeat", daemon=True)
+        self._thread.start()
+        print("Sharding enabled, worker id:", self.worker_id)
+
+    def close(self):
+        """Release every lock and leave the group, so others take over right away"""
+        if not self.enabled:
+            return
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._release_all()
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(delete(WorkerHeartbeat).where(WorkerHeartbeat.worker_id == self.worker_id))
+        except Exception as e:
+            print("Shard leave error:", e)
+
+    # ---------------------------------------------------------------
+    # membership
+    # ---------------------------------------------------------------
+    def _run(self):
+        while not self._stopped.wait(self.heartbeat):
+            try:
+                self._beat()
+            except Exception as e:
+                print("Shard heartbeat error:", e)
+                metrics.error("shard_heartbeat")
+
+    def _beat(self):
+        stmt = pg_insert(WorkerHeartbeat).values(
+            worker_id=self.worker_id, host=socket.gethostname(), owned=len(self.owned), last_seen=func.now(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WorkerHeartbeat.worker_id], set_={"last_seen": func.now(), "owned": stmt.excluded.owned},
+        )
+        alive = WorkerHeartbeat.last_seen > func.now() - text("make_interval(secs => :ttl)").bindparams(ttl=self.ttl)
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+            workers = conn.execute(select(WorkerHeartbeat.worker_id).where(alive).order_by(WorkerHeartbeat.worker_id)).scalars().all()
+        # diri sendiri selalu dihitung, walaupun baris heartbeat sempat hilang
+        self.workers = sorted(set(workers) | {self.worker_id})
+        metrics.SHARD_WORKERS.set(len(self.workers))
+
+    # ---------------------------------------------------------------
+    # ownership
+    # ---------------------------------------------------------------
+    def assigned(self) -> Set[str]:
+        """Symbols this worker should own according to the current membership"""
+        workers = self.workers
+        return {sym for sym in self.symbols if assign(sym, workers) == self.worker_id}
+
+    def claim(self, busy: Iterable[str] = ()) -> List[str]:
+        """
+        Take locks for newly assigned symbols and release ones that moved away.
+        Symbols in `busy` (still being processed) are released next time.
+        Returns the owned symbols in SYMBOLS order.
+        """
+        if not self.enabled:
+            return list(self.symbols)
+        target = self.assigned()
+        busy = set(busy)
+        try:
+            conn = self._connection()
+            # query ke server juga memastikan koneksi lock masih hidup
+            held = still_held(self.owned, conn.execute(HELD_LOCKS).scalars().all())
+            if held != self.owned:
+                print("Shard locks lost:", ", ".join(sorted(self.owned - held)))
+                metrics.error("shard_lock_lost")
+                self.owned = held
+            for sym in sorted(self.owned - target - busy):
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": lock_key(sym)})
+                self.owned.discard(sym)
+            for sym in sorted(target - self.owned):
+                # owner lama mungkin masih memegang lock sampai cycle-nya selesai → coba lagi nanti
+                if conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": lock_key(sym)}).scalar():
+                    self.owned.add(sym)
+            conn.commit()
+        except Exception as e:
+            # koneksi lock putus = semua lock sudah lepas di server
+            print("Shard lock error:", e)
+            metrics.error("shard_lock")
+            self._drop_connection()
+        metrics.SHARD_OWNED.set(len(self.owned))
+        return [sym for sym in self.symbols if sym in self.owned]
+
+    def _connection(self) -> Connection:
+        if self._lock_conn is None:
+            self._lock_conn = self.engine.connect()
+        return self._lock_conn
+
+    def _drop_connection(self):
+        self.owned.clear()
+        if self._lock_conn is not None:
+            try:
+                self._lock_conn.invalidate()
+                self._lock_conn.close()
+            except Exception:
+                pass
+            self._lock_conn = None
+
+    def _release_all(self):
+        if self._lock_conn is None:
+            return
+        try:
+            self._lock_conn.execute(text("SELECT pg_advisory_unlock_all()"))
+            self._lock_conn.commit()
+            self._lock_conn.close()
+        except Exception as e:
+            print("Shard unlock error:", e)
+        self._lock_conn = None
+        self.owned.clear()
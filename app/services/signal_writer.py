@@ -0,0 +1,179 @@
+# app/services/signal_writer.py
+"""
+Buffered bulk writer for Signal rows.
+
+Worker tidak lagi add/commit/refresh per signal: row dikumpulkan lalu
+di-flush sekaligus (multi-row INSERT ... RETURNING id, created_at dalam
+satu transaksi) kalau buffer sudah `batch_size` atau sudah `flush_interval`
+detik sejak row pertama masuk. Listener dipanggil per flush dengan row
+yang sudah punya id, untuk notifikasi.
+
+created_at is stamped at flush time (right before the INSERT), not when
+the row was buffered. Rows of a failed flush go back to the front of the
+buffer and are retried on the next flush (at most SIGNAL_MAX_PENDING rows
+are kept, the oldest are dropped beyond that).
+
+close() flushes whatever is still buffered; call it on shutdown.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app import metrics
+from app.db import engine as default_engine
+from app.model import Signal
+
+SIGNAL_BATCH_SIZE = int(os.getenv("SIGNAL_BATCH_SIZE", "500"))
+SIGNAL_FLUSH_INTERVAL = float(os.getenv("SIGNAL_FLUSH_INTERVAL", "1.0"))  # detik
+SIGNAL_MAX_PENDING = int(os.getenv("SIGNAL_MAX_PENDING", "50000"))  # batas buffer saat DB down
+
+
+class SavedSignal(NamedTuple):
+    id: int
+    symbol: str
+    signal_type: str
+    confidence: Optional[float]
+    created_at: datetime
+    meta: Dict[str, Any]
+    timeframe: str = "1m"
+
+
+class SignalWriter:
+    def __init__(
+        self,
+        batch_size: int = SIGNAL_BATCH_SIZE,
+        flush_interval: float = SIGNAL_FLUSH_INTERVAL,
+        engine: Engine = default_engine,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.engine = engine
+        self.listeners: List[Callable[[List[SavedSignal]], None]] = []
+        self.flushed_rows = 0
+        self.failed_rows = 0
+
+        self._pending: List[Dict[str, Any]] = []
+        self._first_at = 0.0
+        self._retry_at = 0.0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # satu flush dalam satu waktu
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="signal-writer", daemon=True)
+        self._thread.start()
+
+    def add(
+        self,
+        symbol: str,
+        signal_type: str,
+        confidence: Optional[float],
+        meta: Optional[Dict[str, Any]] = None,
+        timeframe: str = "1m",
+    ):
+        """Buffer one signal; meta is passed back to listeners untouched"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SignalWriter is closed")
+            first = not self._pending
+            if first:
+                self._first_at = time.monotonic()
+            self._pending.append({
+                "symbol": symbol,
+                "signal_type": signal_type,
+                "timeframe": timeframe,
+                "confidence": confidence,
+                "meta": meta or {},
+            })
+            if first or len(self._pending) >= self.batch_size:
+                self._cond.notify()  # mulai timer flush / batch penuh
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write everything buffered now. Returns number of rows written."""
+        with self._flush_lock:
+            with self._cond:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            now = datetime.utcnow()  # stempel saat INSERT, bukan saat masuk buffer
+            params = [{**{k: v for k, v in r.items() if k != "meta"}, "created_at": now} for r in rows]
+            try:
+                with self.engine.begin() as conn:
+                    result = conn.execute(
+                        insert(Signal).returning(Signal.id, Signal.created_at, sort_by_parameter_order=True),
+                        params,
+                    )
+                    ids = result.all()
+            except Exception as e:
+                print("Signal flush error:", len(rows), "rows kept for retry:", e)
+                metrics.error("signal_flush")
+                self._requeue(rows)
+                return 0
+
+            saved = [
+                SavedSignal(row_id, r["symbol"], r["signal_type"], r["confidence"], created_at, r["meta"], r["timeframe"])
+                for (row_id, created_at), r in zip(ids, rows)
+            ]
+            self.flushed_rows += len(saved)
+            for listener in self.listeners:
+                try:
+                    listener(saved)
+                except Exception as e:
+                    print("Signal listener error:", e)
+                    metrics.error("signal_listener")
+            return len(saved)
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        """Put rows of a failed flush back in front; retry after flush_interval"""
+        with self._cond:
+            self._pending[:0] = rows
+            overflow = len(self._pending) - SIGNAL_MAX_PENDING
+            if overflow > 0:
+                del self._pending[:overflow]
+                self.failed_rows += overflow
+                print("Signal buffer full,", overflow, "oldest rows dropped")
+            self._first_at = time.monotonic()
+            self._retry_at = self._first_at + self.flush_interval
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    backoff = self._retry_at - time.monotonic()  # setelah flush gagal
+                    if backoff > 0:
+                        self._cond.wait(backoff)
+                        continue
+                    if len(self._pending) >= self.batch_size:
+                        break
+                    if self._pending:
+                        remaining = self._first_at + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self, timeout: float = 10.0):
+        """Stop the background thread after a final flush"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        self.flush()
+        if self._pending:
+            self.failed_rows += len(self._pending)
+            print("Signal writer closed,", len(self._pending), "unsaved rows lost")
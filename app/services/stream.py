@@ -0,0 +1,272 @@
+# app/services/stream.py
+"""
+Push-based market data from Binance WebSocket streams.
+
+Satu koneksi combined-stream (`/stream`) untuk semua symbol: kline, depth
+diff (L2 book, lihat app.services.orderbook) dan 24h ticker. Setelah connect / reconnect semua
+stream di-SUBSCRIBE ulang, lalu candle buffer diperbaiki lewat REST
+(CandleStore.refresh, pakai startTime) supaya candle yang terlewat selama
+putus tidak hilang. Gap di tengah stream juga diperbaiki lewat REST.
+
+Indodax has no usable public WebSocket, its data keeps coming from the REST
+functions in market_data.
+
+For local testing point BINANCE_WS_URL to app.services.stream_replay, which
+replays messages recorded with STREAM_RECORD_PATH.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import websockets
+
+from app import metrics
+from app.services.candle_store import CandleStore
+from app.services.market_data import interval_seconds, get_binance_orderbook_usdt
+from app.services.orderbook import BookSync, OrderBook
+
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443/stream")
+STREAM_RECONNECT_MAX = float(os.getenv("STREAM_RECONNECT_MAX", "60"))  # max backoff (s)
+STREAM_RECORD_PATH = os.getenv("STREAM_RECORD_PATH", "")  # simpan raw message (jsonl) untuk replay
+
+BOOK_SNAPSHOT_LIMIT = 1000  # level per sisi di REST snapshot
+SUBSCRIBE_CHUNK = 200  # Binance: max 1024 stream per koneksi, batasi ukuran satu SUBSCRIBE
+
+
+class BinanceStream:
+    def __init__(
+        self,
+        symbols: List[str],
+        candles: Optional[CandleStore] = None,
+        interval: str = "1m",
+        depth: bool = True,
+        ticker: bool = True,
+        url: str = BINANCE_WS_URL,
+    ):
+        self.symbols = [s.upper() for s in symbols]
+        self.candles = candles
+        self.interval = interval
+        self.url = url
+        self.step_ms = interval_seconds(interval) * 1000
+
+        self.streams: List[str] = []
+        for sym in self.symbols:
+            pair = f"{sym.lower()}usdt"
+            if candles is not None:
+                self.streams.append(f"{pair}@kline_{interval}")
+            if depth:
+                self.streams.append(f"{pair}@depth@100ms")
+            if ticker:
+                self.streams.append(f"{pair}@ticker")
+
+        self.tickers: Dict[str, Dict[str, Any]] = {}
+        self.books: Dict[str, BookSync] = {sym: BookSync(OrderBook("binance", sym + "USDT")) for sym in self.symbols}
+        self.kline_listeners: List[Callable[[str, List[Any], bool], None]] = []
+
+        self.connected = False
+        self.last_message_at = 0.0
+        self.reconnects = 0
+        self._repairing: set = set()
+        self._snapshotting: set = set()
+        self._stopped = False
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._record = open(STREAM_RECORD_PATH, "a") if STREAM_RECORD_PATH else None
+
+    # ---------------------------------------------------------------
+    # lifecycle
+    # ---------------------------------------------------------------
+    def start(self) -> "asyncio.Task":
+        """Run inside an existing event loop (e.g. FastAPI startup)"""
+        self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    def start_in_thread(self) -> threading.Thread:
+        """Run on its own event loop in a daemon thread (for the sync worker)"""
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        self._task = loop.create_task(self.run())
+
+        def runner():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self._task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                loop.close()
+
+        t = threading.Thread(target=runner, name="binance-stream", daemon=True)
+        t.start()
+        return t
+
+    def stop_threadsafe(self):
+        """Stop a stream started with start_in_thread (from another thread)"""
+        self._stopped = True
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+            if self._record is not None:
+                self._loop.call_soon_threadsafe(self._record.close)  # di loop stream, bukan saat _on_raw menulis
+
+    async def stop(self):
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+        if self._record is not None:
+            self._record.close()
+
+    async def run(self):
+        backoff = 1.0
+        while not self._stopped:
+            try:
+                async with websockets.connect(self.url, ping_interval=20, max_size=2 ** 22) as ws:
+                    await self._subscribe(ws)
+                    self.connected = True
+                    backoff = 1.0
+                    for sync in self.books.values():
+                        sync.reset()  # diff yang terlewat → book harus di-snapshot ulang
+                    print("Stream connected:", self.url, len(self.streams), "streams")
+                    # isi candle yang terlewat selama putus
+                    for sym in self.symbols:
+                        self._schedule_repair(sym)
+                    async for raw in ws:
+                        self._on_raw(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("Stream error:", e)
+                metrics.error("stream")
+            self.connected = False
+            if self._stopped:
+                break
+            self.reconnects += 1
+            delay = backoff + random.uniform(0, backoff / 2)
+            print(f"Stream reconnect in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, STREAM_RECONNECT_MAX)
+
+    async def _subscribe(self, ws):
+        for i in range(0, len(self.streams), SUBSCRIBE_CHUNK):
+            params = self.streams[i:i + SUBSCRIBE_CHUNK]
+            await ws.send(json.dumps({"method": "SUBSCRIBE", "params": params, "id": i // SUBSCRIBE_CHUNK + 1}))
+
+    # ---------------------------------------------------------------
+    # messages
+    # ---------------------------------------------------------------
+    def _on_raw(self, raw):
+        self.last_message_at = time.time()
+        if self._record is not None:
+            self._record.write(raw if isinstance(raw, str) else raw.decode())
+            self._record.write("\n")
+        msg = json.loads(raw)
+        stream = msg.get("stream")
+        data = msg.get("data")
+        if not stream or data is None:
+            return  # SUBSCRIBE ack: {"result": null, "id": 1}
+        pair, _, kind = stream.partition("@")
+        sym = pair.upper()[:-4]  # btcusdt → BTC
+        if kind.startswith("kline"):
+            self._on_kline(sym, data["k"])
+        elif kind.startswith("depth"):
+            self._on_depth(sym, data)
+        elif kind == "ticker":
+            self._on_ticker(sym, data)
+
+    def _on_kline(self, sym: str, k: Dict[str, Any]):
+        row = [k["t"], k["o"], k["h"], k["l"], k["c"], k["v"], k["T"]]
+        if self.candles is not None:
+            if sym in self._repairing:
+                return  # REST repair sedang jalan dan akan mencakup candle ini
+            buf = self.candles.get(sym)
+            last = buf.last_open_time
+            if last is None or row[0] > last + self.step_ms:
+                self._schedule_repair(sym)
+                return
+            # jangan block event loop kalau worker sedang refresh via REST;
+            # refresh itu sudah mengambil candle ini juga
+            if buf.lock.acquire(blocking=False):
+                try:
+                    buf.apply([row])
+                finally:
+                    buf.lock.release()
+        for listener in self.kline_listeners:
+            listener(sym, row, bool(k.get("x")))
+
+    def _on_depth(self, sym: str, data: Dict[str, Any]):
+        sync = self.books.get(sym)
+        if sync is not None and not sync.on_event(data):
+            self._schedule_snapshot(sym)
+
+    def _on_ticker(self, sym: str, data: Dict[str, Any]):
+        self.tickers[sym] = {
+            "exchange": "binance",
+            "symbol": sym + "USDT",
+            "price": float(data["c"]),
+            "high": float(data["h"]),
+            "low": float(data["l"]),
+            "vol": float(data["q"]),
+            "updated_at": time.time(),
+        }
+
+    # ---------------------------------------------------------------
+    # REST fallback / gap repair
+    # ---------------------------------------------------------------
+    def _schedule_repair(self, sym: str):
+        if self.candles is None or sym in self._repairing:
+            return
+        self._repairing.add(sym)
+        asyncio.ensure_future(self._repair(sym))
+
+    async def _repair(self, sym: str):
+        try:
+            res = await asyncio.get_running_loop().run_in_executor(None, self.candles.refresh, sym)
+            if "error" in res:
+                print("Stream repair error:", sym, res)
+                metrics.error("stream_repair")
+        finally:
+            self._repairing.discard(sym)
+
+    def _schedule_snapshot(self, sym: str):
+        if sym in self._snapshotting:
+            return
+        self._snapshotting.add(sym)
+        asyncio.ensure_future(self._snapshot(sym))
+
+    async def _snapshot(self, sym: str):
+        loop = asyncio.get_running_loop()
+        try:
+            while not self._stopped:
+                snap = await loop.run_in_executor(None, get_binance_orderbook_usdt, sym, BOOK_SNAPSHOT_LIMIT)
+                if "error" not in snap and self.books[sym].load_snapshot(snap):
+                    return
+                await asyncio.sleep(1)  # snapshot lama (cache) / error: coba lagi
+        finally:
+            self._snapshotting.discard(sym)
+
+    # ---------------------------------------------------------------
+    # reads
+    # ---------------------------------------------------------------
+    def l2(self, sym: str, max_age: float = 5.0) -> Optional[OrderBook]:
+        """Synced L2 book of sym if it was updated within max_age seconds"""
+        sync = self.books.get(sym.upper())
+        if sync is None or not sync.synced or time.time() - sync.book.updated_at > max_age:
+            return None
+        return sync.book
+
+    def fresh_book(self, sym: str, max_age: float = 5.0, limit: int = 20) -> Optional[Dict[str, Any]]:
+        """Top `limit` levels (USDT) of the synced book, or None"""
+        book = self.l2(sym, max_age)
+        if book is None:
+            return None
+        return {**book.top(limit), "last_update_id": book.last_update_id}
+
+    def is_fresh(self, sym: str, max_age: float) -> bool:
+        """True if the candle buffer of sym was updated by the stream recently"""
+        if self.candles is None or not self.connected:
+            return False
+        return time.time() - self.candles.get(sym.upper()).updated_at <= max_age
@@ -0,0 +1,83 @@
+# app/services/stream_replay.py
+"""
+Local stand-in for the Binance combined-stream WebSocket.
+
+Replays messages recorded by BinanceStream (STREAM_RECORD_PATH, one raw
+message per line) to every client that connects, after answering its
+SUBSCRIBE requests. Only messages for subscribed streams are sent.
+
+    python -m app.services.stream_replay recorded.jsonl --port 8765 --rate 50
+    BINANCE_WS_URL=ws://localhost:8765/stream python app/worker.py
+
+--drop-after N closes the connection after N messages, to exercise the
+client's reconnect + resubscribe + REST repair path.
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List
+
+import websockets
+
+
+def load_messages(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+async def serve(messages: List[str], host: str, port: int, rate: float, drop_after: int, loop_replay: bool):
+    async def handler(ws, *_):
+        subscribed = set()
+        ready = asyncio.Event()
+        sent = 0
+
+        async def read_requests():
+            async for raw in ws:
+                req = json.loads(raw)
+                if req.get("method") == "SUBSCRIBE":
+                    subscribed.update(req.get("params", []))
+                    await ws.send(json.dumps({"result": None, "id": req.get("id")}))
+                    ready.set()
+
+        reader = asyncio.ensure_future(read_requests())
+        try:
+            await ready.wait()
+            while True:
+                for raw in messages:
+                    stream = json.loads(raw).get("stream")
+                    if stream is not None and stream not in subscribed:
+                        continue
+                    await ws.send(raw)
+                    sent += 1
+                    if drop_after and sent >= drop_after:
+                        await ws.close()
+                        return
+                    if rate:
+                        await asyncio.sleep(1 / rate)
+                if not loop_replay:
+                    break
+                await asyncio.sleep(0)
+            await ws.wait_closed()
+        finally:
+            reader.cancel()
+
+    async with websockets.serve(handler, host, port):
+        print(f"Replaying {len(messages)} messages on ws://{host}:{port}/stream")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Binance stream messages")
+    parser.add_argument("path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=0, help="messages per second, 0 = as fast as possible")
+    parser.add_argument("--drop-after", type=int, default=0)
+    parser.add_argument("--loop", action="store_true", help="replay the recording forever")
+    args = parser.parse_args()
+    asyncio.run(serve(load_messages(args.path), args.host, args.port, args.rate, args.drop_after, args.loop))
+
+
+if __name__ == "__main__":
+    main()
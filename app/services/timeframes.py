@@ -0,0 +1,145 @@
+# app/services/timeframes.py
+"""
+Timeframe lebih tinggi (5m / 15m / 1h ...) yang diturunkan dari buffer 1m.
+
+Tidak ada request REST tambahan: setiap refresh, candle 1m sejak bucket
+terakhir di-aggregate ulang (open pertama, high max, low min, close
+terakhir, volume sum) ke CandleBuffer per timeframe. Bucket yang masih
+berjalan di-revisi di tempat, bucket baru di-append. Saat pertama kali,
+buffer diisi dari candle history lokal (kalau ada) supaya detector 1h
+tidak perlu menunggu berjam-jam.
+
+Detectors of a higher timeframe run once per closed candle of that
+timeframe, on closed candles only; see TimeframeStore.update / closed.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.detector.batch import DEFAULT_PARAMS
+from app.services.candle_history import STEP_MS, CandleHistory, resample
+from app.services.candle_store import CandleBuffer
+from app.services.market_data import interval_seconds
+
+TIMEFRAMES = [t.strip() for t in os.getenv("TIMEFRAMES", "1m,5m,15m,1h").split(",") if t.strip()]
+# detector per timeframe: "tf:det,det;tf:det"; timeframe yang tidak disebut memakai semua detector
+TIMEFRAME_DETECTORS = os.getenv(
+    "TIMEFRAME_DETECTORS",
+    "1m:pump_dump,stagnant,sideway,breakout,support_resistance;"
+    "5m:pump_dump,sideway,breakout;15m:pump_dump,sideway,breakout;1h:breakout,support_resistance",
+)
+
+
+def detector_sets(timeframes: List[str] = TIMEFRAMES, spec: str = TIMEFRAME_DETECTORS) -> Dict[str, Dict[str, dict]]:
+    """timeframe → evaluate_batch params (subset of DEFAULT_PARAMS)"""
+    names: Dict[str, List[str]] = {}
+    for part in spec.split(";"):
+        tf, _, dets = part.partition(":")
+        if tf.strip():
+            names[tf.strip()] = [d.strip() for d in dets.split(",") if d.strip()]
+    sets = {}
+    for tf in timeframes:
+        interval_seconds(tf)  # ValueError / KeyError untuk timeframe yang tidak valid
+        wanted = names.get(tf, list(DEFAULT_PARAMS))
+        unknown = set(wanted) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"unknown detector(s) for {tf}: {sorted(unknown)}")
+        sets[tf] = {d: DEFAULT_PARAMS[d] for d in wanted}
+    return sets
+
+
+def aggregate(times: np.ndarray, values: np.ndarray, step_ms: int) -> List[List[float]]:
+    """1m open_times (ascending) + (5, n) open/high/low/close/volume → rows of step_ms candles"""
+    bucket = times // step_ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    ends = np.append(starts[1:], len(times)) - 1
+    cols = np.stack([
+        (bucket[starts] * step_ms).astype(np.float64),
+        values[0][starts],
+        np.maximum.reduceat(values[1], starts),
+        np.minimum.reduceat(values[2], starts),
+        values[3][ends],
+        np.add.reduceat(values[4], starts),
+    ], axis=1)
+    return cols.tolist()
+
+
+class _Closed:
+    """Read-only view of a CandleBuffer without its last (still open) candle, for build_matrix"""
+
+    def __init__(self, buf: CandleBuffer):
+        self._buf = buf
+
+    def __len__(self) -> int:
+        return max(len(self._buf) - 1, 0)
+
+    def column(self, idx: int) -> np.ndarray:
+        return self._buf.column(idx)[:-1]
+
+
+class TimeframeStore:
+    def __init__(self, timeframes: List[str] = TIMEFRAMES, capacity: int = 200, history: Optional[CandleHistory] = None):
+        self.steps = {tf: interval_seconds(tf) * 1000 for tf in timeframes if interval_seconds(tf) * 1000 > STEP_MS}
+        self.capacity = capacity
+        self.history = history
+        self._buffers: Dict[Tuple[str, str], CandleBuffer] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def timeframes(self) -> List[str]:
+        return list(self.steps)
+
+    def get(self, tf: str, symbol: str) -> CandleBuffer:
+        with self._lock:
+            buf = self._buffers.get((tf, symbol))
+            if buf is None:
+                buf = self._buffers[(tf, symbol)] = CandleBuffer(self.capacity)
+        return buf
+
+    def closed(self, tf: str, symbol: str) -> _Closed:
+        return _Closed(self.get(tf, symbol))
+
+    def _seed(self, symbol: str, buf: CandleBuffer, step_ms: int):
+        """Fill an empty buffer from the local 1m history (no upstream call)"""
+        if self.history is None:
+            return
+        rec = self.history.records(symbol)
+        if rec is None:
+            return
+        n = (self.capacity + 1) * (step_ms // STEP_MS)
+        agg = resample(np.array(rec[-n:]), step_ms)[1:]  # bucket pertama bisa tidak lengkap
+        if len(agg):
+            buf.apply(agg.tolist())
+
+    def update(self, symbol: str, base: CandleBuffer) -> List[str]:
+        """
+        Fold new 1m candles of `base` into every timeframe.
+        Returns the timeframes whose previous candle just closed.
+        """
+        with base.lock:
+            times = base.open_times.copy()
+            values = np.array([base.column(i) for i in range(1, 6)])
+        if not len(times):
+            return []
+        closed = []
+        for tf, step_ms in self.steps.items():
+            buf = self.get(tf, symbol)
+            if buf.last_open_time is None:
+                self._seed(symbol, buf, step_ms)
+            last = buf.last_open_time
+            if last is None:
+                # mulai dari bucket pertama yang lengkap di buffer 1m
+                first = -(-int(times[0]) // step_ms) * step_ms
+            elif times[0] > last:
+                first = -(-int(times[0]) // step_ms) * step_ms  # awal bucket terakhir sudah hilang dari buffer 1m
+            else:
+                first = last  # hitung ulang bucket yang masih berjalan
+            i = int(np.searchsorted(times, first))
+            if i == len(times):
+                continue
+            if buf.apply(aggregate(times[i:], values[:, i:], step_ms)) and last is not None:
+                closed.append(tf)
+        return closed
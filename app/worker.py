@@ -1,98 +1,313 @@
 # app/worker.py
 import os
+import signal
 import time
 import json
-import requests
+import threading
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-from app.services.market_data import get_ohlcv_binance, convert_binance_orderbook_to_idr, get_indodax_orderbook, get_indodax_ticker
-from app.detectors import detect_pump_dump, detect_stagnant, detect_sideway, detect_breakout, simple_support_resistance
-from app.db import SessionLocal, Base, engine
-from app.crud.crud_signal import Signal  # reuse model class
-from sqlalchemy.orm import Session
+from app.services.market_data import get_ohlcv_binance, convert_binance_orderbook_to_idr, get_indodax_orderbook, get_indodax_ticker, get_usdt_idr_rate
+from app.services.candle_store import CandleStore
+from app.services.candle_history import CandleHistory
+from app.services.stream import BinanceStream
+from app.services.pubsub import publish_many
+from app.services.signal_writer import SignalWriter
+from app.services.rollups import RollupJob
+from app.services.notifier import Notifier
+from app.services.sharding import ShardCoordinator
+from app.services.timeframes import TimeframeStore, detector_sets
+from app.services.polling import POLL_MIN_INTERVAL, PollPlan
+from app.services import ratelimit
+from app.detector.batch import build_matrix, evaluate_batch
+from app import metrics
 
 # ENV
 SYMBOLS = os.getenv("SYMBOLS", "BTC,ETH").split(",")  # e.g. BTC,ETH,SOL
-POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "30"))  # seconds
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
-
-def send_telegram(text: str):
-    if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
-        print("Telegram not configured")
-        return
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": text, "parse_mode": "HTML"}
+POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "30"))  # seconds, per symbol disesuaikan volatilitas (app.services.polling)
+POLL_TICK = POLL_MIN_INTERVAL  # cycle jalan tiap interval terpendek, hanya symbol yang jatuh tempo di-refresh
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "8"))  # symbols processed in parallel
+FETCH_BUDGET = float(os.getenv("FETCH_BUDGET", str(POLL_TICK / 2)))  # max seconds to wait for candle refresh per cycle
+CANDLE_CAPACITY = int(os.getenv("CANDLE_CAPACITY", "200"))  # candles kept per symbol
+STREAM_ENABLED = os.getenv("STREAM_ENABLED", "0") == "1"  # kline via WebSocket, REST hanya fallback
+STREAM_STALE_AFTER = float(os.getenv("STREAM_STALE_AFTER", "90"))  # detik tanpa update → pakai REST
+PUBLISH_INTERVAL = float(os.getenv("PUBLISH_INTERVAL", "1"))  # detik antar snapshot orderbook ke API (butuh stream)
+PUBLISH_BOOK_DEPTH = int(os.getenv("PUBLISH_BOOK_DEPTH", "10"))
+CANDLE_HISTORY_ENABLED = os.getenv("CANDLE_HISTORY_ENABLED", "1") == "1"  # tulis 1m candle ke file untuk /chart
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))  # Prometheus scrape, 0 = mati
+
+# Telegram lewat outbox (thread sendiri: rate limit, batching, dedup, retry)
+NOTIFIER = Notifier()
+
+# 1m candles per symbol, di-update incremental tiap cycle
+CANDLES = CandleStore(interval="1m", capacity=CANDLE_CAPACITY)
+STREAM = None  # BinanceStream kalau STREAM_ENABLED (hanya symbol milik worker ini)
+SHARDS = None  # ShardCoordinator, dibuat di run_loop
+WRITER = None  # SignalWriter, dibuat di run_loop
+ROLLUPS = None  # RollupJob, dibuat di run_loop
+HISTORY = CandleHistory() if CANDLE_HISTORY_ENABLED else None
+
+# timeframe → detector params (TIMEFRAMES / TIMEFRAME_DETECTORS); 5m/15m/1h di-aggregate dari buffer 1m
+DETECTOR_SETS = detector_sets()
+FRAMES = TimeframeStore(list(DETECTOR_SETS), capacity=CANDLE_CAPACITY, history=HISTORY)
+
+# kapan tiap symbol di-poll lagi; weight klines per refresh dihitung terhadap budget Binance (tanpa stream)
+POLL = PollPlan()
+REFRESH_COST = 0 if STREAM_ENABLED else ratelimit.weight("binance", "/klines")
+
+def classify_message(m: str) -> str:
+    # simple classification: use first word in message as signal_type
+    if "pump" in m.lower():
+        return "pump"
+    if "dump" in m.lower():
+        return "dump"
+    if "breakout" in m.lower():
+        return "breakout"
+    if "stagnant" in m.lower() or "sideway" in m.lower():
+        return "stagnant/sideway"
+    return "info"
+
+def build_messages(sym: str, res: dict, timeframe: str = "1m") -> list:
+    """Turn batch detector results of one symbol into (detector, notification text) pairs (detectors not in the set are skipped)"""
+    pumpdump = res.get("pump_dump", {})
+    stagnant = res.get("stagnant", {})
+    sideway = res.get("sideway", {})
+    breakout = res.get("breakout", {})
+    sr = res.get("support_resistance", {})
+    label = f"<b>{sym}</b>" if timeframe == "1m" else f"<b>{sym}</b> [{timeframe}]"
+
+    messages = []
+    if pumpdump.get("status") in ("pump", "dump"):
+        text = f"{label} detected {pumpdump['status'].upper()} ({pumpdump['pct']*100:.2f}%)"
+        messages.append(("pump_dump", text))
+    if stagnant.get("status") == "stagnant":
+        messages.append(("stagnant", f"{label} stagnant (range {stagnant.get('range_frac')*100:.2f}%)"))
+    if sideway.get("status") == "sideway":
+        messages.append(("sideway", f"{label} sideway (std {sideway.get('std'):.5f})"))
+    if breakout.get("status") == "breakout":
+        messages.append(("breakout", f"{label} breakout! last {breakout['last']}, prev_high {breakout['prev_high']}"))
+    if sr.get("support") and sr.get("resistance"):
+        messages.append(("support_resistance", f"{label} support {sr['support']:.0f}, resistance {sr['resistance']:.0f}"))
+    return messages
+
+def queue_signals(sym: str, messages: list, timeframe: str = "1m"):
+    """Buffer signals of one symbol; notification happens once they have an id"""
+    for detector, m in messages:
+        WRITER.add(sym, classify_message(m), 0.5, meta={"text": m, "detector": detector}, timeframe=timeframe)
+
+def notify_saved(saved: list):
+    """SignalWriter listener: telegram + pubsub for a flushed batch"""
+    events = []
+    for s in saved:
+        m = s.meta.get("text", s.signal_type)
+        # key per symbol + detector + jenis: support/resistance dll. tidak dikirim ulang tiap cycle,
+        # stagnant dan sideway (signal_type sama) tidak saling menahan
+        key = f"{s.symbol}:{s.timeframe}:{s.meta.get('detector', '')}:{s.signal_type}"
+        NOTIFIER.enqueue(f"{m}\nID: {s.id} time: {s.created_at}", key=key)
+        events.append({
+            "type": "signal", "symbol": s.symbol, "id": s.id, "signal_type": s.signal_type, "timeframe": s.timeframe,
+            "confidence": s.confidence, "created_at": s.created_at, "text": m,
+        })
+    publish_many(events)
+
+def refresh_symbol(sym: str) -> Optional[list]:
+    """
+    Update candle buffer from Binance (backfill once, then only new candles)
+    and the derived timeframes. Returns the timeframes whose candle just
+    closed, or None if the refresh failed.
+    """
+    # stream sudah mengisi buffer kalau masih fresh, tidak perlu REST
+    stream = STREAM  # bisa diganti run_loop saat rebalance
+    if stream is None or not stream.is_fresh(sym, STREAM_STALE_AFTER):
+        try:
+            res = CANDLES.refresh(sym)
+        except Exception as e:
+            res = {"error": str(e)}
+        if "error" in res:
+            print("OHLC error:", sym, res)
+            metrics.error("worker_ohlc")
+            return None
+    if HISTORY is not None:
+        try:
+            HISTORY.sync(sym, CANDLES.get(sym))
+        except Exception as e:
+            print("History write error:", sym, e)
+            metrics.error("history_write")
     try:
-        r = requests.post(url, json=payload, timeout=6)
-        r.raise_for_status()
+        return FRAMES.update(sym, CANDLES.get(sym))
     except Exception as e:
-        print("Telegram send error:", e)
+        print("Timeframe update error:", sym, e)
+        metrics.error("timeframes")
+        return []
 
-def save_signal(db: Session, symbol: str, signal_type: str, confidence: float):
-    s = Signal(symbol=symbol, signal_type=signal_type, confidence=confidence)
-    db.add(s)
-    db.commit()
-    db.refresh(s)
-    return s
+def run_cycle(pool: ThreadPoolExecutor, symbols: list, running: dict) -> dict:
+    """
+    One detection cycle:
+    1. refresh candle buffers in parallel (max FETCH_BUDGET seconds),
+    2. run the 1m detectors for every refreshed symbol in one vectorized batch,
+       and the detectors of a higher timeframe for symbols whose candle of
+       that timeframe just closed (on closed candles only),
+    3. queue signals in the bulk writer (saved + notified on flush).
+    Only symbols whose poll interval elapsed are refreshed (see PollPlan);
+    symbols whose previous refresh is still running are skipped.
+    """
+    for sym, fut in list(running.items()):
+        if fut.done():
+            del running[sym]
+    scheduled = POLL.due(symbols, time.monotonic())
+    due = [sym for sym in scheduled if sym not in running]
 
-def run_loop():
-    print("Worker started. Poll interval:", POLL_INTERVAL, "symbols:", SYMBOLS)
+    fetches = {sym: pool.submit(refresh_symbol, sym) for sym in due}
+    running.update(fetches)
+    wait(list(fetches.values()), timeout=FETCH_BUDGET)
+    closed = {sym: f.result() for sym, f in fetches.items() if f.done() and f.result() is not None}
+    ready = list(closed)
+
+    results = {}
+    if ready and "1m" in DETECTOR_SETS:
+        results = evaluate_batch(build_matrix({sym: CANDLES.get(sym) for sym in ready}), DETECTOR_SETS["1m"])
+    tf_results = {sym: {} for sym in ready}
+    for tf in FRAMES.timeframes:
+        syms = [sym for sym in ready if tf in closed[sym]]
+        if not syms:
+            continue
+        res_tf = evaluate_batch(build_matrix({sym: FRAMES.closed(tf, sym) for sym in syms}), DETECTOR_SETS[tf])
+        for sym in syms:
+            tf_results[sym][tf] = res_tf[sym]
+            queue_signals(sym, build_messages(sym, res_tf[sym], tf), tf)
+    snapshots = []
+    for sym in ready:
+        snapshots.append({
+            "type": "snapshot", "symbol": sym, "ts": time.time(), "candle": CANDLES.get(sym)[-1],
+            "detectors": results.get(sym, {}), "timeframes": tf_results[sym],
+        })
+        if sym in results:
+            queue_signals(sym, build_messages(sym, results[sym]))
+    publish_many(snapshots)
+
+    now = time.monotonic()
+    POLL.update({sym: results.get(sym, {}) for sym in ready}, now, REFRESH_COST, ratelimit.budget("binance"))
+    POLL.retry([sym for sym in due if sym not in closed], now)
+    stats = {
+        "due": len(due), "ready": len(ready),
+        "skipped": len(scheduled) - len(due), "idle": len(symbols) - len(scheduled),
+    }
+    metrics.WORKER_SYMBOLS.labels("ready").inc(stats["ready"])
+    metrics.WORKER_SYMBOLS.labels("failed").inc(stats["due"] - stats["ready"])
+    metrics.WORKER_SYMBOLS.labels("skipped").inc(stats["skipped"])
+    metrics.WORKER_SYMBOLS.labels("idle").inc(stats["idle"])
+    for stat, value in POLL.stats().items():
+        metrics.WORKER_POLL_INTERVAL.labels(stat).set(value)
+    metrics.WORKER_POLL_LOAD.set(POLL.load_ratio)
+    return stats
+
+def publish_books_loop():
+    """Publish streamed Binance books (IDR) to the API every PUBLISH_INTERVAL"""
     while True:
+        time.sleep(PUBLISH_INTERVAL)
         try:
-            for sym in SYMBOLS:
-                sym = sym.strip().upper()
-                # get ohlcv from Binance
-                ohlcv_res = get_ohlcv_binance(sym, interval="1m", limit=200)
-                if "error" in ohlcv_res:
-                    print("OHLC error:", ohlcv_res)
+            stream = STREAM
+            if stream is None:
+                continue
+            rate = get_usdt_idr_rate()
+            if not rate:
+                continue
+            events = []
+            for sym in stream.symbols:
+                book = stream.l2(sym)
+                if book is None:
                     continue
-                ohlcv = ohlcv_res["ohlcv"]
-
-                # detectors
-                pumpdump = detect_pump_dump(ohlcv, pump_threshold=0.07, window=5)
-                stagnant = detect_stagnant(ohlcv, threshold=0.02, window=30)
-                sideway = detect_sideway(ohlcv, ma_window=20, std_threshold=0.008)
-                breakout = detect_breakout(ohlcv, lookback=50, breakout_mult=0.01)
-                sr = simple_support_resistance(ohlcv, window=50)
-
-                messages = []
-                if pumpdump.get("status") in ("pump", "dump"):
-                    text = f"<b>{sym}</b> detected {pumpdump['status'].upper()} ({pumpdump['pct']*100:.2f}%)"
-                    messages.append(text)
-                if stagnant.get("status") == "stagnant":
-                    messages.append(f"<b>{sym}</b> stagnant (range {stagnant.get('range_frac')*100:.2f}%)")
-                if sideway.get("status") == "sideway":
-                    messages.append(f"<b>{sym}</b> sideway (std {sideway.get('std'):.5f})")
-                if breakout.get("status") == "breakout":
-                    messages.append(f"<b>{sym}</b> breakout! last {breakout['last']}, prev_high {breakout['prev_high']}")
-                if sr.get("support") and sr.get("resistance"):
-                    messages.append(f"<b>{sym}</b> support {sr['support']:.0f}, resistance {sr['resistance']:.0f}")
-
-                # Save & notify
-                db = SessionLocal()
-                try:
-                    for m in messages:
-                        # Save a signal row
-                        # simple classification: use first word in message as signal_type
-                        if "pump" in m.lower():
-                            t = "pump"
-                        elif "dump" in m.lower():
-                            t = "dump"
-                        elif "breakout" in m.lower():
-                            t = "breakout"
-                        elif "stagnant" in m.lower() or "sideway" in m.lower():
-                            t = "stagnant/sideway"
-                        else:
-                            t = "info"
-                        s = save_signal(db, sym, t, confidence=0.5)
-                        send_telegram(f"{m}\nID: {s.id} time: {s.created_at}")
-                finally:
-                    db.close()
-
-            time.sleep(POLL_INTERVAL)
+                events.append({
+                    "type": "book", "symbol": sym, "ts": time.time(),
+                    "binance": {"exchange": "binance", "symbol": f"{sym}_idr", **book.top(PUBLISH_BOOK_DEPTH, rate)},
+                    "ticker": stream.tickers.get(sym),
+                })
+            publish_many(events)
         except Exception as e:
-            print("Worker loop error:", e)
-            time.sleep(5)
+            print("Publish books error:", e)
+            metrics.error("publish_books")
+
+def restart_stream(symbols: list):
+    """(Re)subscribe the WebSocket to the symbols this worker owns"""
+    global STREAM
+    if STREAM is not None:
+        STREAM.stop_threadsafe()
+        STREAM = None
+    if symbols:
+        STREAM = BinanceStream(symbols, candles=CANDLES)
+        STREAM.start_in_thread()
+
+def _terminate(signum, frame):
+    raise SystemExit(0)
+
+def run_loop():
+    global WRITER, SHARDS, ROLLUPS
+    all_symbols = [s.strip().upper() for s in SYMBOLS if s.strip()]
+    print(
+        f"Worker started. Poll interval: {POLL.min_interval:g}-{POLL.max_interval:g}s (base {POLL_INTERVAL}s)",
+        "symbols:", all_symbols, "concurrency:", WORKER_CONCURRENCY,
+    )
+    # replica lain membagi SYMBOLS lewat heartbeat + advisory lock; tiap symbol hanya diproses satu worker
+    SHARDS = ShardCoordinator(all_symbols)
+    SHARDS.start()
+    symbols = []
+    if STREAM_ENABLED:
+        threading.Thread(target=publish_books_loop, name="publish-books", daemon=True).start()
+    metrics.start_worker_server(WORKER_METRICS_PORT)
+    NOTIFIER.start()
+    WRITER = SignalWriter()
+    WRITER.listeners.append(notify_saved)
+    # rollup /signal/stats: periodik + segera setelah flush
+    ROLLUPS = RollupJob()
+    ROLLUPS.start()
+    WRITER.listeners.append(ROLLUPS.poke)
+    # docker stop kirim SIGTERM: keluar lewat finally supaya buffer signal sempat di-flush
+    signal.signal(signal.SIGTERM, _terminate)
+    pool = ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY, thread_name_prefix="symbol")
+    running = {}  # symbol -> future dari cycle sebelumnya yang belum selesai
+    next_tick = time.monotonic()
+    try:
+        while True:
+            try:
+                cycle_start = time.monotonic()
+                lag = cycle_start - next_tick
+
+                owned = SHARDS.claim(busy=running)
+                if owned != symbols:
+                    print(f"Shard: {len(owned)}/{len(all_symbols)} symbols owned, {len(SHARDS.workers)} worker(s):", owned)
+                    symbols = owned
+                    POLL.forget(owned)
+                    if STREAM_ENABLED:
+                        restart_stream(symbols)
+                stats = run_cycle(pool, symbols, running)
+                next_tick += POLL_TICK
+                duration = time.monotonic() - cycle_start
+                metrics.WORKER_CYCLE_SECONDS.observe(duration)
+                metrics.WORKER_CYCLE_LAG.set(lag)
+                print(
+                    f"Cycle done in {duration:.2f}s (lag {lag:.2f}s, {stats['ready']}/{stats['due']} symbols ready, "
+                    f"{stats['skipped']} skipped, {stats['idle']} not due)"
+                )
+
+                # jadwal tetap: kalau sudah telat lebih dari satu interval, lompati tick yang terlewat
+                now = time.monotonic()
+                if now - next_tick > POLL_TICK:
+                    missed = int((now - next_tick) // POLL_TICK)
+                    next_tick += missed * POLL_TICK
+                    metrics.WORKER_MISSED_TICKS.inc(missed)
+                    print(f"Worker behind schedule, skipped {missed} cycle(s)")
+                time.sleep(max(0.0, next_tick - time.monotonic()))
+            except Exception as e:
+                print("Worker loop error:", e)
+                metrics.error("worker_loop")
+                time.sleep(5)
+                next_tick = time.monotonic()
+    finally:
+        print("Worker stopping, flushing", WRITER.pending(), "buffered signal(s)")
+        WRITER.close()
+        ROLLUPS.close()
+        NOTIFIER.close()
+        SHARDS.close()
 
 if __name__ == "__main__":
     run_loop()
@@ -0,0 +1,8 @@
+# tests/conftest.py
+# app.db membaca DATABASE_URL saat import: set sebelum modul app mana pun di-import
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="indotrader-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP}/test.db")
+os.environ.setdefault("CANDLE_HISTORY_DIR", os.path.join(_TMP, "candles"))
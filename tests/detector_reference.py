@@ -0,0 +1,22 @@
+# tests/detector_reference.py
+"""Shared by the batch and streaming detector tests: the pure-Python reference in app/detectors.py"""
+import pytest
+
+from app import detectors
+
+REFERENCE = {
+    "pump_dump": detectors.detect_pump_dump,
+    "stagnant": detectors.detect_stagnant,
+    "sideway": detectors.detect_sideway,
+    "breakout": detectors.detect_breakout,
+    "support_resistance": detectors.simple_support_resistance,
+}
+
+
+def assert_same(got, want, where):
+    assert got.keys() == want.keys(), where
+    for key, value in want.items():
+        if isinstance(value, float):
+            assert got[key] == pytest.approx(value, rel=1e-9, abs=1e-12), (where, key)
+        else:
+            assert got[key] == value, (where, key)
@@ -0,0 +1,15 @@
+# tests/test_app_import.py
+from app import metrics
+
+
+def test_import_app_main():
+    import app.main  # noqa: F401  (DuplicateTimeseries dll. muncul di sini)
+
+
+def test_cache_metrics_one_family_per_cache_label():
+    import app.main  # noqa: F401
+
+    text = metrics.render().decode()
+    assert text.count("# TYPE indotrader_cache_hits_total counter") == 1
+    for name in ("market_data", "auth_tokens", "auth_users"):
+        assert f'indotrader_cache_hits_total{{cache="{name}"}}' in text
@@ -0,0 +1,113 @@
+# tests/test_auth.py
+import asyncio
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+
+from app.auth import deps, jwt_handler, security
+from app.db import SessionLocal, dispose_async_engine
+from app.model import User
+
+
+class PlainContext:
+    """pwd_context palsu: bcrypt asli ~250ms per cek"""
+
+    def verify(self, plain, hashed):
+        return hashed == f"plain:{plain}"
+
+
+@pytest.fixture(scope="module")
+def client():
+    import app.main as main
+
+    with SessionLocal() as db:
+        db.query(User).filter(User.username.in_(["alice", "bob"])).delete(synchronize_session=False)
+        db.add_all([
+            User(username="alice", email="alice@example.com", password="plain:secret", role="admin"),
+            User(username="bob", email="bob@example.com", password="plain:hunter2", role="user"),
+        ])
+        db.commit()
+    with TestClient(main.app) as c:  # shutdown menutup engine async (loop milik TestClient)
+        yield c
+
+
+@pytest.fixture(autouse=True)
+def plain_hash(monkeypatch):
+    monkeypatch.setattr(security, "pwd_context", PlainContext())
+    deps.USERS.clear()
+
+
+def _login(client, username, password):
+    return client.post("/auth/login", json={"username": username, "password": password})
+
+
+def test_login_and_me(client):
+    res = _login(client, "alice", "secret")
+    assert res.status_code == 200
+    token = res.json()["access_token"]
+    me = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.status_code == 200
+    assert me.json() == {"id": me.json()["id"], "username": "alice", "email": "alice@example.com", "role": "admin"}
+
+
+def test_login_rejects_bad_credentials(client):
+    assert _login(client, "alice", "wrong").status_code == 401
+    assert _login(client, "nobody", "secret").status_code == 401
+
+
+def test_me_rejects_missing_invalid_and_expired_tokens(client):
+    assert client.get("/auth/me").status_code == 401
+    assert client.get("/auth/me", headers={"Authorization": "Bearer nonsense"}).status_code == 401
+    expired = jwt.encode(
+        {"sub": "alice", "exp": datetime.utcnow() - timedelta(minutes=1)}, jwt_handler.SECRET_KEY, algorithm=jwt_handler.ALGORITHM,
+    )
+    res = client.get("/auth/me", headers={"Authorization": f"Bearer {expired}"})
+    assert res.status_code == 401 and res.json()["detail"] == "Token expired"
+
+
+def test_claims_and_user_are_cached(client, monkeypatch):
+    token = jwt_handler.create_access_token({"sub": "bob", "role": "user"})
+    loads = []
+    real_load = deps._load_user
+
+    async def counting_load(username):
+        loads.append(username)
+        return await real_load(username)
+
+    monkeypatch.setattr(deps, "_load_user", counting_load)
+    hits = jwt_handler._CLAIMS.hits
+    for _ in range(3):
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).json()["username"] == "bob"
+    assert loads == ["bob"]
+    assert jwt_handler._CLAIMS.hits >= hits + 2
+
+
+def test_concurrent_requests_share_one_load_on_its_own_session(client):
+    token = jwt_handler.create_access_token({"sub": "alice", "role": "admin"})
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def many():
+        try:
+            return await asyncio.gather(*(deps.get_current_user(creds) for _ in range(20)))
+        finally:
+            await dispose_async_engine()
+
+    misses, coalesced = deps.USERS.misses, deps.USERS.coalesced
+    users = asyncio.run(many())
+    assert {u.username for u in users} == {"alice"}
+    assert deps.USERS.misses == misses + 1
+    assert deps.USERS.coalesced == coalesced + 19
+
+
+def test_full_hash_pool_answers_503(client, monkeypatch):
+    monkeypatch.setattr(security, "AUTH_HASH_QUEUE", 0)
+    res = _login(client, "alice", "secret")
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+
+
+def test_hash_pool_defaults_to_threads():
+    assert not security.AUTH_HASH_PROCESSES
@@ -0,0 +1,107 @@
+# tests/test_cache.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services import cache as cache_module
+from app.services.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def test_ttl_expiry_and_lru_eviction(monkeypatch):
+    clock = FakeClock(100.0)
+    monkeypatch.setattr(cache_module, "time", clock)
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1, ttl=5)
+    cache.set("b", 2, ttl=5)
+    assert cache.get("a") == (True, 1)  # a jadi paling baru
+    cache.set("c", 3, ttl=5)
+    assert cache.get("b") == (False, None)
+    assert cache.evictions == 1
+    clock.now += 6
+    assert cache.get("a") == (False, None)
+
+
+def test_threads_share_one_fetch():
+    cache = TTLCache()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return "v"
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", 10, fetch))) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == ["v"] * 20
+    assert cache.coalesced + cache.misses == 20
+
+
+def test_no_second_fetch_between_store_and_inflight_release():
+    calls = []
+    late = []
+
+    class Probe(TTLCache):
+        def set(self, key, value, ttl):
+            # caller yang datang tepat saat leader menyimpan hasil
+            t = threading.Thread(target=lambda: late.append(self.get_or_fetch("k", 10, lambda: calls.append("late") or "late")))
+            t.start()
+            t.join(0.1)
+            super().set(key, value, ttl)
+            probes.append(t)
+
+    probes = []
+    cache = Probe()
+    assert cache.get_or_fetch("k", 10, lambda: calls.append("leader") or "v") == "v"
+    for t in probes:
+        t.join(5)
+    assert calls == ["leader"]
+    assert late == ["v"]
+
+
+def test_error_releases_inflight_and_serves_stale(monkeypatch):
+    clock = FakeClock(0.0)
+    monkeypatch.setattr(cache_module, "time", clock)
+    cache = TTLCache()
+    cache.set("k", "old", ttl=1)
+    clock.now = 5.0
+
+    def boom():
+        raise RuntimeError("upstream down")
+
+    assert cache.get_or_fetch("k", 1, boom, stale_if_error=10) == "old"
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("k", 1, boom, stale_if_error=1)
+    assert cache._inflight == {}
+
+
+def test_async_single_flight():
+    cache = TTLCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "v"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_fetch("k", 10, fetch) for _ in range(50)))
+
+    assert asyncio.run(main()) == ["v"] * 50
+    assert len(calls) == 1
+    assert cache.get("k") == (True, "v")
+    assert cache._ainflight == {}
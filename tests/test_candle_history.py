@@ -0,0 +1,71 @@
+# tests/test_candle_history.py
+import time
+
+import numpy as np
+
+from app.services.candle_history import RECORD, STEP_MS, CandleHistory, resample
+
+
+def _records(start_ms: int, n: int) -> np.ndarray:
+    rec = np.empty(n, dtype=RECORD)
+    rec["t"] = start_ms + np.arange(n, dtype=np.int64) * STEP_MS
+    rec["o"] = np.arange(n) + 100.0
+    rec["h"] = rec["o"] + 2
+    rec["l"] = rec["o"] - 1
+    rec["c"] = rec["o"] + 1
+    rec["v"] = 1.0
+    return rec
+
+
+def _now_minute() -> int:
+    return int(time.time() * 1000) // STEP_MS * STEP_MS
+
+
+def test_resample_aligns_to_utc_buckets():
+    rec = _records(0, 10)
+    out = resample(rec, 5 * STEP_MS)
+    assert out["t"].tolist() == [0, 5 * STEP_MS]
+    assert out["o"].tolist() == [100.0, 105.0]
+    assert out["h"].tolist() == [106.0, 111.0]
+    assert out["l"].tolist() == [99.0, 104.0]
+    assert out["c"].tolist() == [105.0, 110.0]
+    assert out["v"].tolist() == [5.0, 5.0]
+
+
+def test_write_replaces_open_candle_and_appends(tmp_path):
+    history = CandleHistory(str(tmp_path))
+    rec = _records(0, 3)
+    assert history.write("BTC", rec) == 3
+    update = _records(2 * STEP_MS, 2)
+    update["c"] = 999.0
+    assert history.write("BTC", update) == 1
+    stored = history.records("BTC")
+    assert stored["t"].tolist() == [0, STEP_MS, 2 * STEP_MS, 3 * STEP_MS]
+    assert stored["c"].tolist()[2:] == [999.0, 999.0]
+
+
+def test_read_full_coverage(tmp_path):
+    history = CandleHistory(str(tmp_path))
+    history.write("BTC", _records(_now_minute() - 499 * STEP_MS, 500))
+    res = history.read("BTC", "1m", limit=500)
+    assert res is not None and len(res["ohlcv"]) == 500
+    assert res["source"] == "history"
+
+
+def test_read_returns_none_for_partial_history(tmp_path):
+    history = CandleHistory(str(tmp_path))
+    history.write("BTC", _records(_now_minute() - 199 * STEP_MS, 200))  # deploy baru: 200 candle
+    assert history.read("BTC", "1m", limit=500) is None
+    assert history.read("BTC", "1h", limit=5) is None
+    assert history.read("BTC", "1d", limit=30) is None
+    assert history.read("BTC", "1m", limit=100) is not None
+
+
+def test_read_stale_or_missing(tmp_path):
+    history = CandleHistory(str(tmp_path))
+    assert history.read("ETH", "1m") is None
+    history.write("ETH", _records(_now_minute() - 3 * 86_400_000, 100))
+    assert history.read("ETH", "1m", limit=10) is None  # worker ketinggalan
+    first = _now_minute() - 3 * 86_400_000
+    res = history.read("ETH", "1m", start=first, end=first + 9 * STEP_MS, limit=10)
+    assert res is not None and len(res["ohlcv"]) == 10
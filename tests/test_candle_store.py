@@ -0,0 +1,45 @@
+# tests/test_candle_store.py
+import time
+
+import numpy as np
+
+from app.services import candle_store
+from app.services.candle_store import MAX_KLINES_LIMIT, CandleBuffer, CandleStore
+
+
+def _row(t: int, close: float):
+    return [t, str(close), str(close + 1), str(close - 1), str(close), "10"]
+
+
+def test_buffer_matches_plain_list_across_wraparound():
+    buf = CandleBuffer(capacity=5)
+    expected = []
+    for t in range(12):
+        assert buf.apply([_row(t, 100 + t)]) == 1
+        expected = (expected + [[t, 100.0 + t, 101.0 + t, 99.0 + t, 100.0 + t, 10.0]])[-5:]
+        assert buf[:] == expected
+    assert np.array_equal(buf.open_times, np.arange(7, 12))
+    assert buf.closes.base is not None  # view, bukan copy
+
+
+def test_open_candle_replaced_and_old_rows_ignored():
+    buf = CandleBuffer(capacity=3)
+    buf.apply([_row(1, 10), _row(2, 20)])
+    assert buf.apply([_row(1, 99), _row(2, 21), _row(3, 30)]) == 1
+    assert buf.closes.tolist() == [10.0, 21.0, 30.0]
+    assert buf.last_open_time == 3
+
+
+def test_failed_backfill_keeps_old_candles(monkeypatch):
+    store = CandleStore(capacity=5)
+    old = int(time.time() * 1000) // 60_000 * 60_000 - (MAX_KLINES_LIMIT + 10) * 60_000  # gap > MAX_KLINES_LIMIT
+    monkeypatch.setattr(candle_store, "get_ohlcv_binance", lambda *a, **kw: {"ohlcv": [_row(old + i * 60_000, i) for i in range(3)]})
+    store.refresh("BTC")
+    monkeypatch.setattr(candle_store, "get_ohlcv_binance", lambda *a, **kw: {"error": "circuit open"})
+    assert store.refresh("BTC") == {"error": "circuit open"}
+    assert len(store.get("BTC")) == 3
+
+    now = int(time.time() * 1000) // 60_000 * 60_000
+    monkeypatch.setattr(candle_store, "get_ohlcv_binance", lambda *a, **kw: {"ohlcv": [_row(now, 7)]})
+    res = store.refresh("BTC")
+    assert res["backfill"] and store.get("BTC")[:] == [[now, 7.0, 8.0, 6.0, 7.0, 10.0]]
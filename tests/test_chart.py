@@ -0,0 +1,63 @@
+# tests/test_chart.py
+import asyncio
+import time
+
+import pytest
+
+from app.services import market_data_async as mda
+from app.services.market_data import CACHE
+
+STEP = 60_000
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake Binance /klines: candle 1m dari startTime (atau yang terakhir), tanpa candle di masa depan"""
+    calls = []
+
+    async def fake_fetch(symbol, interval="1m", limit=500, start_time=None):
+        calls.append((start_time, limit))
+        now = int(time.time() * 1000) // STEP * STEP
+        first = now - (limit - 1) * STEP if start_time is None else -(-start_time // STEP) * STEP
+        rows = [[t, 1.0, 2.0, 0.5, 1.5, 10.0] for t in range(first, min(first + limit * STEP, now + STEP), STEP)]
+        return {"exchange": "binance", "symbol": symbol, "interval": interval, "ohlcv": rows}
+
+    CACHE.clear()
+    monkeypatch.setattr(mda, "_fetch_ohlcv_binance", fake_fetch)
+    yield calls
+    CACHE.clear()
+
+
+def test_pages_closed_range_and_caches_it(upstream):
+    start = (int(time.time() * 1000) // STEP - 10_000) * STEP
+    res = asyncio.run(mda.get_ohlcv_pages("BTC", "1m", 2500, start))
+    times = [row[0] for row in res["ohlcv"]]
+    assert times == list(range(start, start + 2500 * STEP, STEP))
+    assert sorted(upstream) == [(start, 1000), (start + 1000 * STEP, 1000), (start + 2000 * STEP, 500)]
+    asyncio.run(mda.get_ohlcv_pages("BTC", "1m", 2500, start))
+    assert len(upstream) == 3  # range yang sudah close: dari cache
+
+
+def test_open_range_bypasses_cache(upstream):
+    start = (int(time.time() * 1000) // STEP - 5) * STEP
+    asyncio.run(mda.get_ohlcv_binance("BTC", "1m", 10, start))
+    asyncio.run(mda.get_ohlcv_binance("BTC", "1m", 10, start))
+    assert len(upstream) == 2
+
+
+def test_chart_fallback_returns_full_limit(upstream, monkeypatch):
+    import app.main as main
+
+    class NoHistory:
+        def read(self, *args):
+            return None
+
+    monkeypatch.setattr(main, "HISTORY", NoHistory())
+    res = asyncio.run(main.chart_data("BTC", "1m", 5000, None, None))
+    assert len(res["ohlcv"]) == 5000
+    assert len(upstream) == 5
+
+    end = (int(time.time() * 1000) // STEP - 100) * STEP
+    res = asyncio.run(main.chart_data("BTC", "1m", 1500, None, end))
+    times = [row[0] for row in res["ohlcv"]]
+    assert len(times) == 1500 and times[-1] == end
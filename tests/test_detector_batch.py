@@ -0,0 +1,54 @@
+# tests/test_detector_batch.py
+"""evaluate_batch (app/detector/batch.py) vs the pure-Python reference in app/detectors.py"""
+import random
+
+import pytest
+
+from app.detector.batch import DEFAULT_PARAMS, build_matrix, evaluate_batch
+from tests.detector_reference import REFERENCE, assert_same
+
+PARAM_SETS = [
+    DEFAULT_PARAMS,
+    {
+        "pump_dump": {"pump_threshold": 0.01, "window": 1},
+        "stagnant": {"threshold": 0.05, "window": 1},
+        "sideway": {"ma_window": 2, "std_threshold": 0.02},
+        "breakout": {"lookback": 1, "breakout_mult": 0.0},
+        "support_resistance": {"window": 2},
+    },
+]
+
+
+def random_rows(rng: random.Random, n: int):
+    """Random-walk klines as raw Binance rows (string prices), with jumps and flat stretches"""
+    price = rng.choice([0.0001, 1.0, 250.0, 60000.0])
+    rows = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.03:
+            price *= rng.choice([1.15, 0.85])
+        elif r > 0.3:
+            price *= 1 + rng.gauss(0, 0.01)
+        close = price
+        high = close * (1 + abs(rng.gauss(0, 0.005)))
+        low = close * (1 - abs(rng.gauss(0, 0.005)))
+        rows.append([i * 60_000, str(close), str(high), str(low), str(close), str(rng.random() * 10)])
+    return rows
+
+
+@pytest.mark.parametrize("params", PARAM_SETS)
+def test_evaluate_batch_matches_reference(params):
+    rng = random.Random(5)
+    series = {f"S{i}": random_rows(rng, rng.choice([0, 1, 2, 5, 20, 30, 51, 80, 120])) for i in range(300)}
+    results = evaluate_batch(build_matrix(series), params)
+    for sym, rows in series.items():
+        for name, kwargs in params.items():
+            assert_same(results[sym][name], REFERENCE[name](rows, **kwargs), (sym, name, len(rows)))
+
+
+def test_zero_prices_match_reference():
+    rows = [[i * 60_000, "0", "0", "0", "0", "0"] for i in range(60)]
+    rows[-1] = [59 * 60_000, "1", "1", "1", "1", "0"]
+    results = evaluate_batch(build_matrix({"Z": rows}))
+    for name, kwargs in DEFAULT_PARAMS.items():
+        assert_same(results["Z"][name], REFERENCE[name](rows, **kwargs), name)
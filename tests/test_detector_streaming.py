@@ -0,0 +1,76 @@
+# tests/test_detector_streaming.py
+"""StreamingDetectors (app/detector/streaming.py) vs app/detectors.py on closed candles + the live candle"""
+import random
+
+import pytest
+
+from app.detector.batch import DEFAULT_PARAMS
+from app.detector.streaming import RollingExtreme, SortedWindow, StreamingDetectors
+from tests.detector_reference import REFERENCE, assert_same
+
+PARAM_SETS = [
+    DEFAULT_PARAMS,
+    {
+        "pump_dump": {"pump_threshold": 0.01, "window": 1},
+        "stagnant": {"threshold": 0.05, "window": 1},
+        "sideway": {"ma_window": 1, "std_threshold": 0.02},
+        "breakout": {"lookback": 1, "breakout_mult": 0.0},
+        "support_resistance": {"window": 1},
+    },
+    {
+        "pump_dump": {"pump_threshold": 0.02, "window": 2},
+        "stagnant": {"threshold": 0.01, "window": 2},
+        "sideway": {"ma_window": 2, "std_threshold": 0.005},
+        "breakout": {"lookback": 2, "breakout_mult": 0.001},
+        "support_resistance": {"window": 2},
+    },
+]
+
+
+def test_rolling_primitives_size_zero_are_empty():
+    ext = RollingExtreme(0, "max")
+    win = SortedWindow(0)
+    for v in (3.0, 1.0, 2.0):
+        ext.push(v)
+        win.push(v)
+    assert ext.value is None
+    assert win.smallest(3) == [] and win.largest(3) == []
+
+
+def test_stagnant_window_one_uses_live_candle_only():
+    det = StreamingDetectors({**DEFAULT_PARAMS, "stagnant": {"threshold": 0.02, "window": 1}})
+    det.update(0, 101.0, 99.0, 100.0)
+    det.update(60_000, 101.0, 99.0, 100.47)
+    assert det.stagnant() == {"status": "stagnant", "range_frac": 0.0}
+
+
+@pytest.mark.parametrize("params", PARAM_SETS)
+def test_streaming_matches_reference_with_live_revisions(params):
+    rng = random.Random(6)
+    for _ in range(20):
+        det = StreamingDetectors(params)
+        rows = []  # closed candles + live candle (last)
+        price = rng.choice([1.0, 250.0, 60000.0])
+        for i in range(120):
+            for _ in range(rng.randint(1, 3)):  # live candle direvisi beberapa kali
+                r = rng.random()
+                if r < 0.05:
+                    price *= rng.choice([1.12, 0.88])
+                elif r > 0.3:
+                    price *= 1 + rng.gauss(0, 0.01)
+                row = [i * 60_000, price, price * 1.003, price * 0.997, price, 1.0]
+                assert det.update_row(row)
+                if rows and rows[-1][0] == row[0]:
+                    rows[-1] = row
+                else:
+                    rows.append(row)
+                got = det.results()
+                for name, kwargs in params.items():
+                    assert_same(got[name], REFERENCE[name](rows, **kwargs), (i, name))
+
+
+def test_out_of_order_candle_is_ignored():
+    det = StreamingDetectors()
+    det.update(120_000, 1.0, 1.0, 1.0)
+    assert not det.update(60_000, 2.0, 2.0, 2.0)
+    assert det.live == (120_000, 1.0, 1.0, 1.0)
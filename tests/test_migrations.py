@@ -0,0 +1,32 @@
+# tests/test_migrations.py
+import os
+import sqlite3
+
+from alembic import command
+from alembic.config import Config
+
+import app
+
+ALEMBIC_INI = os.path.join(os.path.dirname(app.__file__), "alembic.ini")
+
+
+def test_upgrade_head_on_legacy_signals_table(tmp_path, monkeypatch):
+    db = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE signals (id INTEGER PRIMARY KEY, symbol VARCHAR(64) NOT NULL, "
+        "signal_type VARCHAR(64) NOT NULL, confidence FLOAT, created_at DATETIME)"
+    )
+    conn.execute("INSERT INTO signals (symbol, signal_type) VALUES ('BTC', 'pump')")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db}")
+    command.upgrade(Config(ALEMBIC_INI), "head")
+
+    conn = sqlite3.connect(db)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(signals)")}
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "timeframe" in columns
+    assert conn.execute("SELECT timeframe FROM signals").fetchone() == ("1m",)
+    assert {"worker_heartbeats", "signal_rollups", "rollup_watermarks"} <= tables
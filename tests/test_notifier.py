@@ -0,0 +1,69 @@
+# tests/test_notifier.py
+from app.services import notifier
+from app.services.notifier import MAX_MESSAGE_CHARS, ChatOutbox, Notifier, truncate_html
+
+
+def test_take_batch_splits_between_messages():
+    box = ChatOutbox("1")
+    texts = [f"<b>S{i}</b> " + "x" * 1000 for i in range(10)]
+    for t in texts:
+        box.add(t, 0.0)
+    sent = []
+    while box.pending:
+        batch = box.take_batch()
+        assert len("\n".join(batch)) <= MAX_MESSAGE_CHARS
+        sent.extend(batch)
+    assert sent == texts
+
+
+def test_overlong_message_never_leaves_an_open_tag():
+    box = ChatOutbox("1")
+    box.add("<b>BTC</b> " + "a&amp;" * 700 + "<b>tail</b>", 0.0)
+    (text,) = box.take_batch()
+    assert len(text) <= MAX_MESSAGE_CHARS
+    assert "<" not in text and ">" not in text
+    assert not text.endswith(("&", "&a", "&am", "&amp"))
+
+
+def test_truncate_html_keeps_short_text():
+    assert truncate_html("<b>ETH</b> pump") == "<b>ETH</b> pump"
+
+
+def test_stagnant_and_sideway_are_deduped_separately(monkeypatch):
+    from app import worker
+    from app.services.signal_writer import SavedSignal
+
+    class FakeNotifier:
+        def __init__(self):
+            self.keys = []
+
+        def enqueue(self, text, key=None):
+            self.keys.append(key)
+
+    fake = FakeNotifier()
+    monkeypatch.setattr(worker, "NOTIFIER", fake)
+    monkeypatch.setattr(worker, "publish_many", lambda events: None)
+
+    messages = worker.build_messages("BTC", {
+        "stagnant": {"status": "stagnant", "range_frac": 0.001},
+        "sideway": {"status": "sideway", "std": 0.0001},
+    })
+    saved = [
+        SavedSignal(i, "BTC", worker.classify_message(m), 0.5, None, {"text": m, "detector": d})
+        for i, (d, m) in enumerate(messages)
+    ]
+    assert {s.signal_type for s in saved} == {"stagnant/sideway"}
+    worker.notify_saved(saved)
+    assert len(set(fake.keys)) == 2
+
+
+def test_dropped_message_does_not_suppress_the_next_alert(monkeypatch):
+    monkeypatch.setattr(notifier, "NOTIFY_QUEUE_SIZE", 1)
+    n = Notifier(token="t", chat_ids="1")
+    assert n.enqueue("first", key="BTC:1m:pump_dump:pump")
+    assert not n.enqueue("dropped", key="ETH:1m:pump_dump:pump")  # antrian penuh
+    assert n.dropped == 1
+    n._queue.get_nowait()
+    assert n.enqueue("retry", key="ETH:1m:pump_dump:pump")
+    assert not n.enqueue("again", key="ETH:1m:pump_dump:pump")  # sekarang baru duplikat
+    assert n.deduped == 1
@@ -0,0 +1,100 @@
+# tests/test_orderbook.py
+import asyncio
+
+from app.services.orderbook import BookSync, OrderBook, SnapshotBooks, merged_top, snapshot_depth
+
+
+def _levels(start: float, step: float, n: int):
+    return [[str(start + i * step), "1"] for i in range(n)]
+
+
+def test_book_side_order_and_removal():
+    book = OrderBook("binance", "BTC")
+    book.load_snapshot(asks=[["101", "1"], ["100", "2"]], bids=[["98", "1"], ["99", "3"]])
+    assert book.top(5) == {"asks": [[100.0, 2.0], [101.0, 1.0]], "bids": [[99.0, 3.0], [98.0, 1.0]]}
+    book.apply_diff(asks=[["100", "0"], ["100.5", "4"]], bids=[])
+    assert book.asks.top(2) == [[100.5, 4.0], [101.0, 1.0]]
+    assert book.depth(2)["asks"][-1] == [101.0, 1.0, 5.0]
+
+
+def test_book_sync_replays_buffer_and_resyncs_on_gap():
+    book = OrderBook("binance", "BTC")
+    sync = BookSync(book)
+    assert not sync.on_event({"U": 9, "u": 10, "a": [["100", "1"]], "b": []})  # lebih tua dari snapshot
+    assert not sync.on_event({"U": 11, "u": 12, "a": [["101", "2"]], "b": []})
+    assert sync.load_snapshot({"asks": [["100", "5"]], "bids": [["99", "1"]], "last_update_id": 10})
+    assert book.last_update_id == 12
+    assert book.asks.top(2) == [[100.0, 5.0], [101.0, 2.0]]
+    assert sync.on_event({"U": 13, "u": 13, "a": [], "b": [["99", "0"]]})
+    assert len(book.bids) == 0
+    assert not sync.on_event({"U": 20, "u": 21, "a": [], "b": []})  # gap
+    assert not sync.synced and sync.resyncs == 1
+
+
+def test_merged_top_converts_and_sorts():
+    idx = OrderBook("indodax", "BTC")
+    idx.load_snapshot(asks=[["1000", "1"], ["1020", "1"]], bids=[["990", "1"]])
+    bn = OrderBook("binance", "BTC")
+    bn.load_snapshot(asks=[["1.01", "2"]], bids=[["0.995", "1"]])  # USDT, rate 1000
+    out = merged_top({"indodax": (idx, 1.0), "binance": (bn, 1000.0)}, 3, cumulative=True)
+    assert [row[2] for row in out["asks"]] == ["indodax", "binance", "indodax"]
+    assert out["asks"][-1][3] == 4.0
+    assert [row[0] for row in out["bids"]] == [995.0, 990.0]
+
+
+def test_snapshot_books_one_book_per_symbol():
+    books = SnapshotBooks()
+    deep = {"asks": _levels(100, 1, 50), "bids": _levels(99, -1, 50)}
+    book = books.get("binance", "BTC", deep)
+    assert len(book.top(50)["asks"]) == 50
+    assert len(book.top(10)["asks"]) == 10
+    book.updated_at = 0.0
+    stale = {**deep, "stale": True, "stale_age": 3.0}  # market_data.mark_stale: dict baru, level sama
+    assert books.get("binance", "BTC", stale) is book
+    assert book.updated_at == 0.0  # tidak di-rebuild
+    shallow = {"asks": _levels(200, 1, 10), "bids": _levels(199, -1, 10)}
+    assert books.get("binance", "BTC", shallow) is book
+    assert book.top(50)["asks"][0] == [200.0, 1.0] and len(book.asks) == 10
+    assert len(books) == 1
+
+
+def test_snapshot_books_evict_least_recently_used():
+    books = SnapshotBooks(maxsize=2)
+    snap = {"asks": _levels(100, 1, 5), "bids": _levels(99, -1, 5)}
+    btc = books.get("indodax", "BTC", snap)
+    books.get("indodax", "ETH", snap)
+    assert books.get("indodax", "BTC", snap) is btc  # BTC jadi paling baru
+    for i in range(100):  # limit / symbol dari query client tidak menumpuk
+        books.get("indodax", f"X{i}", snap)
+    assert len(books) == 2
+
+
+def test_snapshot_depth_tiers():
+    assert [snapshot_depth(n) for n in (1, 50, 100, 101, 1000, 5000, 9999)] == [100, 100, 100, 500, 1000, 5000, 5000]
+
+
+def test_concurrent_orderbook_requests_with_different_limits(monkeypatch):
+    import app.main as main
+
+    fetched = []
+
+    async def fake_snapshot(symbol, limit=10):
+        fetched.append(limit)
+        await asyncio.sleep(0.01 if limit == 500 else 0.02)  # snapshot dangkal selesai belakangan
+        return {"asks": _levels(100, 1, limit), "bids": _levels(99, -1, limit), "last_update_id": limit}
+
+    async def fake_rate():
+        await asyncio.sleep(0.03)
+        return 16000.0
+
+    monkeypatch.setattr(main, "STREAM", None)
+    monkeypatch.setattr(main, "get_binance_orderbook_usdt", fake_snapshot)
+    monkeypatch.setattr(main, "get_usdt_idr_rate", fake_rate)
+
+    async def both():
+        return await asyncio.gather(main.binance_idr_orderbook("BTC", 500), main.binance_idr_orderbook("BTC", 10))
+
+    deep, shallow = asyncio.run(both())
+    assert sorted(fetched) == [100, 500]
+    assert len(deep["asks"]) == 500
+    assert len(shallow["asks"]) == 10
@@ -0,0 +1,46 @@
+# tests/test_polling.py
+import pytest
+
+from app.services.polling import PollPlan
+
+CALM = {"sideway": {"std": 0.002}}  # std = vol_ref → interval = base
+
+
+def _load(plan: PollPlan, cost: float) -> float:
+    return cost * sum(1.0 / iv for iv in plan.intervals.values())
+
+
+def test_intervals_follow_volatility_and_status():
+    plan = PollPlan(base=30, min_interval=10, max_interval=120, vol_ref=0.002)
+    plan.update({
+        "A": CALM,
+        "B": {"sideway": {"std": 0.004}},
+        "C": {"sideway": {"std": 0.002}, "stagnant": {"status": "stagnant"}},
+        "D": {"sideway": {"std": 0.0001}, "pump_dump": {"status": "pump"}},
+    }, now=0.0)
+    assert plan.intervals == {"A": 30, "B": 15, "C": 120, "D": 10}
+    assert plan.due(list(plan.intervals), 12.0) == ["D"]
+
+
+def test_over_budget_stretches_every_owned_symbol():
+    plan = PollPlan(base=30, min_interval=10, max_interval=1000, vol_ref=0.002)
+    plan.update({f"S{i}": CALM for i in range(10)}, now=0.0)  # tanpa budget
+    plan.update({"S0": CALM}, now=5.0, cost=2.0, budget=0.2)  # hanya S0 yang baru di-refresh
+    assert _load(plan, 2.0) == pytest.approx(0.2)
+    assert len(set(round(iv, 6) for iv in plan.intervals.values())) == 1  # semua ikut diperpanjang
+    assert plan.next_due["S1"] == pytest.approx(plan.intervals["S1"])  # jadwal symbol lain ikut mundur
+    assert plan.load_ratio == pytest.approx(1.0)
+
+
+def test_capped_intervals_shift_the_stretch_to_the_rest():
+    plan = PollPlan(base=30, min_interval=10, max_interval=100, vol_ref=0.002)
+    plan.update({"Q": {"stagnant": {"status": "stagnant"}}, "A": CALM, "B": CALM}, now=0.0, cost=1.0, budget=0.05)
+    assert plan.intervals["Q"] == 100
+    assert _load(plan, 1.0) == pytest.approx(0.05)
+
+
+def test_over_budget_at_max_interval_is_reported():
+    plan = PollPlan(base=30, min_interval=10, max_interval=60, vol_ref=0.002)
+    plan.update({f"S{i}": CALM for i in range(100)}, now=0.0, cost=2.0, budget=1.0)
+    assert all(iv == 60 for iv in plan.intervals.values())
+    assert plan.load_ratio == pytest.approx(100 * 2.0 / 60 / 1.0)
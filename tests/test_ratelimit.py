@@ -0,0 +1,109 @@
+# tests/test_ratelimit.py
+import asyncio
+
+import pytest
+
+from app.services import ratelimit
+from app.services.ratelimit import BACKGROUND, INTERACTIVE, RateLimited, TokenBucket
+
+
+class FakeClock:
+    """time.monotonic / time.sleep untuk modul ratelimit: sleep memajukan jam"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", c)
+    return c
+
+
+def _bucket(per_minute: float = 600, reserve: float = 0.0) -> TokenBucket:
+    # share=1: capacity = per_minute, rate = per_minute / 60 per detik
+    return TokenBucket("test", per_minute, share=1.0, reserve=reserve)
+
+
+def test_interactive_overtakes_queued_background(clock):
+    b = _bucket(600)
+    b.tokens = 0.0
+    bg = b._enqueue(BACKGROUND)
+    it = b._enqueue(INTERACTIVE)
+    clock.now += 0.1  # 1 token
+    assert b._try(bg, 1) == ratelimit._STEP  # bukan di depan antrian
+    assert b._try(it, 1) == 0.0
+    assert b._try(bg, 1) == pytest.approx(0.1)
+    clock.now += 0.1
+    assert b._try(bg, 1) == 0.0
+    assert b._waiters == []
+
+
+def test_background_leaves_reserve_for_interactive(clock):
+    b = _bucket(600, reserve=0.2)  # reserve 120 token
+    b.tokens = 125.0
+    b.acquire(5, BACKGROUND)
+    assert b.tokens == pytest.approx(120)
+    assert not b.try_acquire(1)
+
+    start = clock.now
+    b.acquire(100, INTERACTIVE)  # boleh memakai reserve, tanpa menunggu
+    assert clock.now == start
+    b.acquire(1, BACKGROUND)  # menunggu sampai reserve penuh lagi: (121 - 20) / 10 per detik
+    assert clock.now - start == pytest.approx(10.1, abs=0.3)
+    assert b.tokens >= b.reserve - 1e-9
+
+
+def test_429_pauses_until_retry_after(clock):
+    b = _bucket(600)
+    b.observe(429, {"retry-after": "7"})
+    assert b.tokens == 0.0
+    assert b.stats()["blocked_seconds"] == pytest.approx(7)
+
+    start = clock.now
+    with pytest.raises(RateLimited):
+        b.acquire(1, INTERACTIVE)  # 7s > RATE_LIMIT_MAX_WAIT interaktif
+    assert clock.now == start
+    b.acquire(1, BACKGROUND)
+    assert clock.now - start >= 7
+
+    b.observe(418, {})
+    assert b.stats()["blocked_seconds"] == pytest.approx(ratelimit.DEFAULT_RETRY_AFTER)
+
+
+def test_used_weight_header_clamps_tokens(clock):
+    b = TokenBucket("test", 6000, share=0.5, reserve=0.0)  # capacity 3000
+    b.observe(200, {"x-mbx-used-weight-1m": "5900"})
+    assert b.used_weight == 5900
+    assert b.tokens == pytest.approx(100)  # sisa limit IP, bukan capacity proses ini
+    b.observe(200, {"x-mbx-used-weight-1m": "10"})
+    assert b.tokens == pytest.approx(100)  # header hanya menurunkan, tidak menambah token
+
+
+def test_wait_past_deadline_raises_and_leaves_queue(clock):
+    b = _bucket(60)  # 1 token per detik
+    b.tokens = 0.0
+    start = clock.now
+    with pytest.raises(RateLimited):
+        b.acquire(10, INTERACTIVE)
+    with pytest.raises(RateLimited):
+        asyncio.run(b.aacquire(10, INTERACTIVE))
+    assert clock.now == start
+    assert b._waiters == []
+    b.acquire(10, BACKGROUND)  # 10s masih di bawah batas BACKGROUND
+    assert clock.now - start == pytest.approx(10, abs=0.3)
+
+
+def test_binance_weights():
+    assert ratelimit.weight("indodax", "/ticker/btcidr") == 1
+    assert ratelimit.weight("binance", "/depth", {"limit": 100}) == 5
+    assert ratelimit.weight("binance", "/depth", {"limit": 1000}) == 50
+    assert ratelimit.weight("binance", "/ticker/bookTicker") == 4
+    assert ratelimit.weight("binance", "/klines", {"limit": 500}) == 2
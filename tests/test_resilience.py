@@ -0,0 +1,126 @@
+# tests/test_resilience.py
+import asyncio
+import time
+
+import pytest
+
+from app.services import market_data, market_data_async, ratelimit, resilience
+from app.services.ratelimit import RateLimited
+from app.services.resilience import CircuitBreaker, CircuitOpen, Endpoint
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+def test_breaker_opens_then_allows_one_probe(monkeypatch):
+    clock = FakeClock(0.0)
+    monkeypatch.setattr(resilience, "time", clock)
+    cb = CircuitBreaker("test:open", failures=2, reset=10)
+    cb.before()
+    cb.failure()
+    cb.failure()
+    with pytest.raises(CircuitOpen):
+        cb.before()
+    clock.now = 11.0
+    cb.before()  # probe half-open
+    with pytest.raises(CircuitOpen):
+        cb.before()
+    cb.success()
+    assert cb.state == CircuitBreaker.CLOSED
+    cb.before()
+
+
+def test_failed_probe_reopens(monkeypatch):
+    clock = FakeClock(0.0)
+    monkeypatch.setattr(resilience, "time", clock)
+    cb = CircuitBreaker("test:reopen", failures=1, reset=5)
+    cb.failure()
+    clock.now = 6.0
+    cb.before()
+    cb.failure()
+    assert cb.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        cb.before()
+
+
+def test_hedge_wins_when_primary_is_slow(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_ENABLED", True)
+    ep = Endpoint("test", "slow")
+    ep._delay = 0.05
+
+    def attempt(i: int):
+        time.sleep(0.5 if i == 0 else 0.0)
+        return f"attempt-{i}"
+
+    assert ep.call(attempt) == "attempt-1"
+    assert ep.breaker.failures == 0
+
+
+def test_upstream_errors_count_as_failures(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_ENABLED", False)
+    ep = Endpoint("test", "down")
+
+    def attempt(i: int):
+        raise ConnectionError("down")
+
+    for _ in range(ep.breaker.threshold):
+        with pytest.raises(ConnectionError):
+            ep.call(attempt)
+    assert ep.breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.fixture
+def half_open(monkeypatch):
+    """binance:klines breaker yang baru masuk half-open, bucket binance diblok 429"""
+    clock = FakeClock(0.0)
+    monkeypatch.setattr(resilience, "time", clock)
+    ep = Endpoint("binance", "klines")
+    ep.breaker = CircuitBreaker("binance:klines", failures=1, reset=10)
+    ep.breaker.failure()
+    clock.now = 11.0
+    monkeypatch.setitem(resilience._ENDPOINTS, ("binance", "klines"), ep)
+    bucket = ratelimit.TokenBucket("binance", 6000)
+    bucket.observe(429, {"retry-after": "100"})
+    monkeypatch.setitem(ratelimit.BUCKETS, "binance", bucket)
+    return ep
+
+
+def test_rate_limited_probe_is_released(half_open):
+    params = {"symbol": "BTCUSDT", "interval": "1m", "limit": 10}
+    with pytest.raises(RateLimited):
+        market_data._get_json("klines", market_data.BINANCE_BASE, "/klines", params)
+    assert half_open.breaker.state == CircuitBreaker.HALF_OPEN
+    assert half_open.breaker.before()  # probe berikutnya langsung boleh, tidak menunggu CB_RESET
+    half_open.breaker.release()
+
+    with pytest.raises(RateLimited):
+        asyncio.run(market_data_async._get_json("klines", market_data.BINANCE_BASE, "/klines", params))
+    assert half_open.breaker.before()
+
+
+def test_bad_request_probe_is_released(monkeypatch):
+    clock = FakeClock(0.0)
+    monkeypatch.setattr(resilience, "time", clock)
+    monkeypatch.setattr(resilience, "HEDGE_ENABLED", False)
+    ep = Endpoint("test", "probe")
+    ep.breaker = CircuitBreaker("test:probe", failures=1, reset=10)
+    ep.breaker.failure()
+    clock.now = 11.0
+    probe = ep.breaker.before()
+    assert probe
+
+    def attempt(i: int):
+        raise RateLimited("no budget for hedge")
+
+    with pytest.raises(RateLimited):
+        ep.call(attempt, probe)
+    assert ep.breaker.state == CircuitBreaker.HALF_OPEN
+    assert ep.breaker.before()
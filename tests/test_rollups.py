@@ -0,0 +1,119 @@
+# tests/test_rollups.py
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.crud.crud_signal import get_signal_stats
+from app.db import Base
+from app.model import Signal
+from app.services import rollups
+from app.services.signal_writer import SignalWriter
+
+
+@pytest.fixture
+def engine(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path}/rollups.db")
+    Base.metadata.create_all(bind=eng)
+    yield eng
+    eng.dispose()
+
+
+def _signal(i: int, symbol: str = "BTC", signal_type: str = "pump", confidence=0.5, minutes_ago: int = 0):
+    return {
+        "id": i, "symbol": symbol, "signal_type": signal_type, "timeframe": "1m",
+        "confidence": confidence, "created_at": datetime.utcnow() - timedelta(minutes=minutes_ago),
+    }
+
+
+def _insert(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(insert(Signal), rows)
+
+
+def test_rollup_matches_raw_table_and_is_incremental(engine):
+    _insert(engine, [
+        _signal(i, symbol=("BTC", "ETH")[i % 2], signal_type=("pump", "dump")[i % 3 == 0],
+                confidence=None if i % 7 == 0 else i / 100, minutes_ago=i * 17)
+        for i in range(1, 301)
+    ])
+    assert rollups.run_once(engine) == 300
+    assert rollups.run_once(engine) == 0  # tidak dihitung dua kali
+    _insert(engine, [_signal(301, confidence=1.0)])
+    assert rollups.run_once(engine) == 1
+
+    with Session(engine) as db:
+        for bucket in ("hour", "day"):
+            stats = get_signal_stats(db, bucket, symbol="BTC", signal_type="pump", limit=5000)
+            raw_count = db.scalar(
+                select(func.count()).where(Signal.symbol == "BTC", Signal.signal_type == "pump")
+            )
+            assert stats["last_id"] == 301
+            assert sum(r["count"] for r in stats["rows"]) == raw_count
+        day = get_signal_stats(db, "day", limit=5000)["rows"]
+        assert all(r["bucket"].hour == 0 for r in day)
+
+
+
+def test_run_once_respects_batch_size(engine):
+    _insert(engine, [_signal(i) for i in range(1, 26)])
+    assert rollups.run_once(engine, max_batches=2, batch=10) == 20  # dua batch penuh, sisa ditunda
+    assert rollups.run_once(engine, batch=10) == 5  # batch pendek → selesai tanpa transaksi kosong
+
+def test_average_confidence_ignores_nulls(engine):
+    _insert(engine, [_signal(1, confidence=0.2), _signal(2, confidence=None), _signal(3, confidence=0.6)])
+    rollups.run_once(engine)
+    with Session(engine) as db:
+        (row,) = get_signal_stats(db, "day")["rows"]
+    assert row["count"] == 3
+    assert row["avg_confidence"] == pytest.approx(0.4)
+
+
+def test_watermark_stops_at_gap_until_it_commits(engine):
+    gaps = {}
+    _insert(engine, [_signal(1), _signal(2), _signal(4)])  # id 3: INSERT lain yang belum commit
+    assert rollups.run_once(engine, gaps=gaps) == 2
+    assert 3 in gaps
+    _insert(engine, [_signal(3)])
+    assert rollups.run_once(engine, gaps=gaps) == 2
+    assert gaps == {}
+    with Session(engine) as db:
+        assert get_signal_stats(db, "hour")["last_id"] == 4
+
+
+def test_permanent_gap_is_skipped_after_timeout(engine):
+    gaps = {}
+    _insert(engine, [_signal(1), _signal(5)])  # 2..4: rollback / flush gagal
+    assert rollups.run_once(engine, gaps=gaps, gap_timeout=0.05) == 1
+    time.sleep(0.1)
+    assert rollups.run_once(engine, gaps=gaps, gap_timeout=0.05) == 1
+    assert gaps == {}
+
+
+def test_contiguous_ignores_created_at_and_clock():
+    gaps = {}
+    assert rollups.contiguous([11, 12, 13], 10, gaps, 60, now=0.0) == 3
+    assert rollups.contiguous([11, 13], 10, gaps, 60, now=0.0) == 1
+    assert rollups.contiguous([13], 11, gaps, 60, now=30.0) == 0
+    assert rollups.contiguous([13], 11, gaps, 60, now=61.0) == 1
+
+
+def test_signal_writer_keeps_failed_rows_and_stamps_at_flush(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path}/writer.db")
+    writer = SignalWriter(batch_size=1000, flush_interval=60, engine=eng)
+    try:
+        writer.add("BTC", "pump", 0.9)
+        assert writer.flush() == 0  # tabel belum ada: flush gagal
+        assert writer.pending() == 1
+        time.sleep(0.05)
+        Base.metadata.create_all(bind=eng)
+        before = datetime.utcnow()
+        assert writer.flush() == 1
+        with eng.connect() as conn:
+            created_at = conn.scalar(select(Signal.created_at))
+        assert created_at >= before  # distempel saat INSERT, bukan saat add()
+    finally:
+        writer.close()
+        eng.dispose()
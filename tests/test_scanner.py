@@ -0,0 +1,86 @@
+# tests/test_scanner.py
+import numpy as np
+import pytest
+
+from app.services.scanner import COLUMNS, compute_spreads, parse_binance_book_tickers, parse_indodax_summaries, select
+
+SUMMARIES = {
+    "tickers": {
+        "btc_idr": {"last": "1600000000", "buy": "1599000000", "sell": "1601000000", "vol_idr": "9000000000"},
+        "eth_idr": {"last": "51000000", "buy": "50900000", "sell": "51100000", "vol_idr": "3000000000"},
+        "sol_idr": {"last": "2500000", "buy": "2490000", "sell": "2510000", "vol_idr": "10000"},
+        "doge_idr": {"last": "0", "buy": "0", "sell": "0", "vol_idr": "0"},  # pair tanpa quote valid
+        "usdt_idr": {"last": "16000", "buy": "15990", "sell": "16010", "vol_idr": "500000000"},
+        "ten_usdt": {"last": "5", "buy": "5", "sell": "5", "vol_idr": "5"},  # bukan pair IDR
+        "ada_idr": {"last": "n/a", "buy": None, "sell": "7000", "vol_idr": "1"},
+    }
+}
+
+BOOK_TICKERS = [
+    {"symbol": "BTCUSDT", "bidPrice": "99990", "askPrice": "100010"},
+    {"symbol": "ETHUSDT", "bidPrice": "3199", "askPrice": "3201"},
+    {"symbol": "SOLUSDT", "bidPrice": "159", "askPrice": "161"},
+    {"symbol": "DOGEUSDT", "bidPrice": "0.1", "askPrice": "0.1"},
+    {"symbol": "ADAUSDT", "bidPrice": "0.4", "askPrice": "0.4"},
+    {"symbol": "ETHBTC", "bidPrice": "0.03", "askPrice": "0.03"},  # bukan pair USDT
+    {"symbol": "USDT", "bidPrice": "1", "askPrice": "1"},
+    {"symbol": "XRPUSDT", "bidPrice": "0.5", "askPrice": "0.5"},  # tidak ada di Indodax
+]
+
+
+@pytest.fixture
+def spreads():
+    indodax, rate = parse_indodax_summaries(SUMMARIES)
+    return compute_spreads(indodax, parse_binance_book_tickers(BOOK_TICKERS), rate)
+
+
+def test_parse_matches_by_base_asset():
+    indodax, rate = parse_indodax_summaries(SUMMARIES)
+    assert rate == 16000.0
+    assert set(indodax) == {"BTC", "ETH", "SOL", "DOGE", "USDT", "ADA"}
+    assert indodax["BTC"] == (1600000000.0, 1599000000.0, 1601000000.0, 9000000000.0)
+    assert indodax["ADA"] == (0.0, 0.0, 7000.0, 1.0)  # nilai rusak jadi 0.0
+
+    binance = parse_binance_book_tickers(BOOK_TICKERS)
+    assert set(binance) == {"BTC", "ETH", "SOL", "DOGE", "ADA", "XRP"}
+    assert binance["ETH"] == (3199.0, 3201.0)
+    assert parse_indodax_summaries({}) == ({}, 0.0)
+
+
+def test_compute_spreads_drops_invalid_quotes(spreads):
+    # DOGE / ADA: quote Indodax 0, USDT: pair rate, XRP: hanya di Binance
+    assert spreads["symbols"].tolist() == ["BTC", "ETH", "SOL"]
+    assert spreads["rate"] == 16000.0
+    btc = 0
+    assert spreads["binance_bid"][btc] == pytest.approx(99990 * 16000)
+    assert spreads["spread_pct"][btc] == pytest.approx((1600000000 / (100000 * 16000) - 1) * 100)
+    assert spreads["buy_binance_pct"][btc] == pytest.approx((1599000000 / (100010 * 16000) - 1) * 100)
+    assert spreads["buy_indodax_pct"][btc] == pytest.approx((99990 * 16000 / 1601000000 - 1) * 100)
+
+
+def test_compute_spreads_without_common_pairs():
+    out = compute_spreads({"BTC": (1.0, 1.0, 1.0, 1.0)}, {"ETH": (1.0, 1.0)}, 16000.0)
+    assert out["symbols"].tolist() == []
+    assert select(out)["pairs"] == []
+
+
+def test_select_sorts_by_abs_spread_then_filters(spreads):
+    # spread: BTC 0%, ETH ~ -0.39%, SOL ~ -2.34%
+    rows = select(spreads)["pairs"]
+    assert [r["symbol"] for r in rows] == ["SOL", "ETH", "BTC"]
+    assert [r["symbol"] for r in select(spreads, sort="spread_pct", order="asc")["pairs"]] == ["SOL", "ETH", "BTC"]
+    assert [r["symbol"] for r in select(spreads, sort="symbol", order="asc")["pairs"]] == ["BTC", "ETH", "SOL"]
+    assert [r["symbol"] for r in select(spreads, sort="indodax_vol_idr", limit=2)["pairs"]] == ["BTC", "ETH"]
+
+    filtered = select(spreads, min_volume=1e6, min_spread=0.1)  # SOL volume kecil, BTC spread 0
+    assert filtered["count"] == 1
+    assert filtered["pairs"][0]["symbol"] == "ETH"
+    assert set(filtered["pairs"][0]) == {"symbol", *COLUMNS}
+
+
+def test_select_rounds_and_keeps_arrays_intact(spreads):
+    before = spreads["spread_pct"].copy()
+    row = select(spreads, limit=1)["pairs"][0]
+    assert row["spread_pct"] == round(float(before[2]), 4)
+    assert np.array_equal(spreads["spread_pct"], before)
+    assert select(spreads)["stale"] is False
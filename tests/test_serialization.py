@@ -0,0 +1,41 @@
+# tests/test_serialization.py
+import msgpack
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.testclient import TestClient
+
+from app.services.serialization import encode, to_columnar
+
+PAYLOAD = {"symbol": "BTC", "ohlcv": [[0, "1", "2", "0.5", "1.5", "10"]] * 300, "raw": {"x": 1}}
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=100)
+
+    @app.get("/x")
+    async def x(request: Request, format: str = "rows"):
+        return encode(request, PAYLOAD, format)
+
+    return TestClient(app)
+
+
+def test_negotiated_responses_vary_on_accept():
+    client = _client()
+    as_json = client.get("/x", headers={"Accept-Encoding": "gzip"})
+    as_msgpack = client.get("/x", headers={"Accept": "application/msgpack"})
+    assert as_json.headers["content-type"].startswith("application/json")
+    assert as_msgpack.headers["content-type"] == "application/msgpack"
+    for r in (as_json, as_msgpack):
+        vary = {v.strip().lower() for v in r.headers["vary"].split(",")}
+        assert "accept" in vary
+    assert "accept-encoding" in {v.strip().lower() for v in as_json.headers["vary"].split(",")}
+    assert msgpack.unpackb(as_msgpack.content)["symbol"] == "BTC"
+
+
+def test_columnar_drops_raw_and_converts_rows():
+    out = to_columnar(PAYLOAD)
+    assert "raw" not in out
+    assert out["ohlcv"]["time"].dtype == np.int64
+    assert out["ohlcv"]["close"].tolist() == [1.5] * 300
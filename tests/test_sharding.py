@@ -0,0 +1,120 @@
+# tests/test_sharding.py
+from collections import Counter
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.services.sharding import ShardCoordinator, assign, lock_key, still_held
+
+SYMBOLS = [f"SYM{i}" for i in range(2000)]
+WORKERS = ["w-a", "w-b", "w-c", "w-d"]
+
+
+def _owners(workers):
+    return {sym: assign(sym, workers) for sym in SYMBOLS}
+
+
+def test_assign_spreads_symbols_evenly():
+    counts = Counter(_owners(WORKERS).values())
+    assert set(counts) == set(WORKERS)
+    for n in counts.values():
+        assert abs(n - len(SYMBOLS) / len(WORKERS)) < 0.15 * len(SYMBOLS) / len(WORKERS)
+    assert assign("BTC", []) is None
+    assert assign("BTC", WORKERS) == assign("BTC", list(reversed(WORKERS)))  # tidak tergantung urutan
+
+
+def test_join_moves_only_symbols_to_the_new_worker():
+    before = _owners(WORKERS)
+    after = _owners(WORKERS + ["w-e"])
+    moved = [sym for sym in SYMBOLS if before[sym] != after[sym]]
+    assert all(after[sym] == "w-e" for sym in moved)
+    assert abs(len(moved) - len(SYMBOLS) / 5) < 0.15 * len(SYMBOLS) / 5
+
+
+def test_leave_moves_only_the_leavers_symbols():
+    before = _owners(WORKERS)
+    after = _owners([w for w in WORKERS if w != "w-b"])
+    moved = {sym for sym in SYMBOLS if before[sym] != after[sym]}
+    assert moved == {sym for sym in SYMBOLS if before[sym] == "w-b"}
+
+
+def test_lock_key_is_stable_signed_bigint():
+    assert lock_key("btc") == lock_key("BTC")
+    assert lock_key("BTC") != lock_key("ETH")
+    assert all(-2 ** 63 <= lock_key(s) < 2 ** 63 for s in SYMBOLS[:100])
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalar(self):
+        return self._rows[0]
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+
+class FakeLockConnection:
+    """Koneksi lock Postgres palsu: advisory lock di set `locks`"""
+
+    def __init__(self):
+        self.locks = set()
+        self.dead = False
+
+    def execute(self, stmt, params=None):
+        if self.dead:
+            raise OperationalError(str(stmt), params, Exception("server closed the connection"))
+        sql = str(stmt)
+        if "pg_locks" in sql:
+            return _Result(sorted(self.locks))
+        if "pg_try_advisory_lock" in sql:
+            self.locks.add(params["k"])
+            return _Result([True])
+        if "pg_advisory_unlock(" in sql:
+            self.locks.discard(params["k"])
+            return _Result([True])
+        raise AssertionError(sql)
+
+    def commit(self):
+        pass
+
+    def invalidate(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def coordinator():
+    coord = ShardCoordinator(["BTC", "ETH", "SOL"], worker_id="w-a", enabled=False)
+    coord.enabled = True  # sqlite di test: claim() jalan di koneksi palsu
+    coord.owned = set()
+    conn = coord._lock_conn = FakeLockConnection()
+    return coord, conn
+
+
+def test_claim_drops_symbols_whose_lock_vanished(coordinator):
+    coord, conn = coordinator
+    assert coord.claim() == ["BTC", "ETH", "SOL"]
+    conn.locks.clear()  # failover: sesi baru tanpa lock, query tetap berhasil
+    coord.workers = ["w-a", "w-b", "w-c"]
+    coord.claim()
+    assert coord.owned == coord.assigned()  # yang masih assigned diambil ulang lewat pg_try_advisory_lock
+    assert conn.locks == {lock_key(s) for s in coord.owned}
+
+
+def test_claim_on_dead_connection_owns_nothing(coordinator):
+    coord, conn = coordinator
+    coord.claim()
+    conn.dead = True
+    assert coord.claim() == []
+    assert coord._lock_conn is None
+
+
+def test_still_held():
+    assert still_held({"BTC", "ETH"}, [lock_key("ETH"), lock_key("DOGE")]) == {"ETH"}
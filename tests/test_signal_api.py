@@ -0,0 +1,72 @@
+# tests/test_signal_api.py
+# route /signal dan /health lewat engine async (aiosqlite di test)
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import engine
+from app.services import rollups
+
+SYMBOL = "APITEST"
+
+
+@pytest.fixture(scope="module")
+def client():
+    import app.main as main
+
+    with TestClient(main.app) as c:  # shutdown menutup engine async (loop milik TestClient)
+        yield c
+
+
+@pytest.fixture(scope="module")
+def posted(client):
+    ids = []
+    for i, (signal_type, tf) in enumerate([("pump", "1m"), ("dump", "5m"), ("pump", "1m")]):
+        res = client.post("/signal/", json={"symbol": SYMBOL, "signal_type": signal_type, "confidence": 0.5 + i / 10, "timeframe": tf})
+        assert res.status_code == 200
+        body = res.json()
+        assert body["symbol"] == SYMBOL and body["timeframe"] == tf and body["created_at"]
+        ids.append(body["id"])
+    return ids
+
+
+def test_post_rejects_overlong_timeframe(client):
+    res = client.post("/signal/", json={"symbol": SYMBOL, "signal_type": "pump", "confidence": 0.5, "timeframe": "x" * 50})
+    assert res.status_code == 422
+
+
+def test_get_filters_and_pages_with_cursor(client, posted):
+    first = client.get("/signal/", params={"symbol": SYMBOL, "limit": 2})
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/signal/", params={"symbol": SYMBOL, "limit": 2, "cursor": cursor})
+    assert second.status_code == 200
+    assert "X-Next-Cursor" not in second.headers
+    ids = [row["id"] for row in first.json() + second.json()]
+    assert ids == sorted(posted, reverse=True)  # terbaru dulu, tanpa dobel antar halaman
+
+    five = client.get("/signal/", params={"symbol": SYMBOL, "timeframe": "5m"}).json()
+    assert [row["id"] for row in five] == [posted[1]]
+
+
+def test_bad_cursor_is_400(client):
+    res = client.get("/signal/", params={"cursor": "not-a-cursor"})
+    assert res.status_code == 400
+
+
+def test_stats_read_rollups(client, posted):
+    rollups.run_once(engine)
+    res = client.get("/signal/stats", params={"symbol": SYMBOL, "bucket": "hour"})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["bucket_size"] == "hour"
+    assert body["last_id"] >= max(posted)
+    counts = {row["signal_type"]: row["count"] for row in body["stats"]}
+    assert counts == {"pump": 2, "dump": 1}
+    pump = next(row for row in body["stats"] if row["signal_type"] == "pump")
+    assert pump["avg_confidence"] == pytest.approx(0.6)
+
+
+def test_health(client):
+    res = client.get("/health")
+    assert res.status_code == 200
+    assert res.json()["db"] == "ok"
@@ -0,0 +1,69 @@
+# tests/test_timeframes.py
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import SignalCreate
+from app.services.candle_store import CandleBuffer
+from app.services.timeframes import TimeframeStore
+
+MIN = 60_000
+T0 = (1_700_000_000_000 // 3_600_000) * 3_600_000  # awal jam UTC
+
+
+def _rows(first: int, last: int):
+    """1m candle menit first..last: open 100+i, high +2, low -2, close +1, volume 1+i"""
+    return [[T0 + i * MIN, 100 + i, 102 + i, 98 + i, 101 + i, 1 + i] for i in range(first, last + 1)]
+
+
+def test_1m_folds_into_higher_timeframes():
+    store = TimeframeStore(["1m", "5m", "15m", "1h"], capacity=50)
+    assert store.timeframes == ["5m", "15m", "1h"]
+    base = CandleBuffer(200)
+    base.apply(_rows(0, 6))
+    assert store.update("BTC", base) == []  # isi pertama, belum ada candle yang close
+
+    five = store.get("5m", "BTC")
+    assert five[0] == [T0, 100.0, 106.0, 98.0, 105.0, 15.0]  # open pertama, high max, low min, close terakhir, volume sum
+    assert five[1] == [T0 + 5 * MIN, 105.0, 108.0, 103.0, 107.0, 13.0]  # bucket yang masih berjalan
+    assert store.get("1h", "BTC")[0][1:] == [100.0, 108.0, 98.0, 107.0, 28.0]
+
+    base.apply(_rows(7, 9))
+    assert store.update("BTC", base) == []
+    assert len(five) == 2 and five[1][4] == 110.0  # direvisi di tempat
+
+    base.apply(_rows(10, 10))
+    assert store.update("BTC", base) == ["5m"]
+    closed = store.closed("5m", "BTC")
+    assert len(closed) == 2
+    assert closed.column(4).tolist() == [105.0, 110.0]
+
+    base.apply(_rows(11, 15))
+    assert store.update("BTC", base) == ["5m", "15m"]
+    assert store.closed("15m", "BTC").column(5).tolist() == [sum(range(1, 16))]
+    assert len(store.closed("1h", "BTC")) == 0
+
+
+def test_open_1m_candle_revises_without_closing():
+    store = TimeframeStore(["5m"], capacity=50)
+    base = CandleBuffer(200)
+    base.apply(_rows(0, 7))
+    store.update("BTC", base)
+    base.apply([[T0 + 7 * MIN, 107, 150, 90, 140, 99]])  # candle 1m yang sama, nilai baru
+    assert store.update("BTC", base) == []
+    assert store.get("5m", "BTC")[-1] == [T0 + 5 * MIN, 105.0, 150.0, 90.0, 140.0, 6.0 + 7.0 + 99.0]
+
+
+def test_starts_at_first_complete_bucket():
+    store = TimeframeStore(["5m"], capacity=50)
+    base = CandleBuffer(200)
+    base.apply(_rows(3, 12))
+    store.update("BTC", base)
+    assert [row[0] for row in store.get("5m", "BTC")[:]] == [T0 + 5 * MIN, T0 + 10 * MIN]
+
+
+def test_signal_timeframe_fits_column():
+    assert SignalCreate(symbol="BTC", signal_type="breakout", confidence=0.5).timeframe == "1m"
+    with pytest.raises(ValidationError):
+        SignalCreate(symbol="BTC", signal_type="breakout", confidence=0.5, timeframe="x" * 50)
+    with pytest.raises(ValidationError):
+        SignalCreate(symbol="BTC", signal_type="breakout", confidence=0.5, timeframe="")